@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulgarian_meteo_pro', '0004_alter_bulgarianmeteoprodata_station_status'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bulgarianmeteoprodata',
+            name='bulgarian_m_city_4a8380_idx',
+        ),
+        migrations.AddField(
+            model_name='bulgarianmeteoprodata',
+            name='city_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='bulgarianmeteoprodata',
+            index=models.Index(fields=['city_key', 'timestamp'], name='bulgarian_m_city_ke_bbbb55_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from weather_aggregator.utils import make_city_key
+
+
+def backfill_city_key(apps, schema_editor):
+    """
+    Sets the canonical city key of the stored readings, with one UPDATE per distinct city spelling.
+    """
+    BulgarianMeteoProData = apps.get_model('bulgarian_meteo_pro', 'BulgarianMeteoProData')
+
+    for city in BulgarianMeteoProData.objects.order_by().values_list('city', flat=True).distinct():
+        BulgarianMeteoProData.objects.filter(city=city).update(city_key=make_city_key(city))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulgarian_meteo_pro', '0005_bulgarianmeteoprodata_city_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_city_key, migrations.RunPython.noop),
+    ]
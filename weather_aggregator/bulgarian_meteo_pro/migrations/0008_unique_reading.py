@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_readings(apps, schema_editor):
+    """
+    Keeps the first of the readings sharing a station and timestamp, so the unique constraint can be added.
+    Stations pointing at a deleted duplicate are pointed at the kept reading, and the normalized readings of the
+    deleted ones are deleted. Rollups counted every duplicate, run `manage.py rebuild_weather_rollups` if any was deleted.
+    """
+    BulgarianMeteoProData = apps.get_model('bulgarian_meteo_pro', 'BulgarianMeteoProData')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Station = apps.get_model('stations', 'Station')
+    NormalizedReading = apps.get_model('stations', 'NormalizedReading')
+
+    content_type = ContentType.objects.filter(app_label='bulgarian_meteo_pro', model='bulgarianmeteoprodata').first()
+    duplicates = BulgarianMeteoProData.objects.order_by().values('station_id', 'timestamp').annotate(
+        count=Count('id'), kept_id=Min('id')
+    ).filter(count__gt=1)
+
+    for duplicate in duplicates.iterator():
+        deleted_ids = list(BulgarianMeteoProData.objects.filter(
+            station_id=duplicate['station_id'], timestamp=duplicate['timestamp']
+        ).exclude(id=duplicate['kept_id']).values_list('id', flat=True))
+
+        if content_type is not None:
+            Station.objects.filter(content_type=content_type, object_id__in=deleted_ids).update(
+                object_id=duplicate['kept_id']
+            )
+            NormalizedReading.objects.filter(content_type=content_type, object_id__in=deleted_ids).delete()
+        BulgarianMeteoProData.objects.filter(id__in=deleted_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulgarian_meteo_pro', '0007_partition_by_month'),
+        ('stations', '0014_station_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_readings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bulgarianmeteoprodata',
+            constraint=models.UniqueConstraint(fields=('station_id', 'timestamp'), name='unique_bulgarianmeteoprodata_reading'),
+        ),
+    ]
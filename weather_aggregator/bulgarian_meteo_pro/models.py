@@ -11,6 +11,12 @@ class BulgarianMeteoProData(models.Model):
         max_length=100
     )
 
+    city_key = models.CharField(
+        max_length=100,
+        default='',
+        editable=False
+    )  # canonical city name for lookups, see `make_city_key`
+
     latitude = models.FloatField()
 
     longitude = models.FloatField()
@@ -41,7 +47,13 @@ class BulgarianMeteoProData(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['city', 'timestamp']),  # optimized for filtering city and ordering by timestamp
+            models.Index(fields=['city_key', 'timestamp']),  # optimized for filtering city and ordering by timestamp
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['station_id', 'timestamp'],
+                name='unique_bulgarianmeteoprodata_reading'
+            ),  # includes the partition key, so it holds on the partitioned table
         ]
         ordering = ['timestamp']
 
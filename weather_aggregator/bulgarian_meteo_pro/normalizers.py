@@ -0,0 +1,45 @@
+from django.db.models import BooleanField, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+from bulgarian_meteo_pro.choices import StationStatusChoices
+from stations.normalizers import BaseRowNormalizer
+from stations.serializers import DefaultWeatherFields
+
+
+class BulgarianMeteoProDataNormalizer(BaseRowNormalizer):
+    fields = (
+        'station_id',
+        'city',
+        'latitude',
+        'longitude',
+        'temperature_celsius',
+        'humidity_percent',
+        'wind_speed_kph',
+        'station_status',
+        'timestamp',
+    )
+    metrics = {
+        'temperature_celsius': Cast('temperature_celsius', FloatField()),
+        'humidity_percent': Cast('humidity_percent', FloatField()),
+        'wind_speed_kph': Cast('wind_speed_kph', FloatField()),
+    }
+    columns = {
+        'station_id': F('station_id'),
+        'city': F('city'),
+        'latitude': F('latitude'),
+        'longitude': F('longitude'),
+        'timestamp': F('timestamp'),
+        'is_active': ExpressionWrapper(Q(station_status=StationStatusChoices.ACTIVE), output_field=BooleanField()),
+    }
+
+    def get_station_data(self, row) -> DefaultWeatherFields:
+        return {
+            'station_id': row['station_id'],
+            'city': row['city'],
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'temperature_celsius': row['temperature_celsius'],
+            'humidity_percent': row['humidity_percent'],
+            'wind_speed_kph': row['wind_speed_kph'],
+            'is_active': row['station_status'] == StationStatusChoices.ACTIVE,
+            'timestamp': row['timestamp'],
+        }
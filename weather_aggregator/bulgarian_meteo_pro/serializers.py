@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from bulgarian_meteo_pro.choices import StationStatusChoices
 from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from bulgarian_meteo_pro.normalizers import BulgarianMeteoProDataNormalizer
 from stations.serializers import BaseWeatherDataSerializer, DefaultWeatherFields
 
 
@@ -10,14 +10,4 @@ class BulgarianMeteoProDataSerializer(BaseWeatherDataSerializer, serializers.Mod
         exclude = ('raw_data', )
 
     def get_station_data(self, instance: BulgarianMeteoProData) -> DefaultWeatherFields:
-        return {
-            'station_id': instance.station_id,
-            'city': instance.city,
-            'latitude': instance.latitude,
-            'longitude': instance.longitude,
-            'temperature_celsius': instance.temperature_celsius,
-            'humidity_percent': instance.humidity_percent,
-            'wind_speed_kph': instance.wind_speed_kph,
-            'is_active': instance.station_status == StationStatusChoices.ACTIVE,
-            'timestamp': instance.timestamp,
-        }
+        return BulgarianMeteoProDataNormalizer().get_instance_station_data(instance)
@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('weather-data/', views.CreateWeatherDataView.as_view(), name='create_weather_data_bulgarian_meteo_pro'),
+    path('weather-data/batch/', views.BulkCreateWeatherDataView.as_view(), name='bulk_create_weather_data_bulgarian_meteo_pro'),
+    path('async/weather-data/', views.AsyncCreateWeatherDataView.as_view(), name='acreate_weather_data_bulgarian_meteo_pro'),
+    path('async/weather-data/batch/', views.AsyncBulkCreateWeatherDataView.as_view(), name='abulk_create_weather_data_bulgarian_meteo_pro'),
 ]
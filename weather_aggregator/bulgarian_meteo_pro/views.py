@@ -1,8 +1,9 @@
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiResponse
-from rest_framework.generics import CreateAPIView
-from stations.mixins import CreateStationMixin
-from weather_aggregator.utils import example_bad_request
+from rest_framework.generics import CreateAPIView, GenericAPIView
+from stations.async_views import AsyncBulkCreateStationView, AsyncCreateStationView
+from stations.mixins import BulkCreateStationMixin, CreateStationMixin
+from weather_aggregator.utils import example_bad_request, example_bulk_created
 from .models import BulgarianMeteoProData
 from .serializers import BulgarianMeteoProDataSerializer
 
@@ -11,6 +12,10 @@ from .serializers import BulgarianMeteoProDataSerializer
     request=BulgarianMeteoProDataSerializer,
     responses={
         201: BulgarianMeteoProDataSerializer,
+        202: OpenApiResponse(
+            description="Reading queued for storage, when the ingest queue is enabled",
+            response=OpenApiTypes.OBJECT,
+        ),
         400: OpenApiResponse(
             description="Validation Error",
             response=OpenApiTypes.OBJECT,
@@ -23,3 +28,40 @@ from .serializers import BulgarianMeteoProDataSerializer
 class CreateWeatherDataView(CreateStationMixin, CreateAPIView):
     queryset = BulgarianMeteoProData.objects.all()
     serializer_class = BulgarianMeteoProDataSerializer
+
+
+@extend_schema(
+    request=BulgarianMeteoProDataSerializer(many=True),
+    responses={
+        201: OpenApiResponse(
+            description="Batch stored, invalid items are reported by index",
+            response=OpenApiTypes.OBJECT,
+            examples=[
+                example_bulk_created,
+            ]
+        ),
+        202: OpenApiResponse(
+            description="Valid items queued for storage, when the ingest queue is enabled",
+            response=OpenApiTypes.OBJECT,
+        ),
+        400: OpenApiResponse(
+            description="No valid items in the batch",
+            response=OpenApiTypes.OBJECT,
+        ),
+        503: OpenApiResponse(
+            description="The ingest queue is full",
+            response=OpenApiTypes.OBJECT,
+        )
+    }
+)
+class BulkCreateWeatherDataView(BulkCreateStationMixin, GenericAPIView):
+    queryset = BulgarianMeteoProData.objects.all()
+    serializer_class = BulgarianMeteoProDataSerializer
+
+
+class AsyncCreateWeatherDataView(AsyncCreateStationView):
+    serializer_class = BulgarianMeteoProDataSerializer
+
+
+class AsyncBulkCreateWeatherDataView(AsyncBulkCreateStationView):
+    serializer_class = BulgarianMeteoProDataSerializer
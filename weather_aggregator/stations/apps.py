@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
 
 
 class StationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stations'
+
+    def ready(self):
+        from stations.metrics import instrument_connection
+
+        connection_created.connect(instrument_connection)
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(sender=None, connection=connection)
@@ -0,0 +1,162 @@
+import gzip
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from stations.partitions import add_months, month_start
+
+try:
+    import zstandard
+except ImportError:  # optional, the segments are gzip-compressed without it
+    zstandard = None
+
+SEGMENT_SUFFIXES = {
+    'zstd': '.jsonl.zst',
+    'gzip': '.jsonl.gz',
+}
+
+
+def default_compression():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(data, compression):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def decompress(data, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured("Reading zstd archive segments requires the `zstandard` package.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def get_archive_dir():
+    return Path(settings.WEATHER_ARCHIVE_DIR)
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)  # exact, unlike a JSON float
+    raise TypeError(f"Cannot archive a value of type {type(value).__name__}")
+
+
+def write_segment(path, rows, compression):
+    """
+    Writes the rows as one JSON document per line to the segment at `path`, relative to the archive directory.
+    The file appears under its name only once it is complete.
+    """
+    full_path = get_archive_dir() / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    data = b''.join(json.dumps(row, default=encode_value).encode() + b'\n' for row in rows)
+
+    temporary_path = full_path.with_name(f'.{full_path.name}.tmp')
+    with open(temporary_path, 'wb') as segment_file:
+        segment_file.write(compress(data, compression))
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+    os.replace(temporary_path, full_path)
+
+
+def archive_readings(queryset, timestamp_field, segment_size=10000, delete_batch_size=1000):
+    """
+    Moves the readings of the queryset into compressed JSONL segments under `WEATHER_ARCHIVE_DIR`, laid out as
+    `<app_label>.<model>/<YYYY-MM>/part-<first id>-<last id>.jsonl.<gz|zst>`, with at most `segment_size` readings each.
+    Every reading is indexed in `ArchivedReading` and deleted from the provider table in the same transaction,
+    so a reading is always either in the table or in the archive. Returns the number of archived readings.
+    """
+    from stations.models import ArchivedReading, ArchiveSegment  # stations.models imports this module through the managers
+
+    model_class = queryset.model
+    content_type = ContentType.objects.get_for_model(model_class)
+    fields = [field.attname for field in model_class._meta.concrete_fields]
+    compression = default_compression()
+    ordered = queryset.order_by(timestamp_field, 'id')
+    archived = 0
+
+    # The oldest remaining reading is looked up again after every segment, since the archived ones are deleted
+    while (oldest := ordered.values_list(timestamp_field, flat=True).first()) is not None:
+        month = month_start(oldest)
+        rows = list(
+            ordered.filter(**{f'{timestamp_field}__gte': month, f'{timestamp_field}__lt': add_months(month, 1)})
+            .values(*fields)[:segment_size]
+        )
+        path = (
+            f'{model_class._meta.label_lower}/{month:%Y-%m}/'
+            f'part-{rows[0]["id"]}-{rows[-1]["id"]}{SEGMENT_SUFFIXES[compression]}'
+        )
+        write_segment(path, rows, compression)
+
+        try:
+            with transaction.atomic():
+                segment = ArchiveSegment.objects.create(
+                    content_type=content_type,
+                    month=month.date(),
+                    path=path,
+                    compression=compression,
+                    reading_count=len(rows),
+                )
+                ArchivedReading.objects.bulk_create([
+                    ArchivedReading(
+                        segment=segment,
+                        content_type=content_type,
+                        object_id=row['id'],
+                        city_key=row['city_key'],
+                        timestamp=row[timestamp_field],
+                        line=line,
+                    )
+                    for line, row in enumerate(rows)
+                ])
+                ids = [row['id'] for row in rows]
+                for start in range(0, len(ids), delete_batch_size):
+                    model_class.objects.filter(id__in=ids[start:start + delete_batch_size]).delete()
+        except Exception:
+            (get_archive_dir() / path).unlink(missing_ok=True)
+            raise
+
+        archived += len(rows)
+
+    return archived
+
+
+class ArchiveReader:
+    """
+    Loads archived readings of one provider model from their segments. The last `max_segments` segments read stay
+    decompressed in memory, which serves history pages: their readings are ordered by timestamp, so they mostly
+    come from one or two monthly segments.
+    """
+
+    def __init__(self, model_class, max_segments=4):
+        self.fields = model_class._meta.concrete_fields
+        self.max_segments = max_segments
+        self._segments = OrderedDict()
+
+    def get_row(self, path, compression, line):
+        """
+        Returns the archived reading on line `line` of a segment as the `values()` row it was archived from.
+        """
+        lines = self._segments.get(path)
+        if lines is None:
+            with open(get_archive_dir() / path, 'rb') as segment_file:
+                lines = decompress(segment_file.read(), compression).splitlines()
+
+            self._segments[path] = lines
+            if len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+        else:
+            self._segments.move_to_end(path)
+
+        document = json.loads(lines[line])
+        return {field.attname: field.to_python(document[field.attname]) for field in self.fields}
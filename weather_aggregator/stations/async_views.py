@@ -0,0 +1,215 @@
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
+from stations.cache import city_weather_cache
+from stations.idempotency import (
+    IDEMPOTENCY_KEY_HEADER, KEY_IN_USE, get_key_error, get_replay, idempotency_key_store
+)
+from stations.ingest import IngestQueueFull, astore_readings, get_ingest_queue
+from stations.mixins import validate_batch
+from stations.models import Station
+from stations.parsers import NDJSONParser, loads
+from stations.renderers import get_json_renderer
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        get_json_renderer().render(data), status=status, headers=headers, content_type='application/json'
+    )
+
+
+@require_GET
+async def get_aggregated_weather_data(request, city_name):
+    """
+    ASGI-native version of `views.get_aggregated_weather_data` for the latest reading of every station in the city.
+    History pages, streams and statistics stay on the DRF views.
+    """
+    return_raw_data = request.GET.get('raw', 'false').lower() == 'true'
+
+    aggregated_data = await city_weather_cache.aget(city_name, return_raw_data)
+    cache_status = 'HIT'
+
+    if aggregated_data is None:
+        aggregated_data = await Station.objects.aget_aggregated_weather_data(city_name, return_raw_data)
+        cache_status = 'MISS'
+
+        if aggregated_data:
+            await city_weather_cache.aset(city_name, return_raw_data, aggregated_data)
+
+    if not aggregated_data:
+        return json_response(
+            {"message": "No weather stations found for the specified city."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return json_response(aggregated_data, headers={'X-Cache': cache_status})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCreateStationView(View):
+    """
+    ASGI-native counterpart of a `CreateStationMixin` view: validates a JSON reading with `serializer_class`
+    and stores it with `astore_readings`, or queues it when the ingest queue is enabled. Honors `Idempotency-Key`.
+    """
+    http_method_names = ['post']
+    serializer_class = None  # Must be specified in the view
+    station_type = None
+
+    def get_station_type(self):
+        return self.station_type or self.serializer_class.Meta.model._meta.model_name
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(*args, **kwargs)
+
+    def parse(self, request):
+        try:
+            return loads(request.body)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+    async def post(self, request, *args, **kwargs):
+        return await self.idempotent(request, lambda: self.create_or_enqueue(request, *args, **kwargs))
+
+    async def idempotent(self, request, handler):
+        """
+        Async version of `IdempotentMixin.idempotent`, `handler` returns the awaitable of the response.
+        """
+        idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not idempotency_key:
+            return await handler()
+
+        key_error = get_key_error(idempotency_key)
+        if key_error is not None:
+            return json_response(key_error[1], status=key_error[0])
+
+        fingerprint = idempotency_key_store.fingerprint(request.body)
+        stored = await idempotency_key_store.aget(request.path, idempotency_key)
+        if stored is not None:
+            return self.replay_response(stored, fingerprint)
+
+        if not await idempotency_key_store.alock(request.path, idempotency_key):
+            return json_response(KEY_IN_USE[1], status=KEY_IN_USE[0], headers={'Retry-After': '1'})
+
+        try:
+            # The first request may have finished between the lookup and the lock
+            stored = await idempotency_key_store.aget(request.path, idempotency_key)
+            if stored is not None:
+                return self.replay_response(stored, fingerprint)
+
+            response = await handler()
+            if response.status_code < 500:
+                await idempotency_key_store.aset(
+                    request.path, idempotency_key, fingerprint, response.status_code, loads(response.content)
+                )
+        finally:
+            await idempotency_key_store.aunlock(request.path, idempotency_key)
+
+        return response
+
+    @staticmethod
+    def replay_response(stored, fingerprint):
+        replay_status, data = get_replay(stored, fingerprint)
+        return json_response(data, status=replay_status, headers={'Idempotent-Replayed': 'true'})
+
+    async def create_or_enqueue(self, request, *args, **kwargs):
+        try:
+            data = self.parse(request)
+        except ParseError as exc:
+            return json_response({"detail": exc.detail}, status=exc.status_code)
+
+        serializer = self.get_serializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ingest_queue = get_ingest_queue()
+        if ingest_queue is not None:
+            if not await self.enqueue(ingest_queue, [serializer]):
+                return self.queue_full_response()
+            return json_response({"message": "Reading queued for storage."}, status=status.HTTP_202_ACCEPTED)
+
+        serializer.instance, = await astore_readings(self.get_station_type(), [serializer])
+        return json_response(serializer.data, status=status.HTTP_201_CREATED)
+
+    async def enqueue(self, ingest_queue, serializers):
+        """
+        Queues the readings of the serializers. Returns `False` when the queue is full.
+        """
+        try:
+            await sync_to_async(ingest_queue.enqueue)(
+                self.serializer_class.Meta.model._meta.label_lower,
+                self.get_station_type(),
+                [serializer.initial_data for serializer in serializers]
+            )
+        except IngestQueueFull:
+            return False
+        return True
+
+    @staticmethod
+    def queue_full_response():
+        return json_response(
+            {"message": "The ingest queue is full, retry later."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
+        )
+
+
+class AsyncBulkCreateStationView(AsyncCreateStationView):
+    """
+    ASGI-native counterpart of a `BulkCreateStationMixin` view, for a JSON array or NDJSON body.
+    The batch is written with one `INSERT`.
+    """
+    max_batch_size = 1000
+
+    def parse(self, request):
+        if request.content_type == NDJSONParser.media_type:
+            return NDJSONParser().parse(
+                BytesIO(request.body),
+                parser_context={'encoding': request.encoding or settings.DEFAULT_CHARSET}
+            )
+        return super().parse(request)
+
+    async def create_or_enqueue(self, request, *args, **kwargs):
+        try:
+            items = self.parse(request)
+        except ParseError as exc:
+            return json_response({"detail": exc.detail}, status=exc.status_code)
+
+        if not isinstance(items, list) or not items:
+            return json_response(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Expected a non-empty list of items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(items) > self.max_batch_size:
+            return json_response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [f"Ensure the batch has no more than {self.max_batch_size} items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        valid_serializers, errors = validate_batch(self.get_serializer, items)
+
+        ingest_queue = get_ingest_queue()
+        if valid_serializers and ingest_queue is not None:
+            if not await self.enqueue(ingest_queue, valid_serializers):
+                return self.queue_full_response()
+            return json_response(
+                {'queued': len(valid_serializers), 'errors': errors},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        if valid_serializers:
+            await astore_readings(self.get_station_type(), valid_serializers)
+
+        return json_response(
+            {'created': len(valid_serializers), 'errors': errors},
+            status=status.HTTP_201_CREATED if valid_serializers else status.HTTP_400_BAD_REQUEST
+        )
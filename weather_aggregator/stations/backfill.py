@@ -0,0 +1,225 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.db import connection, models, transaction
+from rest_framework.exceptions import ValidationError
+from stations.ingest import deduplicate_readings, get_stored_readings, insert_new_readings, set_inserted_ids
+from stations.models import Station
+from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING
+from weather_aggregator.utils import make_city_key
+
+BACKFILL_SUFFIXES = ('.ndjson', '.jsonl', '.csv')
+MAX_REPORTED_ERRORS = 10
+
+
+def get_file_format(path):
+    """
+    Returns `ndjson` or `csv` for a backfill file by its extension, which may be followed by `.gz`.
+    Raises `ValueError` for other files.
+    """
+    name = str(path).lower().removesuffix('.gz')
+    for suffix in BACKFILL_SUFFIXES:
+        if name.endswith(suffix):
+            return 'csv' if suffix == '.csv' else 'ndjson'
+    raise ValueError(f"{path} is not an NDJSON or CSV file ({', '.join(BACKFILL_SUFFIXES)}, optionally gzipped).")
+
+
+def open_text(path):
+    if str(path).lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_payloads(path, serializer_class):
+    """
+    Yields `(line number, payload)` for every reading of a backfill file in the provider's native format, with
+    `None` as the payload of lines that are not a JSON object. NDJSON files hold one payload per line. CSV files
+    have a header row naming the payload paths with dots (`location.city_name`), empty cells are left out of the
+    payload and cells of numeric model fields are read as JSON numbers, so the payload is the one the API receives.
+    """
+    numeric_paths = get_numeric_paths(serializer_class)
+
+    with open_text(path) as backfill_file:
+        if get_file_format(path) == 'ndjson':
+            for line_number, line in enumerate(backfill_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    payload = None
+                yield line_number, payload if isinstance(payload, dict) else None
+            return
+
+        reader = csv.reader(backfill_file)
+        header = [tuple(column.split('.')) for column in next(reader, [])]
+        for row in reader:
+            yield reader.line_num, csv_payload(header, row, numeric_paths)
+
+
+def get_numeric_paths(serializer_class):
+    model_class = serializer_class.Meta.model
+    return {
+        path for path, field_name in serializer_class.get_raw_data_fields().items()
+        if isinstance(model_class._meta.get_field(field_name), (models.DecimalField, models.FloatField, models.IntegerField))
+    }
+
+
+def csv_payload(header, row, numeric_paths):
+    payload = {}
+    for path, cell in zip(header, row):
+        if cell == '':
+            continue
+
+        value = cell
+        if path in numeric_paths:
+            try:
+                value = json.loads(cell)
+            except ValueError:
+                pass  # left to the serializer to reject
+
+        parent = payload
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+
+    return payload
+
+
+def build_reading(serializer, payload):
+    """
+    Validates a payload with the provider serializer and returns the unsaved instance stored for it on ingest.
+    Raises `ValidationError` for invalid payloads.
+    """
+    validated_data = serializer.run_validation(payload)
+    return serializer.Meta.model(
+        **validated_data,
+        raw_data=serializer.get_raw_data(payload, validated_data),
+        city_key=make_city_key(validated_data.get(serializer.city_field)),
+    )
+
+
+def copy_value(field, value):
+    """
+    Returns the value in the text format of `COPY`.
+    """
+    if value is None:
+        return r'\N'
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value)
+    elif isinstance(value, bool):
+        value = 't' if value else 'f'
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_from(cursor, sql, data):
+    driver_cursor = cursor.cursor  # below Django's cursor wrapper
+    if hasattr(driver_cursor, 'copy_expert'):  # psycopg2
+        driver_cursor.copy_expert(sql, io.StringIO(data))
+    else:  # psycopg 3
+        with driver_cursor.copy(sql) as copy:
+            copy.write(data)
+
+
+def copy_readings(serializer_class, instances):
+    """
+    Inserts the readings with `COPY` into a temporary table and one `INSERT ... SELECT ... ON CONFLICT DO NOTHING`
+    from it, which skips the readings whose station and timestamp are stored. Sets the ids of the inserted
+    instances and returns them. PostgreSQL only, inside a transaction.
+    """
+    model_class = serializer_class.Meta.model
+    quote = connection.ops.quote_name
+    fields = [field for field in model_class._meta.concrete_fields if not field.primary_key]
+    columns = ', '.join(quote(field.column) for field in fields)
+    key_columns = ', '.join(
+        quote(model_class._meta.get_field(name).column)
+        for name in (serializer_class.station_id_field, serializer_class.timestamp_field)
+    )
+    table, staging = quote(model_class._meta.db_table), quote(f'{model_class._meta.db_table}_backfill')
+
+    data = ''.join(
+        '\t'.join(copy_value(field, getattr(instance, field.attname)) for field in fields) + '\n'
+        for instance in instances
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+        copy_from(cursor, f"COPY {staging} ({columns}) FROM STDIN", data)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+            f"ON CONFLICT ({key_columns}) DO NOTHING RETURNING {quote(model_class._meta.pk.column)}, {key_columns}"
+        )
+        rows = cursor.fetchall()
+        cursor.execute(f"DROP TABLE {staging}")
+
+    return set_inserted_ids(serializer_class, instances, rows)
+
+
+def store_backfill_batch(serializer, instances, use_copy):
+    """
+    Stores a batch of readings of one provider in a single transaction, with `COPY` or an `INSERT`, and records
+    the new ones on their stations. Readings already stored, or earlier in the batch, are skipped.
+    Returns the number of stored readings.
+    """
+    serializer_class = type(serializer)
+    model_class = serializer_class.Meta.model
+
+    with transaction.atomic():
+        if use_copy:
+            _, new_readings = deduplicate_readings(serializer_class, [(instance, serializer) for instance in instances], [])
+            stored = copy_readings(serializer_class, [instance for instance, _ in new_readings])
+        else:
+            _, new_readings = deduplicate_readings(
+                serializer_class,
+                [(instance, serializer) for instance in instances],
+                get_stored_readings(serializer_class, instances)
+            )
+            stored = insert_new_readings(serializer_class, [instance for instance, _ in new_readings])
+
+        if stored:
+            Station.objects.record_readings(
+                model_class._meta.model_name, [(instance, serializer.get_station_data(instance)) for instance in stored]
+            )
+
+    return len(stored)
+
+
+def import_file(path, provider, batch_size=5000, use_copy=None):
+    """
+    Validates and stores the readings of a backfill file in the native format of a provider (a `SERIALIZER_MAPPING`
+    key), in batches of `batch_size` readings, with `COPY` on PostgreSQL and a multi-row `INSERT` on other databases.
+    Invalid readings are skipped. Running it again for the same file stores nothing twice.
+    Returns `{'path', 'read', 'stored', 'invalid', 'errors'}`, with the errors of the first invalid readings.
+    """
+    serializer = SERIALIZER_MAPPING[provider]()
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+
+    result = {'path': str(path), 'read': 0, 'stored': 0, 'invalid': 0, 'errors': []}
+
+    payloads = read_payloads(path, type(serializer))
+    while batch := list(islice(payloads, batch_size)):
+        instances = []
+        for line_number, payload in batch:
+            try:
+                if payload is None:
+                    raise ValidationError("Not a JSON object.")
+                instances.append(build_reading(serializer, payload))
+            except ValidationError as exc:
+                result['invalid'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append(f"{path}:{line_number}: {json.dumps(exc.detail)}")
+
+        result['read'] += len(batch)
+        if instances:
+            result['stored'] += store_backfill_batch(serializer, instances, use_copy)
+
+    return result
@@ -0,0 +1,178 @@
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import Callable, NamedTuple, Optional
+
+from django.db import connection
+from django.shortcuts import resolve_url
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from stations.cache import city_weather_cache
+from stations.seed import CITIES, PROVIDERS, generate_payloads
+
+BENCHMARK_CITY = 'Sofia'
+
+# Payloads posted by the ingest scenarios start after the seeded readings, so they always move the station pointers
+INGEST_START = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+class Scenario(NamedTuple):
+    name: str
+    request: Callable  # performs one request and returns the response
+    prepare: Optional[Callable] = None  # runs before every request, outside the measurements
+
+
+def percentile(timings, percent):
+    if len(timings) == 1:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method='inclusive')[percent - 1]
+
+
+def build_scenarios(client: APIClient, batch_size=100):
+    """
+    Returns the benchmark scenarios: single and batch ingest of both providers, the city read path in normalized
+    and raw form, a history page, the statistics, every seeded city at once and the nearby stations lookup.
+    """
+    scenarios = []
+
+    for provider in PROVIDERS:
+        model_class, app_label = provider[0], provider[0]._meta.app_label
+        payloads = (
+            payload for _, _, payload in generate_payloads(
+                1, 10 ** 9, cities=[BENCHMARK_CITY], start=INGEST_START, random_seed=1, providers=[provider]
+            )
+        )
+        batch_numbers = count()
+
+        def post_single(app_label=app_label, payloads=payloads):
+            return client.post(resolve_url(f'create_weather_data_{app_label}'), next(payloads), format='json')
+
+        def post_batch(provider=provider, app_label=app_label, batch_numbers=batch_numbers):
+            batch_number = next(batch_numbers)
+            batch = [
+                payload for _, _, payload in generate_payloads(
+                    batch_size, 1, cities=[BENCHMARK_CITY], start=INGEST_START + timedelta(minutes=batch_number),
+                    random_seed=batch_number, providers=[provider]
+                )
+            ]
+            return client.post(resolve_url(f'bulk_create_weather_data_{app_label}'), batch, format='json')
+
+        scenarios.append(Scenario(f'post_single_{model_class._meta.model_name}', post_single))
+        scenarios.append(Scenario(f'post_batch_{model_class._meta.model_name}', post_batch))
+
+    city_url = resolve_url('get_city_weather_data', city_name=BENCHMARK_CITY)
+    latitude, longitude = CITIES[BENCHMARK_CITY]
+
+    scenarios += [
+        Scenario('city_normalized', lambda: client.get(city_url), city_weather_cache.clear),
+        Scenario('city_raw', lambda: client.get(city_url, {'raw': 'true'}), city_weather_cache.clear),
+        Scenario('city_history_page', lambda: client.get(city_url, {'limit': 100})),
+        Scenario(
+            'city_statistics',
+            lambda: client.get(
+                resolve_url('get_city_weather_statistics', city_name=BENCHMARK_CITY),
+                {'bucket': 'day', 'group_by': 'station'}
+            )
+        ),
+        Scenario(
+            'cities_normalized',
+            lambda: client.get(resolve_url('get_cities_weather_data'), {'cities': list(CITIES)})
+        ),
+        Scenario(
+            'stations_nearby',
+            lambda: client.get(resolve_url('get_nearby_stations'), {'lat': latitude, 'lon': longitude, 'radius_km': 25})
+        ),
+    ]
+
+    return scenarios
+
+
+def run_scenario(scenario: Scenario, repeat, warmup=3, probes=3):
+    """
+    Measures a scenario: latency percentiles over `repeat` requests, then the queries and the peak traced memory
+    of `probes` more requests, which are kept apart so query capture and tracing do not skew the timings.
+    """
+    def call():
+        if scenario.prepare is not None:
+            scenario.prepare()
+        response = scenario.request()
+        if response.status_code >= 300:
+            raise RuntimeError(f"{scenario.name} answered {response.status_code}: {response.content[:200]!r}")
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    for _ in range(repeat):
+        if scenario.prepare is not None:
+            scenario.prepare()
+        started = time.perf_counter()
+        response = scenario.request()
+        timings.append(time.perf_counter() - started)
+        if response.status_code >= 300:
+            raise RuntimeError(f"{scenario.name} answered {response.status_code}: {response.content[:200]!r}")
+
+    queries = []
+    for _ in range(probes):
+        with CaptureQueriesContext(connection) as captured:
+            call()
+        queries.append(len(captured.captured_queries))
+
+    peaks = []
+    for _ in range(probes):
+        if scenario.prepare is not None:
+            scenario.prepare()
+        tracemalloc.start()
+        try:
+            scenario.request()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'queries': max(queries),
+        'peak_kib': round(max(peaks) / 1024, 1),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Returns the regressions of `results` against the `baseline` results of the same database: a p95 latency or a peak
+    memory more than `tolerance` above the baseline, or more queries per request.
+    """
+    regressions = []
+
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        for metric in ('p95_ms', 'peak_kib'):
+            if result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {result[metric]} > {expected[metric]} (+{tolerance:.0%})")
+
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: queries {result['queries']} > {expected['queries']}")
+
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, baselines):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
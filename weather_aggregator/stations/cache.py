@@ -0,0 +1,123 @@
+import threading
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from weather_aggregator.utils import make_city_key
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+PROCESS_LOCAL_NOTICE = (
+    "The weather cache is local to each process, so web processes keep serving the cities they cached "
+    "until WEATHER_CACHE_TIMEOUT. Set WEATHER_CACHE_BACKEND to a shared cache to invalidate them."
+)
+
+
+class CityWeatherCache:
+    """
+    Per-city cache of the aggregated (latest reading per station) weather data, in the normalized and raw formats,
+    and of its conditional GET validator.
+    Entries expire after the cache alias' TIMEOUT and are evicted least recently used first once MAX_ENTRIES is reached.
+    Ingest invalidates the cities whose stations moved to a new reading. With a process-local backend such as the
+    default LocMemCache, that only reaches the cache of the process that stored the readings, see `shared`.
+    """
+    key_prefix = 'city-weather'
+
+    def __init__(self, alias='weather'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def shared(self):
+        """
+        Whether all processes use the same cache, so invalidations and `clear()` reach the entries they read.
+        """
+        return settings.CACHES[self.alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'WEATHER_CACHE_ENABLED', True)
+
+    def make_key(self, city_name, return_raw_data):
+        return f"{self.key_prefix}:{'raw' if return_raw_data else 'normalized'}:{quote(make_city_key(city_name))}"
+
+    def make_validator_key(self, city_name):
+        return f"{self.key_prefix}:validator:{quote(make_city_key(city_name))}"
+
+    def get(self, city_name, return_raw_data):
+        if not self.enabled:
+            return None
+
+        data = self.cache.get(self.make_key(city_name, return_raw_data))
+        with self._lock:
+            if data is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        return data
+
+    def set(self, city_name, return_raw_data, data):
+        if self.enabled:
+            self.cache.set(self.make_key(city_name, return_raw_data), data)
+
+    def get_validator(self, city_name):
+        """
+        Returns the cached conditional GET validator of the city, see `StationManager.get_city_validator`.
+        """
+        if not self.enabled:
+            return None
+        return self.cache.get(self.make_validator_key(city_name))
+
+    def set_validator(self, city_name, validator):
+        if self.enabled:
+            self.cache.set(self.make_validator_key(city_name), validator)
+
+    async def aget(self, city_name, return_raw_data):
+        if not self.enabled:
+            return None
+
+        data = await self.cache.aget(self.make_key(city_name, return_raw_data))
+        with self._lock:
+            if data is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        return data
+
+    async def aset(self, city_name, return_raw_data, data):
+        if self.enabled:
+            await self.cache.aset(self.make_key(city_name, return_raw_data), data)
+
+    def invalidate(self, city_names):
+        """
+        Drops the cached data of the cities right away and once more after the current transaction commits,
+        so a request that read the old rows before the commit cannot leave them in the cache.
+        """
+        keys = [
+            key
+            for city_name in set(city_names) if city_name
+            for key in (self.make_key(city_name, False), self.make_key(city_name, True), self.make_validator_key(city_name))
+        ]
+        if not keys or not self.enabled:
+            return
+
+        self.cache.delete_many(keys)
+        transaction.on_commit(lambda: self.cache.delete_many(keys))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses}
+
+
+city_weather_cache = CityWeatherCache()
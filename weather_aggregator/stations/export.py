@@ -0,0 +1,131 @@
+import csv
+import io
+from decimal import Decimal
+
+from stations.raw_data import encode_column
+from stations.serializers import DEFAULT_WEATHER_FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional, exports are CSV only without it
+    pyarrow = None
+
+# Columns of an export, the provider model name followed by the normalized weather fields
+EXPORT_COLUMNS = ('provider', *DEFAULT_WEATHER_FIELDS)
+
+
+def encode_metric(value):
+    """
+    Returns a normalized field value as exported: decimals as floats, like the database computes the provider metrics.
+    """
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def get_export_schema():
+    return pyarrow.schema([
+        ('provider', pyarrow.string()),
+        ('station_id', pyarrow.string()),
+        ('city', pyarrow.string()),
+        ('latitude', pyarrow.float64()),
+        ('longitude', pyarrow.float64()),
+        ('temperature_celsius', pyarrow.float64()),
+        ('humidity_percent', pyarrow.float64()),
+        ('wind_speed_kph', pyarrow.float64()),
+        ('pressure_hpa', pyarrow.float64()),
+        ('uv_index', pyarrow.int64()),
+        ('timestamp', pyarrow.timestamp('us', tz='UTC')),
+        ('is_active', pyarrow.bool_()),
+    ])
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting what a pyarrow writer wrote since the last `pop`, so the file can be streamed as it grows.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def csv_export(batches):
+    """
+    Yields a CSV file with a header row, one chunk per batch. Timestamps are in ISO 8601 UTC with `Z`,
+    missing values are empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+
+    for columns in batches:
+        columns['timestamp'] = [encode_column(timestamp) for timestamp in columns['timestamp']]
+        writer.writerows(zip(*(columns[column] for column in EXPORT_COLUMNS)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+def arrow_export(batches):
+    """
+    Yields an Arrow IPC stream, one record batch per batch.
+    """
+    sink = ChunkSink()
+    schema = get_export_schema()
+
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for columns in batches:
+            writer.write_batch(pyarrow.RecordBatch.from_pydict(columns, schema=schema))
+            yield sink.pop()
+
+    yield sink.pop()
+
+
+def parquet_export(batches):
+    """
+    Yields a Parquet file, one row group per batch.
+    """
+    sink = ChunkSink()
+    schema = get_export_schema()
+
+    with pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for columns in batches:
+            writer.write_batch(pyarrow.RecordBatch.from_pydict(columns, schema=schema))
+            yield sink.pop()
+
+    yield sink.pop()
+
+
+# `{format: (export, content type, file extension)}`
+EXPORT_FORMATS = {
+    'csv': (csv_export, 'text/csv', 'csv'),
+    'parquet': (parquet_export, 'application/vnd.apache.parquet', 'parquet'),
+    'arrow': (arrow_export, 'application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def get_export_formats():
+    """
+    Returns the names of the formats available for exports: Parquet and Arrow need the `pyarrow` package.
+    """
+    return [name for name in EXPORT_FORMATS if name == 'csv' or pyarrow is not None]
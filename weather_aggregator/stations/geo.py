@@ -0,0 +1,45 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.195
+
+# Size of the grid cells stations are indexed by. Changing it requires `manage.py backfill_station_locations`.
+GRID_CELL_DEGREES = 0.1
+
+
+def grid_cell(latitude, longitude):
+    """
+    Returns the `(cell_lat, cell_lon)` grid cell of a point, or `(None, None)` without coordinates.
+    """
+    if latitude is None or longitude is None:
+        return None, None
+
+    return math.floor(latitude / GRID_CELL_DEGREES), math.floor(longitude / GRID_CELL_DEGREES)
+
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    delta_phi = other_phi - phi
+    delta_lambda = math.radians(other_longitude - longitude)
+
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi) * math.cos(other_phi) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bounding_box(latitude, longitude, radius_km):
+    """
+    Returns `(min_lat, min_lon, max_lat, max_lon)` of a box containing every point within `radius_km` of the point.
+    """
+    delta_latitude = radius_km / KM_PER_DEGREE_LATITUDE
+    min_latitude = max(latitude - delta_latitude, -90.0)
+    max_latitude = min(latitude + delta_latitude, 90.0)
+
+    widest_latitude = max(abs(min_latitude), abs(max_latitude))
+    if widest_latitude >= 90.0:
+        return min_latitude, -180.0, max_latitude, 180.0
+
+    delta_longitude = radius_km / (KM_PER_DEGREE_LATITUDE * math.cos(math.radians(widest_latitude)))
+    return min_latitude, max(longitude - delta_longitude, -180.0), max_latitude, min(longitude + delta_longitude, 180.0)
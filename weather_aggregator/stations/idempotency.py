@@ -0,0 +1,97 @@
+import hashlib
+
+from django.core.cache import caches
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class IdempotencyKeyStore:
+    """
+    Stores the responses of ingest requests sent with an `Idempotency-Key` header, by request path and key, so a
+    retried request is answered with the stored response instead of being processed again. Responses expire after
+    the cache alias' TIMEOUT. While a request is processed its key is locked, so a concurrent retry is refused
+    instead of processed twice.
+    """
+    key_prefix = 'idempotency'
+    lock_timeout = 60  # seconds, outlives any ingest request
+
+    def __init__(self, alias='idempotency'):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, path, idempotency_key):
+        digest = hashlib.sha256(f'{path}\n{idempotency_key}'.encode()).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def make_lock_key(self, path, idempotency_key):
+        return f'{self.make_key(path, idempotency_key)}:lock'
+
+    @staticmethod
+    def fingerprint(body):
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, path, idempotency_key):
+        """
+        Returns the stored `{'fingerprint', 'status', 'data'}` of the key, or `None`.
+        """
+        return self.cache.get(self.make_key(path, idempotency_key))
+
+    def lock(self, path, idempotency_key):
+        """
+        Locks the key for a request. Returns `False` if another request holds it.
+        """
+        return self.cache.add(self.make_lock_key(path, idempotency_key), True, timeout=self.lock_timeout)
+
+    def unlock(self, path, idempotency_key):
+        self.cache.delete(self.make_lock_key(path, idempotency_key))
+
+    def set(self, path, idempotency_key, fingerprint, status, data):
+        self.cache.set(
+            self.make_key(path, idempotency_key),
+            {'fingerprint': fingerprint, 'status': status, 'data': data}
+        )
+
+    async def aget(self, path, idempotency_key):
+        return await self.cache.aget(self.make_key(path, idempotency_key))
+
+    async def alock(self, path, idempotency_key):
+        return await self.cache.aadd(self.make_lock_key(path, idempotency_key), True, timeout=self.lock_timeout)
+
+    async def aunlock(self, path, idempotency_key):
+        await self.cache.adelete(self.make_lock_key(path, idempotency_key))
+
+    async def aset(self, path, idempotency_key, fingerprint, status, data):
+        await self.cache.aset(
+            self.make_key(path, idempotency_key),
+            {'fingerprint': fingerprint, 'status': status, 'data': data}
+        )
+
+
+idempotency_key_store = IdempotencyKeyStore()
+
+
+def get_replay(stored, fingerprint):
+    """
+    Returns `(status, data)` of the answer to a request whose key has a stored response: the stored response,
+    or a 422 error if the key was used for a different request body.
+    """
+    if stored['fingerprint'] != fingerprint:
+        return 422, {"message": f"The {IDEMPOTENCY_KEY_HEADER} was already used for a different request body."}
+    return stored['status'], stored['data']
+
+
+def get_key_error(idempotency_key):
+    """
+    Returns `(status, data)` of a 400 error for an invalid key, or `None` for a valid one.
+    """
+    if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return 400, {"message": f"The {IDEMPOTENCY_KEY_HEADER} must have at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters."}
+    return None
+
+
+# Answer to a retry while the first request with its key is still processed
+KEY_IN_USE = (409, {"message": f"A request with this {IDEMPOTENCY_KEY_HEADER} is being processed, retry later."})
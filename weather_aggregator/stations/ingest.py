@@ -0,0 +1,473 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from stations.models import QueuedReading, Station
+from weather_aggregator.serializers_mapping import WeatherSerializerFactory
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+def get_reading_key(serializer_class, instance):
+    """
+    Returns the `(station identifier, timestamp)` that identifies a reading of the provider, unique in its table.
+    """
+    return getattr(instance, serializer_class.station_id_field), getattr(instance, serializer_class.timestamp_field)
+
+
+def get_stored_readings(serializer_class, instances):
+    """
+    Returns the queryset of the stored readings that may share a key with the instances, a superset of them.
+    """
+    return serializer_class.Meta.model.objects.filter(**{
+        f'{serializer_class.station_id_field}__in': {get_reading_key(serializer_class, instance)[0] for instance in instances},
+        f'{serializer_class.timestamp_field}__in': {get_reading_key(serializer_class, instance)[1] for instance in instances},
+    }).order_by()
+
+
+def deduplicate_readings(serializer_class, readings, stored):
+    """
+    Takes `(unsaved instance, serializer)` pairs and returns `(instances, new_readings)`: for every pair the stored
+    reading with its key, from `stored` or earlier in the batch, and the pairs of the distinct new readings.
+    """
+    instances_by_key = {get_reading_key(serializer_class, instance): instance for instance in stored}
+    instances, new_readings = [], []
+
+    for instance, serializer in readings:
+        key = get_reading_key(serializer_class, instance)
+
+        if key not in instances_by_key:
+            instances_by_key[key] = instance
+            new_readings.append((instance, serializer))
+        instances.append(instances_by_key[key])
+
+    return instances, new_readings
+
+
+def _from_db(field, value):
+    """
+    Converts a value of the field read with a raw cursor like the ORM does, e.g. SQLite datetimes from text.
+    """
+    column = field.get_col(field.model._meta.db_table)
+    for converter in connection.ops.get_db_converters(column) + column.get_db_converters(connection):
+        value = converter(value, column, connection)
+    return value
+
+
+def set_inserted_ids(serializer_class, instances, rows):
+    """
+    Sets the ids of the instances from `(id, station identifier, timestamp)` rows returned by an insert and returns
+    the inserted instances. Instances without a returned row keep `id = None`.
+    """
+    opts = serializer_class.Meta.model._meta
+    station_field, timestamp_field = (
+        opts.get_field(serializer_class.station_id_field), opts.get_field(serializer_class.timestamp_field)
+    )
+    ids = {
+        (_from_db(station_field, station_id), _from_db(timestamp_field, timestamp)): reading_id
+        for reading_id, station_id, timestamp in rows
+    }
+
+    inserted = []
+    for instance in instances:
+        instance.id = ids.get(get_reading_key(serializer_class, instance))
+        if instance.id is not None:
+            instance._state.adding, instance._state.db = False, connection.alias
+            inserted.append(instance)
+
+    return inserted
+
+
+def insert_new_readings(serializer_class, instances):
+    """
+    Inserts the readings with `INSERT ... ON CONFLICT (station, timestamp) DO NOTHING RETURNING`, which skips
+    the readings whose station and timestamp are stored, such as a retry that a concurrent request stored first.
+    Sets the ids of the inserted instances and returns them: only those are new and may be recorded.
+    """
+    model_class = serializer_class.Meta.model
+    opts = model_class._meta
+    quote = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    columns = ', '.join(quote(field.column) for field in fields)
+    key_columns = ', '.join(
+        quote(opts.get_field(name).column) for name in (serializer_class.station_id_field, serializer_class.timestamp_field)
+    )
+    row_placeholder = f"({', '.join(['%s'] * len(fields))})"
+    batch_size = connection.ops.bulk_batch_size(fields, instances) or len(instances)
+
+    rows = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(instances), batch_size):
+            batch = instances[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {', '.join([row_placeholder] * len(batch))} "
+                f"ON CONFLICT ({key_columns}) DO NOTHING RETURNING {quote(opts.pk.column)}, {key_columns}",
+                [field.get_db_prep_save(field.pre_save(instance, True), connection) for instance in batch for field in fields]
+            )
+            rows.extend(cursor.fetchall())
+
+    return set_inserted_ids(serializer_class, instances, rows)
+
+
+def _with_stored(serializer_class, instances):
+    """
+    Replaces the instances a concurrent request stored first, left without id by `insert_new_readings`,
+    with the stored readings.
+    """
+    lost = [instance for instance in instances if instance.id is None]
+    if not lost:
+        return instances
+
+    stored = {
+        get_reading_key(serializer_class, instance): instance for instance in get_stored_readings(serializer_class, lost)
+    }
+    return [
+        instance if instance.id is not None else stored.get(get_reading_key(serializer_class, instance), instance)
+        for instance in instances
+    ]
+
+
+def store_readings(station_type, serializers):
+    """
+    Stores the validated readings of one provider with one `INSERT` and one `record_readings` call,
+    in a single transaction. A reading whose station and timestamp are already stored, such as a retried one,
+    is not stored or recorded again, even when a concurrent request stores it first. Returns the instances
+    in the order of the serializers, the stored ones for the readings that were already there.
+    """
+    instances, _ = _store_readings(station_type, serializers)
+    return instances
+
+
+def _store_readings(station_type, serializers):
+    """
+    `store_readings`, also returning the instances it inserted.
+    """
+    serializer_class = type(serializers[0])
+
+    readings = [(serializer.build_instance(), serializer) for serializer in serializers]
+
+    with transaction.atomic():
+        instances, new_readings = deduplicate_readings(
+            serializer_class, readings, get_stored_readings(serializer_class, [instance for instance, _ in readings])
+        )
+        if not new_readings:
+            return instances, []
+
+        inserted = insert_new_readings(serializer_class, [instance for instance, _ in new_readings])
+        if inserted:
+            Station.objects.record_readings(
+                station_type,
+                [(instance, serializer.get_station_data(instance)) for instance, serializer in new_readings
+                 if instance.id is not None]
+            )
+
+        return _with_stored(serializer_class, instances), inserted
+
+
+async def astore_readings(station_type, serializers):
+    """
+    Async version of `store_readings` for the ASGI views. The async ORM cannot hold a transaction across awaits,
+    so the whole of `store_readings` runs in one worker thread, in its single transaction. Returns the instances
+    in the order of the serializers.
+    """
+    return await sync_to_async(store_readings, thread_sensitive=True)(station_type, serializers)
+
+
+def store_queued_readings(entries):
+    """
+    Validates and stores queued `(model_label, station_type, payload)` entries, batched per provider.
+    Entries that no longer validate are logged and dropped. Returns `(inserted, invalid)`: the number of readings
+    inserted, without the ones already stored, and of the dropped entries.
+    """
+    batches = {}
+    for model_label, station_type, payload in entries:
+        batches.setdefault((model_label, station_type), []).append(payload)
+
+    inserted = invalid = 0
+    for (model_label, station_type), payloads in batches.items():
+        serializer_class = WeatherSerializerFactory.get_serializer(apps.get_model(model_label))
+
+        serializers = []
+        for payload in payloads:
+            serializer = serializer_class(data=payload)
+            if serializer.is_valid():
+                serializers.append(serializer)
+            else:
+                logger.warning("Dropped a queued %s reading that does not validate: %s", model_label, serializer.errors)
+                invalid += 1
+
+        if serializers:
+            inserted += len(_store_readings(station_type, serializers)[1])
+
+    return inserted, invalid
+
+
+class MemoryIngestQueue:
+    """
+    In-process ingest queue drained by a daemon thread of the web process. Readings still in the queue
+    are stored on a clean exit, but are lost if the process is killed.
+    """
+    durable = False
+
+    def __init__(self, batch_size, flush_interval, max_size, autostart=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._enqueued = 0
+        self._stored = 0
+        self._failed = 0
+
+    def enqueue(self, model_label, station_type, payloads):
+        """
+        Queues all the payloads or, when they do not fit, none of them and raises `IngestQueueFull`.
+        """
+        with self._lock:  # only the worker takes entries meanwhile, so the checked room cannot shrink
+            if self._queue.maxsize and self._queue.qsize() + len(payloads) > self._queue.maxsize:
+                raise IngestQueueFull()
+
+            for payload in payloads:
+                self._queue.put_nowait((model_label, station_type, payload))
+            self._enqueued += len(payloads)
+
+        if self.autostart:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None:
+                return
+
+            self._worker = threading.Thread(target=self._run, name='weather-ingest-queue', daemon=True)
+            self._worker.start()
+            atexit.register(self.drain)
+
+    def flush(self):
+        """
+        Stores up to `batch_size` queued readings. Returns the number of readings taken from the queue.
+        """
+        entries = []
+        while len(entries) < self.batch_size:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self._store(entries)
+        return len(entries)
+
+    def drain(self):
+        while self.flush():
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'durable': self.durable,
+                'depth': self._queue.qsize(),
+                'enqueued': self._enqueued,
+                'stored': self._stored,
+                'failed': self._failed,
+            }
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(entries) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entries.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._store(entries)
+
+    def _store(self, entries):
+        if not entries:
+            return
+
+        try:
+            with transaction.atomic():
+                inserted, failed = store_queued_readings(entries)
+        except Exception:
+            logger.exception("Failed to store %d queued readings, storing them one by one", len(entries))
+            inserted, failed = self._store_one_by_one(entries)
+        finally:
+            close_old_connections()
+
+        with self._lock:
+            self._stored += inserted
+            self._failed += failed
+
+    @staticmethod
+    def _store_one_by_one(entries):
+        """
+        Stores every entry on its own, so an entry that cannot be stored is the only one lost.
+        Returns `(inserted, failed)` like `store_queued_readings`.
+        """
+        inserted = failed = 0
+        for entry in entries:
+            try:
+                entry_inserted, entry_invalid = store_queued_readings([entry])
+            except Exception:
+                logger.exception("Dropped a queued %s reading that cannot be stored", entry[0])
+                entry_inserted, entry_invalid = 0, 1
+
+            inserted += entry_inserted
+            failed += entry_invalid
+
+        return inserted, failed
+
+
+class SpoolIngestQueue:
+    """
+    Durable ingest queue in the `QueuedReading` table. A request costs one small INSERT,
+    and `manage.py process_ingest_queue` stores the queued readings in batches. A reading that fails
+    to store `max_attempts` times is kept in the table with `failed_at` set and no longer taken.
+    """
+    durable = True
+
+    def __init__(self, batch_size, flush_interval, max_attempts=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+
+    def enqueue(self, model_label, station_type, payloads):
+        QueuedReading.objects.bulk_create([
+            QueuedReading(model_label=model_label, station_type=station_type, payload=payload)
+            for payload in payloads
+        ])
+
+    def flush(self):
+        """
+        Stores up to `batch_size` of the oldest queued readings and removes them from the queue in the same transaction.
+        Rows locked by another worker are skipped. When the batch fails, every reading is stored in its own savepoint,
+        so one that cannot be stored only counts a failed attempt and does not hold up the others.
+        Returns the number of readings taken from the queue.
+        """
+        with transaction.atomic():
+            entries = list(
+                QueuedReading.objects.select_for_update(skip_locked=True)
+                .filter(failed_at__isnull=True)
+                .order_by('id')[:self.batch_size]
+            )
+            if not entries:
+                return 0
+
+            try:
+                with transaction.atomic():
+                    store_queued_readings((entry.model_label, entry.station_type, entry.payload) for entry in entries)
+                failed = []
+            except Exception:
+                logger.exception("Failed to store %d queued readings, storing them one by one", len(entries))
+                failed = self._store_one_by_one(entries)
+
+            failed_ids = {entry.id for entry in failed}
+            QueuedReading.objects.filter(id__in=[entry.id for entry in entries if entry.id not in failed_ids]).delete()
+            QueuedReading.objects.bulk_update(failed, ['attempts', 'last_error', 'failed_at'])
+
+        return len(entries)
+
+    def _store_one_by_one(self, entries):
+        """
+        Stores every entry in a savepoint and returns the ones that failed, with the attempt counted
+        and `failed_at` set once they reach `max_attempts`.
+        """
+        failed = []
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    store_queued_readings([(entry.model_label, entry.station_type, entry.payload)])
+            except Exception as exc:
+                entry.attempts += 1
+                entry.last_error = f"{type(exc).__name__}: {exc}"
+                if entry.attempts >= self.max_attempts:
+                    entry.failed_at = timezone.now()
+                    logger.error(
+                        "Gave up on queued reading %s after %d attempts: %s", entry.id, entry.attempts, entry.last_error
+                    )
+                failed.append(entry)
+
+        return failed
+
+    def drain(self):
+        while self.flush():
+            pass
+
+    def run(self):
+        """
+        Stores queued readings until interrupted, waiting `flush_interval` seconds whenever the queue has no full batch.
+        """
+        while True:
+            try:
+                flushed = self.flush()
+            except Exception:
+                logger.exception("Failed to store queued readings, retrying in %s seconds", self.flush_interval)
+                flushed = 0
+            finally:
+                close_old_connections()
+
+            if flushed < self.batch_size:
+                time.sleep(self.flush_interval)
+
+    def stats(self):
+        waiting = Q(failed_at__isnull=True)
+        queued = QueuedReading.objects.aggregate(
+            depth=Count('id', filter=waiting),
+            failed=Count('id', filter=~waiting),
+            oldest=Min('enqueued_at', filter=waiting),
+        )
+        return {
+            'durable': self.durable,
+            'depth': queued['depth'],
+            'failed': queued['failed'],
+            'oldest_age_seconds': (timezone.now() - queued['oldest']).total_seconds() if queued['oldest'] else None,
+        }
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_ingest_queue():
+    """
+    Returns the ingest queue configured in the settings, or `None` when the views store readings synchronously.
+    """
+    if not settings.WEATHER_INGEST_QUEUE_ENABLED:
+        return None
+
+    options = (
+        settings.WEATHER_INGEST_QUEUE_DURABLE,
+        settings.WEATHER_INGEST_QUEUE_BATCH_SIZE,
+        settings.WEATHER_INGEST_QUEUE_FLUSH_INTERVAL,
+        settings.WEATHER_INGEST_QUEUE_MAX_SIZE,
+        settings.WEATHER_INGEST_QUEUE_MAX_ATTEMPTS,
+    )
+
+    with _queues_lock:
+        if options not in _queues:
+            durable, batch_size, flush_interval, max_size, max_attempts = options
+            if durable:
+                _queues[options] = SpoolIngestQueue(batch_size, flush_interval, max_attempts)
+            else:
+                _queues[options] = MemoryIngestQueue(batch_size, flush_interval, max_size)
+
+        return _queues[options]
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from stations.cache import PROCESS_LOCAL_NOTICE, city_weather_cache
+from stations.models import NormalizedReading, Station
+from stations.partitions import delete_before, drop_partitions_before, get_reading_tables, is_partitioned, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        "Removes the readings older than the retention period. Monthly partitions that lie entirely before it are "
+        "dropped (or detached) whole, other rows are deleted in batches. Stations whose latest reading is removed "
+        "and the matching normalized readings go with them, the statistics rollups are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.WEATHER_READING_RETENTION_DAYS,
+            help='Days of readings to keep (WEATHER_READING_RETENTION_DAYS by default).'
+        )
+        parser.add_argument('--detach', action='store_true', help='Detach expired partitions instead of dropping them, e.g. to archive them.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per DELETE of the batched fallback.')
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            raise CommandError("No retention period, pass --days or set WEATHER_READING_RETENTION_DAYS.")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        for model_class, timestamp_field in get_reading_tables():
+            table = model_class._meta.db_table
+            content_type = ContentType.objects.get_for_model(model_class)
+            provider_cutoff = cutoff
+
+            if is_partitioned(table):
+                # Whole months only, so the rows left before the cutoff are in the default partition
+                provider_cutoff = month_start(cutoff)
+                removed = drop_partitions_before(table, provider_cutoff, detach=options['detach'])
+                if removed:
+                    self.stdout.write(f"{'Detached' if options['detach'] else 'Dropped'} {', '.join(removed)}.")
+
+            deleted = delete_before(model_class.objects.all(), timestamp_field, provider_cutoff, options['batch_size'])
+            stations = delete_before(
+                Station.objects.filter(content_type=content_type), 'recorded_at', provider_cutoff, options['batch_size']
+            )
+            delete_before(
+                NormalizedReading.objects.filter(content_type=content_type), 'timestamp', provider_cutoff, options['batch_size']
+            )
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: removed readings before {provider_cutoff.isoformat()}, {deleted} deleted row by row, "
+                f"{stations} stations without newer readings."
+            ))
+
+        if city_weather_cache.shared:
+            city_weather_cache.clear()
+        elif city_weather_cache.enabled:
+            self.stdout.write(self.style.WARNING(PROCESS_LOCAL_NOTICE))
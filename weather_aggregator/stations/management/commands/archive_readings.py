@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from stations.archive import archive_readings, default_compression, get_archive_dir
+from stations.models import Station
+from stations.partitions import get_reading_tables
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves the readings older than a cutoff out of the provider tables into compressed JSONL segments on local "
+        "disk, one or more per provider and month, indexed in `stations.ArchivedReading` for history reads. "
+        "The latest reading of every station stays in its table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, required=True, help='Archive the readings older than this many days.')
+        parser.add_argument('--segment-size', type=int, default=10000, help='Readings per archive segment at most.')
+
+    def handle(self, *args, **options):
+        if not settings.WEATHER_ARCHIVE_ENABLED:
+            raise CommandError("Set WEATHER_ARCHIVE_ENABLED, otherwise history reads would not see the archived readings.")
+        if options['days'] <= 0:
+            raise CommandError("--days must be positive.")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f"Archiving readings before {cutoff.isoformat()} to {get_archive_dir()} ({default_compression()}).")
+
+        for model_class, timestamp_field in get_reading_tables():
+            content_type = ContentType.objects.get_for_model(model_class)
+            readings = model_class.objects.filter(**{f'{timestamp_field}__lt': cutoff}).exclude(
+                id__in=Station.objects.filter(content_type=content_type).values('object_id')
+            )
+
+            archived = archive_readings(readings, timestamp_field, options['segment_size'])
+            self.stdout.write(self.style.SUCCESS(f"{model_class._meta.db_table}: archived {archived} readings."))
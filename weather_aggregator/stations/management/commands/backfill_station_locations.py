@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from stations.models import Station
+
+
+class Command(BaseCommand):
+    help = "Sets the coordinates and grid cells of every station from its latest reading, for the spatial lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Stations updated per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        updated = Station.objects.backfill_locations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated the location of {updated} stations."))
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from stations.benchmarks import build_scenarios, compare_to_baseline, load_baseline, run_scenario, save_baseline
+from stations.seed import seed_weather_data
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic readings and measures the ingest and read endpoints: latency percentiles, queries per request "
+        "and peak traced memory, compared against the stored baseline of the database vendor. Everything is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=10, help='Seeded stations per provider.')
+        parser.add_argument('--readings', type=int, default=500, help='Seeded readings per station.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per scenario.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Readings per batch ingest request.')
+        parser.add_argument('--only', nargs='+', default=None, help='Run only the scenarios with these names.')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Baseline file.')
+        parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline of the database vendor.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown and memory growth against the baseline.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a scenario regressed.')
+
+    def handle(self, *args, **options):
+        seed_options = {key: options[key] for key in ('stations', 'readings', 'batch_size')}
+        results = {}
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+            seeded = seed_weather_data(options['stations'], options['readings'])
+            self.stdout.write(f"Seeded {seeded} readings on {connection.vendor}.\n")
+
+            self.stdout.write(f"{'scenario':<40}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'peak KiB':>11}")
+            for scenario in build_scenarios(APIClient(), options['batch_size']):
+                if options['only'] and scenario.name not in options['only']:
+                    continue
+
+                result = results[scenario.name] = run_scenario(scenario, options['repeat'])
+                self.stdout.write(
+                    f"{scenario.name:<40}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                    f"{result['queries']:>9}{result['peak_kib']:>11.1f}"
+                )
+
+            transaction.set_rollback(True)
+
+        baselines = load_baseline(options['baseline'])
+        baseline = baselines.get(connection.vendor)
+
+        if options['save_baseline']:
+            baselines[connection.vendor] = {'options': seed_options, 'results': results}
+            save_baseline(options['baseline'], baselines)
+            self.stdout.write(self.style.SUCCESS(f"Stored the {connection.vendor} baseline in {options['baseline']}."))
+            return
+
+        if baseline is None:
+            self.stdout.write(f"No {connection.vendor} baseline in {options['baseline']}, run with --save-baseline to store one.")
+            return
+
+        if baseline['options'] != seed_options:
+            self.stdout.write(self.style.WARNING(
+                f"The baseline was measured with {baseline['options']}, the comparison is not meaningful."
+            ))
+
+        regressions = compare_to_baseline(results, baseline['results'], options['tolerance'])
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against the {connection.vendor} baseline."))
+        elif options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regressions against the {connection.vendor} baseline.")
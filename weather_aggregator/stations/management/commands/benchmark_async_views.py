@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.shortcuts import resolve_url
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from stations.benchmarks import INGEST_START, percentile
+from stations.models import NormalizedReading, Station, WeatherRollup
+from stations.seed import PROVIDERS, generate_payloads, seed_weather_data
+from weather_aggregator.utils import make_city_key
+
+BENCHMARK_CITY = 'Benchmark Async'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput of the sync (WSGI) and async (ASGI) read and ingest views at high concurrency, "
+        "through Django's in-process WSGI and ASGI handlers. The seeded city is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=20, help='Seeded stations per provider.')
+        parser.add_argument('--readings', type=int, default=50, help='Seeded readings per station.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario.')
+        parser.add_argument('--scenarios', nargs='+', choices=('read', 'ingest'), default=['read', 'ingest'])
+
+    def handle(self, *args, **options):
+        # The workers read committed data through their own connections, so the city cannot be rolled back
+        seed_weather_data(options['stations'], options['readings'], cities=[BENCHMARK_CITY])
+
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], WEATHER_CACHE_ENABLED=False):
+                self.stdout.write(
+                    f"{'scenario':<10}{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+                    f"  ({options['concurrency']} concurrent, {connection.vendor})"
+                )
+                for scenario in options['scenarios']:
+                    if scenario == 'ingest' and connection.vendor == 'sqlite':
+                        self.stdout.write("ingest    skipped, SQLite locks the database for concurrent writers")
+                        continue
+
+                    sync_request, async_request = self.get_requests(scenario)
+                    for mode, run in (('sync', self.run_sync), ('async', self.run_async)):
+                        request = sync_request if mode == 'sync' else async_request
+                        elapsed, timings = run(request, options['concurrency'], options['requests'])
+                        self.stdout.write(
+                            f"{scenario:<10}{mode:<8}{len(timings) / elapsed:>10.1f}"
+                            f"{percentile(timings, 50) * 1000:>10.2f}{percentile(timings, 95) * 1000:>10.2f}"
+                        )
+        finally:
+            self.delete_city()
+
+    @staticmethod
+    def get_requests(scenario):
+        """
+        Returns the `(sync, async)` request functions of a scenario, which take a test client and return a response.
+        """
+        if scenario == 'read':
+            return (
+                lambda client: client.get(resolve_url('get_city_weather_data', city_name=BENCHMARK_CITY)),
+                lambda client: client.get(resolve_url('aget_city_weather_data', city_name=BENCHMARK_CITY)),
+            )
+
+        model_class, app_label = PROVIDERS[1][0], PROVIDERS[1][0]._meta.app_label
+        lock = threading.Lock()
+        payloads = (
+            payload for _, _, payload in generate_payloads(
+                100, 10 ** 6, cities=[BENCHMARK_CITY], start=INGEST_START, providers=[PROVIDERS[1]]
+            )
+        )
+
+        def next_payload():
+            with lock:
+                return next(payloads)
+
+        return (
+            lambda client: client.post(
+                resolve_url(f'create_weather_data_{app_label}'), next_payload(), content_type='application/json'
+            ),
+            lambda client: client.post(
+                resolve_url(f'acreate_weather_data_{app_label}'), next_payload(), content_type='application/json'
+            ),
+        )
+
+    @staticmethod
+    def run_sync(request, concurrency, total):
+        remaining = iter(range(total))
+        lock = threading.Lock()
+        timings = []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    response = request(client)
+                    elapsed = time.perf_counter() - started
+                    if response.status_code >= 300:
+                        raise RuntimeError(f"The sync view answered {response.status_code}")
+                    with lock:
+                        timings.append(elapsed)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(worker) for _ in range(concurrency)]:
+                future.result()
+
+        return time.perf_counter() - started, timings
+
+    @staticmethod
+    def run_async(request, concurrency, total):
+        async def run():
+            client = AsyncClient()
+            remaining = iter(range(total))
+            timings = []
+
+            async def worker():
+                while next(remaining, None) is not None:
+                    started = time.perf_counter()
+                    response = await request(client)
+                    if response.status_code >= 300:
+                        raise RuntimeError(f"The async view answered {response.status_code}")
+                    timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - started, timings
+
+        return asyncio.run(run())
+
+    @staticmethod
+    def delete_city():
+        city_key = make_city_key(BENCHMARK_CITY)
+        for model_class, *_ in PROVIDERS:
+            model_class.objects.filter(city_key=city_key).delete()
+        Station.objects.filter(city_key=city_key).delete()
+        WeatherRollup.objects.filter(city_key=city_key).delete()
+        NormalizedReading.objects.filter(city_key=city_key).delete()
@@ -0,0 +1,107 @@
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.shortcuts import resolve_url
+from django.test import Client
+from django.test.utils import override_settings
+from stations import parsers, renderers
+from stations.parsers import ORJSONParser
+from stations.seed import generate_payloads, seed_weather_data
+
+BENCHMARK_CITY = 'Benchmark Json'
+
+
+@contextmanager
+def stock_json():
+    """
+    Makes the orjson-backed classes fall back to DRF's JSONRenderer and JSONParser, as without orjson installed.
+    The views bind their renderer classes at import, so changing `REST_FRAMEWORK` would not reach them.
+    """
+    with mock.patch.object(parsers, 'orjson', None), mock.patch.object(renderers, 'orjson', None):
+        yield
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings) * 1000
+
+
+def get_content(response):
+    if response.status_code >= 300:
+        raise RuntimeError(f"The view answered {response.status_code}")
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large city and times its large responses (history pages and a full stream) and the parsing of a "
+        "large ingest batch with DRF's JSON classes against the orjson-backed ones. The seeded data is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=20, help='Stations per provider.')
+        parser.add_argument('--readings', type=int, default=250, help='Readings per station.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per scenario, the median is reported.')
+
+    def handle(self, *args, **options):
+        if parsers.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, both columns measure the stock classes."))
+
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            seeded = seed_weather_data(options['stations'], options['readings'], cities=[BENCHMARK_CITY])
+            self.stdout.write(f"Seeded {seeded} readings in '{BENCHMARK_CITY}'.\n")
+            self.stdout.write(
+                f"{'scenario':<22}{'KiB':>10}{'stock ms':>12}{'orjson ms':>12}{'speed-up':>10}{'same output':>13}"
+            )
+
+            client = Client()
+            city_url = resolve_url('get_city_weather_data', city_name=BENCHMARK_CITY)
+            for name, params in (
+                ('history_normalized', {'limit': 1000}),
+                ('history_raw', {'limit': 1000, 'raw': 'true'}),
+                ('stream_ndjson', {'stream': 'ndjson'}),
+            ):
+                def request(params=params):
+                    return get_content(client.get(city_url, params))
+
+                with stock_json():
+                    stock_content = request()
+                    stock_ms = median_ms(request, options['repeat'])
+                fast_content = request()
+                fast_ms = median_ms(request, options['repeat'])
+
+                self.write_row(name, len(fast_content), stock_ms, fast_ms, stock_content == fast_content)
+
+            payloads = [payload for _, _, payload in generate_payloads(500, 1, cities=[BENCHMARK_CITY])]
+            body = json.dumps(payloads).encode()
+
+            def parse():
+                return ORJSONParser().parse(BytesIO(body), parser_context={'encoding': 'utf-8'})
+
+            with stock_json():
+                stock_parsed = parse()
+                stock_ms = median_ms(parse, options['repeat'])
+            self.write_row(
+                f'parse_batch_{len(payloads)}', len(body), stock_ms, median_ms(parse, options['repeat']),
+                stock_parsed == parse()
+            )
+
+            transaction.set_rollback(True)
+
+    def write_row(self, name, size, stock_ms, fast_ms, same_output):
+        self.stdout.write(
+            f"{name:<22}{size / 1024:>10.1f}{stock_ms:>12.2f}{fast_ms:>12.2f}{stock_ms / fast_ms:>9.1f}x"
+            f"{'yes' if same_output else 'no':>13}"
+        )
@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from stations.models import Station
+from stations.seed import PROVIDERS, seed_weather_data
+from weather_aggregator.utils import make_city_key
+
+BENCHMARK_CITY = 'Benchmark City'
+
+
+def fetched_bytes(queryset):
+    """
+    Size of the column values the database returns for the queryset, before Django turns them into Python objects.
+    """
+    sql, params = queryset.query.sql_with_params()
+    total = 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            for value in row:
+                if value is None:
+                    continue
+                if isinstance(value, (bytes, memoryview)):
+                    total += len(value)
+                else:
+                    total += len(str(value).encode())
+
+    return total
+
+
+def median_seconds(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large city and compares reading its provider rows in full (as before) against the "
+        "per-format column projections of the read path. The seeded data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=20, help='Stations per provider.')
+        parser.add_argument('--readings', type=int, default=1000, help='Readings per station.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario, the median is reported.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seeded = seed_weather_data(options['stations'], options['readings'], cities=[BENCHMARK_CITY])
+            self.stdout.write(f"Seeded {seeded} readings in '{BENCHMARK_CITY}'.\n")
+
+            self.stdout.write(f"{'provider':<24}{'format':<12}{'before KiB':>12}{'after KiB':>12}{'saved':>8}"
+                              f"{'before ms':>12}{'after ms':>12}{'speed-up':>10}")
+
+            for model_class, serializer_class, _, _ in PROVIDERS:
+                queryset = model_class.objects.filter(city_key=make_city_key(BENCHMARK_CITY))
+
+                for return_raw_data in (False, True):
+                    rows, to_record = Station.objects._get_reading_rows(model_class, queryset, return_raw_data)
+
+                    def read_full_rows():
+                        return [
+                            serializer_class(instance, context={'return_raw_data': return_raw_data}).data
+                            for instance in queryset
+                        ]
+
+                    def read_projection():
+                        return [to_record(row) for row in rows.all()]
+
+                    before_bytes, after_bytes = fetched_bytes(queryset), fetched_bytes(rows)
+                    before_seconds = median_seconds(read_full_rows, options['repeat'])
+                    after_seconds = median_seconds(read_projection, options['repeat'])
+
+                    self.stdout.write(
+                        f"{model_class._meta.model_name:<24}{'raw' if return_raw_data else 'normalized':<12}"
+                        f"{before_bytes / 1024:>12.1f}{after_bytes / 1024:>12.1f}"
+                        f"{1 - after_bytes / before_bytes:>8.0%}"
+                        f"{before_seconds * 1000:>12.1f}{after_seconds * 1000:>12.1f}"
+                        f"{before_seconds / after_seconds:>9.1f}x"
+                    )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
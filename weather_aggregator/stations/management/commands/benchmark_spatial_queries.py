@@ -0,0 +1,117 @@
+import random
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from stations.geo import grid_cell, haversine_km, radius_bounding_box
+from stations.management.commands.benchmark_read_projection import median_seconds
+from stations.managers import STATION_LOCATION_FIELDS
+from stations.models import Station
+from stations.seed import PROVIDERS
+
+# Area the synthetic stations are spread over, roughly Europe
+AREA = (35.0, -10.0, 60.0, 30.0)
+BATCH_SIZE = 5000
+
+
+def scan_nearby_stations(latitude, longitude, radius_km, limit):
+    """
+    Nearby lookup without the cell index: the coordinate columns are filtered by a sequential scan.
+    """
+    min_lat, min_lon, max_lat, max_lon = radius_bounding_box(latitude, longitude, radius_km)
+    stations = []
+
+    for station in Station.objects.filter(
+        latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon)
+    ).values(*STATION_LOCATION_FIELDS):
+        distance_km = haversine_km(latitude, longitude, station['latitude'], station['longitude'])
+        if distance_km <= radius_km:
+            stations.append({**station, 'distance_km': round(distance_km, 3)})
+
+    return sorted(stations, key=lambda station: station['distance_km'])[:limit]
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates synthetic stations and compares the nearby and bounding box lookups through the grid cell index "
+        "against a scan of the coordinate columns. The stations are rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=100000, help='Synthetic stations to create.')
+        parser.add_argument('--queries', type=int, default=20, help='Random query points per scenario.')
+        parser.add_argument('--radius-km', type=float, default=25, help='Radius of the nearby lookups.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario, the median is reported.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the stations and query points.')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic stations.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        min_lat, min_lon, max_lat, max_lon = AREA
+        model_class = PROVIDERS[0][0]
+        content_type = ContentType.objects.get_for_model(model_class)
+
+        with transaction.atomic():
+            stations = []
+            for index in range(options['stations']):
+                latitude, longitude = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+                cell_lat, cell_lon = grid_cell(latitude, longitude)
+                stations.append(Station(
+                    station_type=model_class._meta.model_name,
+                    station_identifier=f'GEO-BENCH-{index:07d}',
+                    city='Benchmark',
+                    city_key='benchmark',
+                    content_type=content_type,
+                    object_id=0,
+                    latitude=latitude,
+                    longitude=longitude,
+                    cell_lat=cell_lat,
+                    cell_lon=cell_lon,
+                ))
+            Station.objects.bulk_create(stations, batch_size=BATCH_SIZE)
+            self.stdout.write(f"Created {len(stations)} stations.\n")
+
+            points = [
+                (rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)) for _ in range(options['queries'])
+            ]
+            radius_km = options['radius_km']
+
+            for latitude, longitude in points:
+                indexed = Station.objects.get_nearby_stations(latitude, longitude, radius_km, limit=1000)
+                scanned = scan_nearby_stations(latitude, longitude, radius_km, limit=1000)
+                if [station['station_identifier'] for station in indexed] != \
+                        [station['station_identifier'] for station in scanned]:
+                    raise AssertionError(f"The lookups disagree at ({latitude}, {longitude}).")
+
+            def bounding_boxes():
+                return [radius_bounding_box(latitude, longitude, radius_km) for latitude, longitude in points]
+
+            scenarios = (
+                (
+                    f'nearby {radius_km:g} km',
+                    lambda: [scan_nearby_stations(lat, lon, radius_km, 100) for lat, lon in points],
+                    lambda: [Station.objects.get_nearby_stations(lat, lon, radius_km, 100) for lat, lon in points],
+                ),
+                (
+                    'bounding box',
+                    lambda: [
+                        list(Station.objects.filter(
+                            latitude__range=(box[0], box[2]), longitude__range=(box[1], box[3])
+                        ).values(*STATION_LOCATION_FIELDS).order_by('id')[:1000])
+                        for box in bounding_boxes()
+                    ],
+                    lambda: [Station.objects.get_stations_in_bounding_box(*box) for box in bounding_boxes()],
+                ),
+            )
+
+            self.stdout.write(f"{'lookup':<20}{'scan ms/query':>16}{'index ms/query':>16}{'speed-up':>10}")
+            for name, scan, indexed in scenarios:
+                scan_seconds = median_seconds(scan, options['repeat']) / len(points)
+                indexed_seconds = median_seconds(indexed, options['repeat']) / len(points)
+                self.stdout.write(
+                    f"{name:<20}{scan_seconds * 1000:>16.2f}{indexed_seconds * 1000:>16.2f}"
+                    f"{scan_seconds / indexed_seconds:>9.1f}x"
+                )
+
+            if not options['keep']:
+                transaction.set_rollback(True)
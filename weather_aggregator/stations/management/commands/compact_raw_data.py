@@ -0,0 +1,118 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from stations.raw_data import compact_payload, rebuild_payload
+from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the bytes per row of the stored `raw_data` payloads against their compact form, which leaves out "
+        "what the typed columns rebuild. Rewrites the stored readings in compact form with --apply, "
+        "or back in full form with --expand before turning WEATHER_COMPACT_RAW_DATA off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample', type=int, default=10000, help='Readings measured per provider, 0 for all.')
+        rewrite = parser.add_mutually_exclusive_group()
+        rewrite.add_argument('--apply', action='store_true', help='Rewrite every stored reading in compact form.')
+        rewrite.add_argument('--expand', action='store_true', help='Rewrite every stored reading in full form.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Readings per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        if options['apply'] and not settings.WEATHER_COMPACT_RAW_DATA:
+            raise CommandError("Set WEATHER_COMPACT_RAW_DATA, raw reads only rebuild compact payloads with it.")
+
+        self.stdout.write(
+            f"{'provider':<24}{'rows':>10}{'JSON before':>14}{'JSON after':>12}{'saved':>8}"
+            + (f"{'jsonb before':>14}{'jsonb after':>13}{'row before':>12}" if connection.vendor == 'postgresql' else '')
+        )
+
+        for serializer_class in SERIALIZER_MAPPING.values():
+            model_class = serializer_class.Meta.model
+            rows = model_class.objects.order_by('id').values(*self.get_columns(serializer_class))
+            if options['sample']:
+                rows = rows[:options['sample']]
+
+            payloads, compacted = [], []
+            for row in rows.iterator(chunk_size=options['batch_size']):
+                payload = rebuild_payload(row['raw_data'], self.get_column_values(serializer_class, row))
+                payloads.append(json.dumps(payload))
+                compacted.append(json.dumps(self.compact(serializer_class, payload, row)))
+
+            if not payloads:
+                self.stdout.write(f"{model_class._meta.model_name:<24}{0:>10}")
+                continue
+
+            before, after = self.average_size(payloads), self.average_size(compacted)
+            line = (
+                f"{model_class._meta.model_name:<24}{len(payloads):>10}{before:>14.1f}{after:>12.1f}"
+                f"{1 - after / before:>8.0%}"
+            )
+            if connection.vendor == 'postgresql':
+                line += (
+                    f"{self.average_jsonb_size(payloads):>14.1f}{self.average_jsonb_size(compacted):>13.1f}"
+                    f"{self.average_row_size(model_class):>12.1f}"
+                )
+            self.stdout.write(line)
+
+        if options['apply'] or options['expand']:
+            for serializer_class in SERIALIZER_MAPPING.values():
+                updated = self.rewrite(serializer_class, options['expand'], options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"{serializer_class.Meta.model._meta.db_table}: rewrote {updated} readings in "
+                    f"{'full' if options['expand'] else 'compact'} form."
+                ))
+
+    @staticmethod
+    def get_columns(serializer_class):
+        return ('raw_data', *serializer_class.get_raw_data_fields().values())
+
+    @staticmethod
+    def get_column_values(serializer_class, row):
+        return {path: row[field] for path, field in serializer_class.get_raw_data_fields().items()}
+
+    def compact(self, serializer_class, payload, row):
+        return compact_payload(payload, self.get_column_values(serializer_class, row))
+
+    @staticmethod
+    def average_size(documents):
+        return sum(len(document.encode()) for document in documents) / len(documents)
+
+    @staticmethod
+    def average_jsonb_size(documents):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT AVG(pg_column_size(document::jsonb)) FROM unnest(%s::text[]) AS document", [documents])
+            return float(cursor.fetchone()[0])
+
+    @staticmethod
+    def average_row_size(model_class):
+        table = connection.ops.quote_name(model_class._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(AVG(pg_column_size(t.*)), 0) FROM {table} AS t")
+            return float(cursor.fetchone()[0])
+
+    def rewrite(self, serializer_class, expand, batch_size):
+        """
+        Rewrites the readings in compact or full form in batches of `batch_size` ids, skipping those already in it.
+        """
+        model_class = serializer_class.Meta.model
+        fields = ('id', *self.get_columns(serializer_class))
+        convert = rebuild_payload if expand else compact_payload
+        updated, last_id = 0, 0
+
+        while rows := list(model_class.objects.filter(id__gt=last_id).order_by('id').values(*fields)[:batch_size]):
+            last_id = rows[-1]['id']
+            instances = []
+            for row in rows:
+                raw_data = convert(row['raw_data'], self.get_column_values(serializer_class, row))
+                if raw_data is not row['raw_data']:
+                    instances.append(model_class(id=row['id'], raw_data=raw_data))
+
+            with transaction.atomic():
+                model_class.objects.bulk_update(instances, ['raw_data'])
+            updated += len(instances)
+
+        return updated
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from stations.partitions import add_months, create_month_partition, get_reading_tables, is_partitioned, month_start
+from stations.partitions import partition_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the monthly partitions of the provider reading tables from the current month to --months-ahead "
+        "months ahead. Run it regularly, e.g. daily from cron. Postgres only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='Months after the current one to create partitions for.')
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Partition the reading tables that are not partitioned yet, for databases migrated without WEATHER_PARTITIONING_ENABLED.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(f"Partitioning needs PostgreSQL, {connection.vendor} tables stay unpartitioned.")
+            return
+
+        current_month = month_start(timezone.now())
+
+        for model_class, timestamp_field in get_reading_tables():
+            table = model_class._meta.db_table
+            column = model_class._meta.get_field(timestamp_field).column
+
+            if not is_partitioned(table):
+                if not options['convert']:
+                    self.stdout.write(f"{table} is not partitioned, run with --convert to partition it.")
+                    continue
+
+                with transaction.atomic(), connection.schema_editor() as schema_editor:
+                    partition_table(schema_editor, table, column)
+                self.stdout.write(f"Partitioned {table} by month.")
+
+            created = [
+                month.strftime('%Y-%m')
+                for month in (add_months(current_month, months) for months in range(options['months_ahead'] + 1))
+                if create_month_partition(table, column, month)
+            ]
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: created the partitions of {', '.join(created)}." if created else f"{table}: partitions are up to date."
+            ))
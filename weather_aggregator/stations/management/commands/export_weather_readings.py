@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from stations.export import EXPORT_FORMATS, get_export_formats
+from stations.models import Station
+from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING
+
+
+def aware_datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None or parsed.tzinfo is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the normalized readings of one or more cities within a time range to a CSV, Parquet or Arrow IPC "
+        "file, one column per normalized field. The readings are read and written in batches, so the export "
+        "never holds them all in memory. Parquet and Arrow need the `pyarrow` package."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--city', action='append', required=True, dest='cities', help='City to export, repeatable.')
+        parser.add_argument('--provider', action='append', dest='providers', help='Provider model name, repeatable.')
+        parser.add_argument('--since', type=aware_datetime, help='Readings recorded at or after, ISO 8601 with offset.')
+        parser.add_argument('--until', type=aware_datetime, help='Readings recorded before, ISO 8601 with offset.')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--output', required=True, help='Path of the file to write.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Readings per batch, a Parquet row group.')
+
+    def handle(self, *args, **options):
+        if options['file_format'] not in get_export_formats():
+            raise CommandError(f"The {options['file_format']} format requires the `pyarrow` package.")
+
+        providers = options['providers'] and [provider.lower() for provider in options['providers']]
+        unknown = [provider for provider in providers or () if provider not in SERIALIZER_MAPPING]
+        if unknown:
+            raise CommandError(f"Unknown providers: {', '.join(unknown)}. Use one of: {', '.join(SERIALIZER_MAPPING)}.")
+
+        since, until = options['since'], options['until']
+        if since is not None and until is not None and since >= until:
+            raise CommandError("--until must be later than --since.")
+
+        exported = 0
+
+        def counted(batches):
+            nonlocal exported
+            for columns in batches:
+                exported += len(columns['provider'])
+                yield columns
+
+        batches = Station.objects.iter_export_batches(
+            options['cities'], providers=providers, since=since, until=until, chunk_size=options['batch_size']
+        )
+        export = EXPORT_FORMATS[options['file_format']][0]
+
+        with open(options['output'], 'wb') as output:
+            for chunk in export(counted(batches)):
+                output.write(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {exported} readings to {options['output']}."))
@@ -0,0 +1,76 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from stations.backfill import get_file_format, import_file
+from stations.cache import PROCESS_LOCAL_NOTICE, city_weather_cache
+from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING
+
+
+def init_worker():
+    django.setup()  # a no-op in forked workers, needed where workers are spawned
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads historical readings from NDJSON or CSV files (optionally gzipped) in the native format of a provider. "
+        "Every reading is validated like the provider's ingest endpoint, then stored in batches with `COPY` on "
+        "PostgreSQL and multi-row `INSERT`s on other databases, and recorded on its station. Readings that are already "
+        "stored are skipped, so an interrupted import can be run again. With --workers, files are imported in "
+        "parallel worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='NDJSON (.ndjson, .jsonl) or CSV (.csv) files, optionally .gz.')
+        parser.add_argument('--provider', required=True, choices=list(SERIALIZER_MAPPING), help='Provider of the files.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Readings stored per transaction.')
+        parser.add_argument('--workers', type=int, default=1, help='Files imported in parallel worker processes.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['workers'] <= 0:
+            raise CommandError("--batch-size and --workers must be positive.")
+
+        files = [Path(path) for path in options['files']]
+        for path in files:
+            try:
+                get_file_format(path)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            if not path.is_file():
+                raise CommandError(f"{path} does not exist.")
+
+        if city_weather_cache.enabled and not city_weather_cache.shared:
+            self.stdout.write(self.style.WARNING(PROCESS_LOCAL_NOTICE))
+        self.stdout.write(
+            f"Importing {len(files)} {options['provider']} files "
+            f"with {'COPY' if connection.vendor == 'postgresql' else 'INSERT'}."
+        )
+
+        totals = {'read': 0, 'stored': 0, 'invalid': 0}
+        for result in self.import_files(files, options['provider'], options['batch_size'], options['workers']):
+            for error in result['errors']:
+                self.stderr.write(error)
+            self.stdout.write(
+                f"{result['path']}: read {result['read']}, stored {result['stored']}, invalid {result['invalid']}."
+            )
+            for key in totals:
+                totals[key] += result[key]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {totals['read']} readings, stored {totals['stored']}, skipped {totals['invalid']} invalid ones."
+        ))
+
+    @staticmethod
+    def import_files(files, provider, batch_size, workers):
+        if workers == 1:
+            for path in files:
+                yield import_file(path, provider, batch_size)
+            return
+
+        connections.close_all()  # the workers open their own connections, forked ones must not share this one
+        with ProcessPoolExecutor(max_workers=min(workers, len(files)), initializer=init_worker) as executor:
+            futures = [executor.submit(import_file, path, provider, batch_size) for path in files]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from stations.cache import PROCESS_LOCAL_NOTICE, city_weather_cache
+from stations.ingest import SpoolIngestQueue
+from stations.models import QueuedReading
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the readings of the durable ingest queue in batches. Runs until interrupted, "
+        "or until the queue is empty with --once. Several workers can run side by side. Readings that fail to store "
+        "--max-attempts times stay in the table with `failed_at` set, --requeue-failed queues them again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.WEATHER_INGEST_QUEUE_BATCH_SIZE,
+            help='Readings stored per transaction.'
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            default=settings.WEATHER_INGEST_QUEUE_FLUSH_INTERVAL,
+            help='Seconds to wait for more readings when the queue has no full batch.'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.WEATHER_INGEST_QUEUE_MAX_ATTEMPTS,
+            help='Failed attempts after which a queued reading is no longer retried.'
+        )
+        parser.add_argument('--once', action='store_true', help='Store the queued readings and exit.')
+        parser.add_argument(
+            '--requeue-failed',
+            action='store_true',
+            help='Queue the readings that reached --max-attempts again before processing.'
+        )
+
+    def handle(self, *args, **options):
+        ingest_queue = SpoolIngestQueue(options['batch_size'], options['flush_interval'], options['max_attempts'])
+        if city_weather_cache.enabled and not city_weather_cache.shared:
+            self.stdout.write(self.style.WARNING(PROCESS_LOCAL_NOTICE))
+
+        if options['requeue_failed']:
+            requeued = QueuedReading.objects.filter(failed_at__isnull=False).update(failed_at=None, attempts=0)
+            self.stdout.write(f"Requeued {requeued} failed readings.")
+
+        if options['once']:
+            depth = ingest_queue.stats()['depth']
+            ingest_queue.drain()
+            failed = ingest_queue.stats()['failed']
+            self.stdout.write(self.style.SUCCESS(f"Processed {depth} queued readings, {failed} failed ones are kept."))
+            return
+
+        self.stdout.write(f"Processing the ingest queue in batches of {options['batch_size']}, press CTRL-C to stop.")
+        try:
+            ingest_queue.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from stations.models import NormalizedReading
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills or rebuilds the normalized readings table from the readings of every provider. "
+        "Readings stored while the command runs may be missed, so run it while ingestion is paused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Readings written per INSERT.')
+
+    def handle(self, *args, **options):
+        written = NormalizedReading.objects.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} normalized readings."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from stations.managers import ROLLUP_GRANULARITIES
+from stations.models import WeatherRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills or rebuilds the hourly and daily weather rollups from the readings of every provider. "
+        "Readings stored while the command runs may be missed, so run it while ingestion is paused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--granularity',
+            choices=ROLLUP_GRANULARITIES,
+            action='append',
+            help='Rebuild only this granularity, can be repeated. All granularities by default.'
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rollups written per INSERT.')
+
+    def handle(self, *args, **options):
+        granularities = options['granularity'] or ROLLUP_GRANULARITIES
+        written = WeatherRollup.objects.rebuild(granularities, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollups ({', '.join(granularities)})."))
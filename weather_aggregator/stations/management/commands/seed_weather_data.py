@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from stations.seed import CITIES, seed_weather_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores synthetic readings of WeatherMasterX and BulgarianMeteoProData stations, validated and recorded "
+        "the way ingest does. The same options always generate the same readings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=10, help='Stations per provider.')
+        parser.add_argument('--readings', type=int, default=1000, help='Readings per station.')
+        parser.add_argument('--cities', nargs='+', default=None, help=f"Cities of the stations ({', '.join(CITIES)} by default).")
+        parser.add_argument('--start', type=datetime.fromisoformat, default=None, help='Time of the first reading (2024-01-01 by default).')
+        parser.add_argument('--interval-minutes', type=int, default=10, help='Minutes between the readings of a station.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated values.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Readings stored per INSERT.')
+
+    def handle(self, *args, **options):
+        start = options['start']
+        if start is not None and start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+
+        with transaction.atomic():
+            seeded = seed_weather_data(
+                options['stations'],
+                options['readings'],
+                cities=options['cities'],
+                batch_size=options['batch_size'],
+                start=start,
+                interval=timedelta(minutes=options['interval_minutes']),
+                random_seed=options['seed'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Stored {seeded} readings."))
@@ -1,45 +1,1197 @@
-from django.db import models
-from weather_aggregator.serializers_mapping import WeatherSerializerFactory
+import asyncio
+import heapq
+from itertools import chain, islice
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from stations.archive import ArchiveReader
+from stations.cache import city_weather_cache
+from stations.export import EXPORT_COLUMNS, encode_metric
+from stations.geo import grid_cell, haversine_km, radius_bounding_box
+from stations.pagination import ReadingCursor
+from stations.serializers import DEFAULT_WEATHER_FIELDS
+from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING, WeatherSerializerFactory
+from weather_aggregator.utils import make_city_key
+
+STATISTIC_METRICS = ('temperature_celsius', 'humidity_percent', 'pressure_hpa', 'wind_speed_kph')
+STATION_LOCATION_FIELDS = ('station_identifier', 'station_type', 'city', 'latitude', 'longitude', 'recorded_at', 'is_active')
+STATION_KEY_FIELDS = ('content_type', 'station_identifier')
+STATION_POINTER_FIELDS = (
+    'city', 'city_key', 'object_id', 'recorded_at', 'is_active', 'latitude', 'longitude', 'cell_lat', 'cell_lon', 'updated_at',
+)
+ROLLUP_GRANULARITIES = ('hour', 'day')
+ROLLUP_KEY_FIELDS = ('granularity', 'content_type', 'station_identifier', 'city_key', 'bucket_start')
+ROLLUP_FIELDS = ('count', *(
+    f'{metric}_{statistic}' for metric in STATISTIC_METRICS for statistic in ('count', 'sum', 'min', 'max')
+))
+
+
+def aggregate_readings(model_class, serializer_class, queryset, bucket, group_fields=()):
+    """
+    Groups the provider readings of the queryset by `hour` or `day` bucket (as `bucket_start`) and `group_fields`,
+    with the reading count and the count, sum, min and max of every metric of the provider's normalizer.
+    Raises `ValueError` for models without a registered normalizer.
+    """
+    metrics = WeatherSerializerFactory.get_normalizer(model_class).metrics
+
+    aggregates = {'count': Count('id')}
+    for metric, expression in metrics.items():
+        aggregates[f'{metric}_count'] = Count(expression)
+        aggregates[f'{metric}_sum'] = Sum(expression)
+        aggregates[f'{metric}_min'] = Min(expression)
+        aggregates[f'{metric}_max'] = Max(expression)
+
+    return queryset.annotate(
+        bucket_start=Trunc(serializer_class.timestamp_field, bucket),
+    ).values('bucket_start', *group_fields).annotate(**aggregates).order_by()
+
+
+def aggregate_archived_readings(model_class, serializer_class, archived_readings, bucket, group_fields=()):
+    """
+    `aggregate_readings` for the archived readings of the `ArchivedReading` queryset, aggregated in Python since
+    they are loaded from their segments. Every row also holds the smallest city name of its group as `display_city`.
+    Raises `ValueError` for models without a registered normalizer.
+    """
+    normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+    reader = ArchiveReader(model_class)
+    timestamp_field, city_field = serializer_class.timestamp_field, serializer_class.city_field
+
+    aggregated = {}
+    index_rows = archived_readings.order_by('timestamp', 'object_id').values('line', 'segment__path', 'segment__compression')
+    for index_row in index_rows.iterator(chunk_size=2000):
+        reading = reader.get_row(index_row['segment__path'], index_row['segment__compression'], index_row['line'])
+        bucket_start = truncate_to_bucket(reading[timestamp_field], bucket)
+        key = (bucket_start, *(reading[field] for field in group_fields))
+
+        row = aggregated.get(key)
+        if row is None:
+            row = aggregated[key] = {
+                'bucket_start': bucket_start,
+                **dict(zip(group_fields, key[1:])),
+                'display_city': reading[city_field],
+                'count': 0,
+                **{f'{metric}_count': 0 for metric in normalizer.metrics},
+                **{f'{metric}_{statistic}': None for metric in normalizer.metrics for statistic in ('sum', 'min', 'max')},
+            }
+
+        row['count'] += 1
+        row['display_city'] = merge_extreme(min, row['display_city'], reading[city_field])
+
+        station_data = normalizer(reading)
+        for metric in normalizer.metrics:
+            value = station_data.get(metric)
+            if value is None:
+                continue
+
+            value = float(value)  # as the metric expressions are, while the archived columns come back as Decimal
+            row[f'{metric}_count'] += 1
+            row[f'{metric}_sum'] = value if row[f'{metric}_sum'] is None else row[f'{metric}_sum'] + value
+            row[f'{metric}_min'] = merge_extreme(min, row[f'{metric}_min'], value)
+            row[f'{metric}_max'] = merge_extreme(max, row[f'{metric}_max'], value)
+
+    return list(aggregated.values())
+
+
+def is_bucket_start(value, bucket):
+    """
+    Whether the datetime is `None` or the start of an `hour` or `day` bucket in the current time zone.
+    """
+    if value is None:
+        return True
+
+    value = timezone.localtime(value)
+    return value == truncate_to_bucket(value, bucket)
+
+
+def truncate_to_bucket(value, bucket):
+    """
+    Start of the `hour` or `day` bucket of the datetime in the current time zone, as `Trunc` computes it in SQL.
+    """
+    value = timezone.localtime(value)
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if bucket == 'day':
+        value = value.replace(hour=0)
+
+    return timezone.make_aware(value.replace(tzinfo=None))
+
+
+def merge_extreme(pick, current, value):
+    if value is None:
+        return current
+    return value if current is None else pick(current, value)
 
 
 class StationManager(models.Manager):
+    def record_readings(self, station_type, readings):
+        """
+        Points every station at its latest reading, creating the Station entry on its first reading.
+        `readings` is an iterable of `(instance, station_data)` pairs, where `station_data`
+        is the output of the serializer's `get_station_data`. Readings older than the current
+        latest reading of a station are kept in the provider table but do not move the pointer.
+        """
+        from stations.models import NormalizedReading, WeatherRollup  # stations.models imports this module
+
+        readings = list(readings)
+        latest_readings = {}
+
+        for instance, station_data in readings:
+            key = (type(instance), station_data.get('station_id'))
+            current = latest_readings.get(key)
+
+            if current is None or self._reading_order(*current) < self._reading_order(instance, station_data):
+                latest_readings[key] = (instance, station_data)
+
+        touched_cities = set()
+        with transaction.atomic():
+            stations = self._point_stations_at(station_type, latest_readings, touched_cities)
+
+        WeatherRollup.objects.record_readings(readings)
+        if settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            NormalizedReading.objects.record_readings(readings)
+
+        city_weather_cache.invalidate(touched_cities)
+        return stations
+
+    @staticmethod
+    def _reading_order(instance, station_data):
+        return station_data.get('timestamp'), instance.id
+
+    def _point_stations_at(self, station_type, latest_readings, touched_cities):
+        readings_by_model = {}
+        for (model_class, station_identifier), reading in latest_readings.items():
+            readings_by_model.setdefault(model_class, {})[station_identifier] = reading
+
+        stations = []
+        now = timezone.now()
+        upsert = connection.vendor == 'postgresql'
+        for model_class, readings in readings_by_model.items():
+            content_type = ContentType.objects.get_for_model(model_class)
+            stored_stations = {
+                station_identifier: (city, recorded_at, object_id)
+                for station_identifier, city, recorded_at, object_id in self.filter(
+                    content_type=content_type,
+                    station_identifier__in=readings.keys()
+                ).values_list('station_identifier', 'city', 'recorded_at', 'object_id')
+            }
+
+            moved_stations = []
+            for station_identifier, (instance, station_data) in sorted(readings.items()):
+                stored = stored_stations.get(station_identifier)
+                if not upsert and stored is not None and stored[1] is not None and \
+                        stored[1:] >= self._reading_order(instance, station_data):
+                    continue  # on PostgreSQL, the guard of the upsert skips these
+
+                station = self.model(
+                    station_type=station_type,
+                    station_identifier=station_identifier,
+                    content_type=content_type,
+                    city=station_data.get('city'),
+                    city_key=make_city_key(station_data.get('city')),
+                    object_id=instance.id,
+                    recorded_at=station_data.get('timestamp'),
+                    is_active=station_data.get('is_active'),
+                    latitude=station_data.get('latitude'),
+                    longitude=station_data.get('longitude'),
+                    updated_at=now,
+                )
+                station.cell_lat, station.cell_lon = grid_cell(station.latitude, station.longitude)
+                moved_stations.append(station)
+
+            if upsert:
+                moved_stations = self._upsert_stations(moved_stations)
+            elif moved_stations:
+                self.bulk_create(
+                    moved_stations,
+                    update_conflicts=True,
+                    unique_fields=STATION_KEY_FIELDS,
+                    update_fields=STATION_POINTER_FIELDS,
+                )
+
+            for station in moved_stations:
+                touched_cities.add(station.city)
+                if station.station_identifier in stored_stations:
+                    touched_cities.add(stored_stations[station.station_identifier][0])
+            stations.extend(moved_stations)
+
+        return stations
+
+    def _upsert_stations(self, stations, batch_size=1000):
+        """
+        Writes the stations with `INSERT ... ON CONFLICT DO UPDATE` statements of up to `batch_size` rows, which only
+        move a stored station whose latest reading is older than the new one, and returns the stations they inserted
+        or moved. PostgreSQL only.
+        """
+        opts = self.model._meta
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        fields = [field for field in opts.concrete_fields if not field.primary_key]
+        columns = ', '.join(quote(field.column) for field in fields)
+        key_columns = ', '.join(quote(opts.get_field(name).column) for name in STATION_KEY_FIELDS)
+        updates = ', '.join(
+            f"{column} = EXCLUDED.{column}" for column in (quote(opts.get_field(name).column) for name in STATION_POINTER_FIELDS)
+        )
+        recorded_at, object_id = quote(opts.get_field('recorded_at').column), quote(opts.get_field('object_id').column)
+        row_placeholder = f"({', '.join(['%s'] * len(fields))})"
+
+        ids = {}
+        with connection.cursor() as cursor:
+            for start in range(0, len(stations), batch_size):
+                batch = stations[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_placeholder] * len(batch))} "
+                    f"ON CONFLICT ({key_columns}) DO UPDATE SET {updates} "
+                    f"WHERE {table}.{recorded_at} IS NULL "
+                    f"OR ({table}.{recorded_at}, {table}.{object_id}) < (EXCLUDED.{recorded_at}, EXCLUDED.{object_id}) "
+                    f"RETURNING {quote(opts.pk.column)}, {quote(opts.get_field('station_identifier').column)}",
+                    [field.get_db_prep_save(field.pre_save(station, True), connection) for station in batch for field in fields]
+                )
+                ids.update({station_identifier: pk for pk, station_identifier in cursor.fetchall()})
+
+        moved_stations = [station for station in stations if station.station_identifier in ids]
+        for station in moved_stations:
+            station.pk = ids[station.station_identifier]
+            station._state.adding = False
+            station._state.db = self.db
+
+        return moved_stations
+
+    def get_nearby_stations(self, latitude, longitude, radius_km, limit=100):
+        """
+        Returns up to `limit` stations within `radius_km` of the point, nearest first, with their `distance_km`.
+        The grid cells covering the circle select the candidates through the cell index, and the haversine
+        distance keeps the ones inside the circle.
+        """
+        stations = []
+        for station in self._get_stations_in_box(*radius_bounding_box(latitude, longitude, radius_km)):
+            distance_km = haversine_km(latitude, longitude, station['latitude'], station['longitude'])
+            if distance_km <= radius_km:
+                stations.append({**station, 'distance_km': round(distance_km, 3)})
+
+        return heapq.nsmallest(limit, stations, key=itemgetter('distance_km'))
+
+    def get_stations_in_bounding_box(self, min_lat, min_lon, max_lat, max_lon, limit=1000):
+        """
+        Returns up to `limit` stations inside the bounding box, selected through the cell index.
+        """
+        return list(self._get_stations_in_box(min_lat, min_lon, max_lat, max_lon).order_by('id')[:limit])
+
+    def _get_stations_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        min_cell_lat, min_cell_lon = grid_cell(min_lat, min_lon)
+        max_cell_lat, max_cell_lon = grid_cell(max_lat, max_lon)
+
+        return self.filter(
+            cell_lat__range=(min_cell_lat, max_cell_lat),
+            cell_lon__range=(min_cell_lon, max_cell_lon),
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        ).values(*STATION_LOCATION_FIELDS)
+
+    def backfill_locations(self, batch_size=2000):
+        """
+        Sets the coordinates and grid cells of every station from its latest reading. Returns the number of stations updated.
+        """
+        updated = 0
+
+        for content_type_id in self.order_by().values_list('content_type', flat=True).distinct():
+            model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            try:
+                normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+            except ValueError:
+                continue
+
+            station_iterator = self.filter(content_type_id=content_type_id).order_by('pk').iterator(chunk_size=batch_size)
+            while stations := [station for _, station in zip(range(batch_size), station_iterator)]:
+                rows = {
+                    row['id']: row for row in model_class.objects.filter(
+                        id__in=[station.object_id for station in stations]
+                    ).values('id', *normalizer.fields).order_by()
+                }
+
+                for station in stations:
+                    station_data = normalizer.get_station_data(rows[station.object_id]) if station.object_id in rows else {}
+                    station.latitude = station_data.get('latitude')
+                    station.longitude = station_data.get('longitude')
+                    station.cell_lat, station.cell_lon = grid_cell(station.latitude, station.longitude)
+
+                self.bulk_update(stations, ['latitude', 'longitude', 'cell_lat', 'cell_lon'])
+                updated += len(stations)
+
+        return updated
+
     def get_aggregated_weather_data(self, city_name, return_raw_data=False):
-        stations = self.filter(city__iexact=city_name).select_related('content_type')
-        if not stations.exists():
+        if not return_raw_data and settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            return self._get_latest_normalized_readings(self.filter(city_key=make_city_key(city_name))) or None
+
+        stations = list(self.filter(city_key=make_city_key(city_name)).select_related('content_type'))
+        if not stations:
             return None
 
-        content_type_to_ids = {}
-        content_type_to_model_class = {}
+        model_records = self._get_latest_records(stations, return_raw_data)
 
+        aggregated_data = []
         for station in stations:
-            content_type = station.content_type
-            model_class = content_type.model_class()
-            content_type_to_model_class[content_type.id] = model_class  # Cache the model class lookup
+            record = model_records.get(station.content_type.model_class(), {}).get(station.object_id)
 
-            if model_class not in content_type_to_ids:
-                content_type_to_ids[model_class] = []
+            if record is not None:
+                aggregated_data.append(record)
 
-            content_type_to_ids[model_class].append(station.object_id)
+        return aggregated_data
 
-        model_instances = {}
-        for model_class, ids in content_type_to_ids.items():
-            instances = model_class.objects.filter(id__in=ids)
-            model_instances[model_class] = {instance.id: instance for instance in instances}
+    def get_city_validator(self, city_name):
+        """
+        Returns `(station count, latest station update)` of a city, or `None` if it has no stations. Every change of
+        the latest readings of the city moves a station to a new reading or adds or removes one, so it changes the pair.
+        A single aggregate over the `(city_key, updated_at)` index, for conditional GETs.
+        """
+        validator = self.filter(city_key=make_city_key(city_name)).aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        if not validator['count']:
+            return None
+        return validator['count'], validator['updated_at']
 
-        aggregated_data = []
+    def get_cities_weather_data(self, city_names, return_raw_data=False, providers=None, since=None, until=None):
+        """
+        `get_aggregated_weather_data` for several cities at once, returning `{city name: records}` in the order of
+        `city_names`, with an empty list for cities without matching stations. `providers` restricts the stations
+        to these provider model names, `since` and `until` to those whose latest reading is within `[since, until)`.
+        Takes one station query and one query per provider, or a single query for normalized readings
+        with `WEATHER_NORMALIZED_READINGS_ENABLED`, whatever the number of cities.
+        """
+        city_keys = {city_name: make_city_key(city_name) for city_name in city_names}
+
+        stations = self.filter(city_key__in=set(city_keys.values()))
+        if providers is not None:
+            stations = stations.filter(content_type__model__in=providers)
+        if since is not None:
+            stations = stations.filter(recorded_at__gte=since)
+        if until is not None:
+            stations = stations.filter(recorded_at__lt=until)
+
+        city_records = {}
+        if not return_raw_data and settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            for record in self._get_latest_normalized_readings(stations, extra_fields=('city_key', )):
+                city_records.setdefault(record.pop('city_key'), []).append(record)
+        else:
+            stations = list(stations.select_related('content_type'))
+            model_records = self._get_latest_records(stations, return_raw_data)
+
+            for station in stations:
+                record = model_records.get(station.content_type.model_class(), {}).get(station.object_id)
+
+                if record is not None:
+                    city_records.setdefault(station.city_key, []).append(record)
+
+        return {city_name: city_records.get(city_key, []) for city_name, city_key in city_keys.items()}
+
+    def _get_latest_records(self, stations, return_raw_data):
+        """
+        Returns `{model_class: {id: record}}` of the readings the stations point at, with one query per provider.
+        """
+        model_class_to_ids = {}
         for station in stations:
-            station_model_class = content_type_to_model_class[station.content_type.id]
-            station_instance = model_instances.get(station_model_class, {}).get(station.object_id)
+            model_class_to_ids.setdefault(station.content_type.model_class(), []).append(station.object_id)
 
-            if not station_instance:
+        model_records = {}
+        for model_class, ids in model_class_to_ids.items():
+            try:
+                rows, to_record = self._get_reading_rows(
+                    model_class,
+                    model_class.objects.filter(id__in=ids),
+                    return_raw_data
+                )
+            except ValueError:
                 continue
 
+            model_records[model_class] = {row['id']: to_record(row) for row in rows}
+
+        return model_records
+
+    async def aget_aggregated_weather_data(self, city_name, return_raw_data=False):
+        """
+        Async version of `get_aggregated_weather_data` for the ASGI views. The provider queries are awaited together
+        with `asyncio.gather` and read with `aiterator`.
+        """
+        if not return_raw_data and settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            return await sync_to_async(self._get_latest_normalized_readings)(
+                self.filter(city_key=make_city_key(city_name))
+            ) or None
+
+        stations = [
+            station async for station in self.filter(city_key=make_city_key(city_name)).select_related('content_type')
+        ]
+        if not stations:
+            return None
+
+        model_class_to_ids = {}
+        for station in stations:
+            model_class_to_ids.setdefault(station.content_type.model_class(), []).append(station.object_id)
+
+        provider_rows = {}
+        for model_class, ids in model_class_to_ids.items():
             try:
-                serializer_class = WeatherSerializerFactory.get_serializer(station_instance)
+                provider_rows[model_class] = self._get_reading_rows(
+                    model_class,
+                    model_class.objects.filter(id__in=ids),
+                    return_raw_data
+                )
             except ValueError:
                 continue
 
-            serializer = serializer_class(station_instance, context={'return_raw_data': return_raw_data})
-            aggregated_data.append(serializer.data)
+        async def read_records(rows, to_record):
+            return {row['id']: to_record(row) async for row in rows.aiterator()}
+
+        model_records = dict(zip(provider_rows, await asyncio.gather(*(
+            read_records(rows, to_record) for rows, to_record in provider_rows.values()
+        ))))
+
+        aggregated_data = []
+        for station in stations:
+            record = model_records.get(station.content_type.model_class(), {}).get(station.object_id)
+
+            if record is not None:
+                aggregated_data.append(record)
 
         return aggregated_data
+
+    def get_weather_history(self, city_name, return_raw_data=False, since=None, until=None, limit=100, cursor=None):
+        """
+        Returns a page of the readings of a city within `[since, until)`, ordered by timestamp, provider and id,
+        together with the cursor of the next page (`None` on the last page). Returns `None` if the city has no stations.
+        """
+        history_querysets = self._get_history_querysets(city_name, return_raw_data, since, until, cursor)
+        if history_querysets is None:
+            return None
+
+        provider_readings = [
+            self._with_cursors(rows[:limit + 1], get_cursor, to_record)
+            for rows, get_cursor, to_record in history_querysets
+        ]
+
+        readings = list(heapq.merge(*provider_readings, key=lambda reading: reading[0]))
+        next_cursor = readings[limit - 1][0] if len(readings) > limit else None
+
+        history = [to_record(row) for _, row, to_record in readings[:limit]]
+
+        return history, next_cursor
+
+    def iter_weather_history(self, city_name, return_raw_data=False, since=None, until=None, chunk_size=2000):
+        """
+        Generator version of `get_weather_history` over the whole `[since, until)` window.
+        Provider rows are read with server-side cursors in chunks of `chunk_size` and every reading is
+        serialized as it is produced. Returns `None` if the city has no stations.
+        """
+        history_querysets = self._get_history_querysets(city_name, return_raw_data, since, until)
+        if history_querysets is None:
+            return None
+
+        provider_readings = [
+            self._with_cursors(rows.iterator(chunk_size=chunk_size), get_cursor, to_record)
+            for rows, get_cursor, to_record in history_querysets
+        ]
+
+        return (
+            to_record(row)
+            for _, row, to_record in heapq.merge(*provider_readings, key=lambda reading: reading[0])
+        )
+
+    def _get_history_querysets(self, city_name, return_raw_data, since=None, until=None, cursor=None):
+        """
+        Returns `(rows, get_cursor, to_record)` for every provider with stations in the city,
+        the rows ordered by their cursors. Returns `None` if the city has no stations.
+        """
+        if not return_raw_data and settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            return self._get_normalized_history_querysets(city_name, since, until, cursor)
+
+        city_readings = self._get_city_readings(city_name, since, until)
+        if city_readings is None:
+            return None
+
+        history_querysets = []
+        for model_class, serializer_class, instances in city_readings:
+            provider = model_class._meta.model_name
+            timestamp_field = serializer_class.timestamp_field
+
+            if cursor is not None:
+                instances = instances.filter(self._after_cursor(provider, timestamp_field, cursor))
+
+            try:
+                rows, to_record = self._get_reading_rows(
+                    model_class,
+                    instances.order_by(timestamp_field, 'id'),
+                    return_raw_data,
+                    extra_fields=(timestamp_field,)
+                )
+            except ValueError:
+                continue
+
+            history_querysets.append((rows, self._provider_cursor(provider, timestamp_field), to_record))
+
+            if settings.WEATHER_ARCHIVE_ENABLED:
+                history_querysets.append(
+                    self._get_archived_history_queryset(model_class, city_name, return_raw_data, since, until, cursor)
+                )
+
+        return history_querysets
+
+    def _get_city_readings(self, city_name, since=None, until=None):
+        """
+        Returns `(model_class, serializer_class, queryset)` for every provider with stations in the city,
+        the queryset holding the provider's readings of the city within `[since, until)`.
+        Returns `None` if the city has no stations.
+        """
+        city_key = make_city_key(city_name)
+        content_type_ids = list(
+            self.filter(city_key=city_key).values_list('content_type', flat=True).order_by('content_type').distinct()
+        )
+
+        if not content_type_ids:
+            return None
+
+        city_readings = []
+        for content_type_id in content_type_ids:
+            model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            try:
+                serializer_class = WeatherSerializerFactory.get_serializer(model_class)
+            except ValueError:
+                continue
+
+            timestamp_field = serializer_class.timestamp_field
+
+            # Served by the provider's (city_key, timestamp) index
+            instances = model_class.objects.filter(city_key=city_key)
+            if since is not None:
+                instances = instances.filter(**{f'{timestamp_field}__gte': since})
+            if until is not None:
+                instances = instances.filter(**{f'{timestamp_field}__lt': until})
+
+            city_readings.append((model_class, serializer_class, instances))
+
+        return city_readings
+
+    def iter_export_batches(self, city_names, providers=None, since=None, until=None, chunk_size=5000):
+        """
+        Yields the normalized readings of the cities within `[since, until)` as batches of at most `chunk_size`
+        readings, each a `{column: values}` dict of the `EXPORT_COLUMNS`. The readings come provider by provider,
+        ordered by timestamp, and are read with server-side cursors, so only one batch is held in memory.
+        The provider rows are normalized by the database with the `metrics` and `columns` expressions of their
+        normalizer, Fahrenheit converted to Celsius included. With `WEATHER_NORMALIZED_READINGS_ENABLED` they are
+        read from `NormalizedReading` instead. `providers` restricts the readings to these provider model names.
+        """
+        from stations.models import NormalizedReading  # stations.models imports this module
+
+        city_keys = {make_city_key(city_name) for city_name in city_names}
+
+        if settings.WEATHER_NORMALIZED_READINGS_ENABLED:
+            readings = self._in_window(NormalizedReading.objects.filter(city_key__in=city_keys), 'timestamp', since, until)
+            if providers is not None:
+                readings = readings.filter(provider__in=providers)
+
+            rows = readings.order_by('provider', 'timestamp', 'object_id').values_list(*EXPORT_COLUMNS)
+            for chunk in self._chunked(rows.iterator(chunk_size=chunk_size), chunk_size):
+                yield dict(zip(EXPORT_COLUMNS, map(list, zip(*chunk))))
+            return
+
+        for provider, serializer_class in SERIALIZER_MAPPING.items():
+            if providers is not None and provider not in providers:
+                continue
+
+            model_class = serializer_class.Meta.model
+            normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+
+            if settings.WEATHER_ARCHIVE_ENABLED:  # the archived readings are the older ones
+                records = self._iter_archived_export_records(model_class, city_keys, since, until, chunk_size)
+                for chunk in self._chunked(records, chunk_size):
+                    yield {
+                        'provider': [provider] * len(chunk),
+                        **{
+                            field: [encode_metric(record[field]) for record in chunk]
+                            for field in DEFAULT_WEATHER_FIELDS
+                        },
+                    }
+
+            # Aliased, the normalized field names may be model fields holding other values
+            expressions = {**normalizer.metrics, **normalizer.columns}
+            aliases = {f'export_{field}': expressions[field] for field in DEFAULT_WEATHER_FIELDS if field in expressions}
+
+            readings = self._in_window(
+                model_class.objects.filter(city_key__in=city_keys), serializer_class.timestamp_field, since, until
+            )
+            rows = readings.order_by(serializer_class.timestamp_field, 'id').annotate(**aliases).values_list(*aliases)
+
+            for chunk in self._chunked(rows.iterator(chunk_size=chunk_size), chunk_size):
+                columns = dict(zip(aliases, map(list, zip(*chunk))))
+                yield {
+                    'provider': [provider] * len(chunk),
+                    **{field: columns.get(f'export_{field}', [None] * len(chunk)) for field in DEFAULT_WEATHER_FIELDS},
+                }
+
+    def _iter_archived_export_records(self, model_class, city_keys, since, until, chunk_size):
+        from stations.models import ArchivedReading  # stations.models imports this module
+
+        readings = self._in_window(
+            ArchivedReading.objects.filter(content_type=ContentType.objects.get_for_model(model_class), city_key__in=city_keys),
+            'timestamp', since, until
+        )
+        rows = readings.order_by('timestamp', 'object_id').values('line', 'segment__path', 'segment__compression')
+
+        reader = ArchiveReader(model_class)
+        normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield normalizer(reader.get_row(row['segment__path'], row['segment__compression'], row['line']))
+
+    @staticmethod
+    def _in_window(queryset, timestamp_field, since=None, until=None):
+        if since is not None:
+            queryset = queryset.filter(**{f'{timestamp_field}__gte': since})
+        if until is not None:
+            queryset = queryset.filter(**{f'{timestamp_field}__lt': until})
+        return queryset
+
+    @staticmethod
+    def _chunked(rows, chunk_size):
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+
+    def get_weather_statistics(self, city_name, bucket='hour', group_by='city', since=None, until=None):
+        """
+        Aggregates the readings of a city into `hour` or `day` buckets, grouped by `city`, `provider` or `station`.
+        Every metric gets its mean, min and max in normalized units. Windows on bucket boundaries are read from
+        the rollups, other windows, and cities without rollups yet (not backfilled with `rebuild_weather_rollups`),
+        are aggregated from the provider tables. Returns `None` if the city has no stations.
+        """
+        from stations.models import WeatherRollup  # stations.models imports this module
+
+        city_key = make_city_key(city_name)
+        if (
+            is_bucket_start(since, bucket) and is_bucket_start(until, bucket)
+            and WeatherRollup.objects.filter(city_key=city_key, granularity=bucket).exists()
+        ):
+            if not self.filter(city_key=city_key).exists():
+                return None
+            rows = WeatherRollup.objects.get_city_rows(city_name, bucket, group_by, since, until)
+        else:
+            city_readings = self._get_city_readings(city_name, since, until)
+            if city_readings is None:
+                return None
+            rows = self._get_city_reading_rows(city_readings, bucket, group_by)
+            if settings.WEATHER_ARCHIVE_ENABLED:  # the rollups cover the archived readings, the provider tables do not
+                rows = chain(self._get_archived_city_reading_rows(city_name, bucket, group_by, since, until), rows)
+
+        buckets = {}
+        for bucket_start, group, row in rows:
+            merged = buckets.setdefault((bucket_start, group), {
+                'count': 0,
+                **{metric: {'count': 0, 'sum': 0.0, 'min': None, 'max': None} for metric in STATISTIC_METRICS},
+            })
+            merged['count'] += row['count']
+
+            for metric in STATISTIC_METRICS:
+                if not row.get(f'{metric}_count'):
+                    continue
+
+                statistic = merged[metric]
+                statistic['count'] += row[f'{metric}_count']
+                statistic['sum'] += row[f'{metric}_sum']
+                statistic['min'] = merge_extreme(min, statistic['min'], row[f'{metric}_min'])
+                statistic['max'] = merge_extreme(max, statistic['max'], row[f'{metric}_max'])
+
+        statistics = []
+        for (bucket_start, group), merged in sorted(buckets.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+            entry = {'bucket_start': bucket_start}
+            if group_by != 'city':
+                entry[group_by] = group
+            entry['count'] = merged['count']
+
+            for metric in STATISTIC_METRICS:
+                statistic = merged[metric]
+                entry[metric] = {
+                    'mean': statistic['sum'] / statistic['count'] if statistic['count'] else None,
+                    'min': statistic['min'],
+                    'max': statistic['max'],
+                }
+
+            statistics.append(entry)
+
+        return statistics
+
+    @staticmethod
+    def _get_city_reading_rows(city_readings, bucket, group_by):
+        """
+        Yields `(bucket_start, group, row)` for the aggregated provider readings of a city.
+        """
+        for model_class, serializer_class, instances in city_readings:
+            group_fields = [serializer_class.station_id_field] if group_by == 'station' else []
+
+            try:
+                rows = aggregate_readings(model_class, serializer_class, instances, bucket, group_fields)
+            except ValueError:
+                continue
+
+            for row in rows:
+                if group_by == 'provider':
+                    group = model_class._meta.model_name
+                elif group_by == 'station':
+                    group = row[serializer_class.station_id_field]
+                else:
+                    group = None
+
+                yield row['bucket_start'], group, row
+
+    def _get_archived_city_reading_rows(self, city_name, bucket, group_by, since=None, until=None):
+        """
+        `_get_city_reading_rows` for the archived readings of a city within `[since, until)`.
+        """
+        from stations.models import ArchivedReading  # stations.models imports this module
+
+        archived_readings = self._in_window(
+            ArchivedReading.objects.filter(city_key=make_city_key(city_name)), 'timestamp', since, until
+        )
+        content_type_ids = archived_readings.values_list('content_type', flat=True).order_by('content_type').distinct()
+
+        for content_type_id in list(content_type_ids):
+            model_class = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            try:
+                serializer_class = WeatherSerializerFactory.get_serializer(model_class)
+                group_fields = [serializer_class.station_id_field] if group_by == 'station' else []
+                rows = aggregate_archived_readings(
+                    model_class, serializer_class, archived_readings.filter(content_type=content_type_id), bucket, group_fields
+                )
+            except ValueError:
+                continue
+
+            for row in rows:
+                if group_by == 'provider':
+                    group = model_class._meta.model_name
+                elif group_by == 'station':
+                    group = row[serializer_class.station_id_field]
+                else:
+                    group = None
+
+                yield row['bucket_start'], group, row
+
+    @staticmethod
+    def _get_reading_rows(model_class, queryset, return_raw_data, extra_fields=()):
+        """
+        Returns the readings of the queryset as `values()` rows holding only the columns the response format needs,
+        with the function that turns a row into its record: the received payload for raw readings, the provider
+        normalizer's fields for normalized ones. Raises `ValueError` for models without a registered serializer or normalizer.
+        """
+        if return_raw_data:
+            serializer_class = WeatherSerializerFactory.get_serializer(model_class)
+            fields, to_record = serializer_class.get_raw_data_columns(), serializer_class.rebuild_raw_data
+        else:
+            normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+            fields, to_record = normalizer.fields, normalizer
+
+        return queryset.values(*dict.fromkeys(('id', *fields, *extra_fields))), to_record
+
+    def _get_archived_history_queryset(self, model_class, city_name, return_raw_data, since=None, until=None, cursor=None):
+        """
+        `(rows, get_cursor, to_record)` of the archived readings of a provider in the city: the `ArchivedReading`
+        index rows, ordered like the provider rows, and a function that loads the reading from its segment.
+        """
+        from stations.models import ArchivedReading  # stations.models imports this module
+
+        provider = model_class._meta.model_name
+        readings = ArchivedReading.objects.filter(
+            content_type=ContentType.objects.get_for_model(model_class),
+            city_key=make_city_key(city_name),
+        )
+        if since is not None:
+            readings = readings.filter(timestamp__gte=since)
+        if until is not None:
+            readings = readings.filter(timestamp__lt=until)
+        if cursor is not None:
+            readings = readings.filter(self._after_cursor(provider, 'timestamp', cursor, id_field='object_id'))
+
+        rows = readings.order_by('timestamp', 'object_id').values(
+            'object_id', 'timestamp', 'line', 'segment__path', 'segment__compression'
+        )
+
+        reader = ArchiveReader(model_class)
+        to_archived_row = lambda row: reader.get_row(row['segment__path'], row['segment__compression'], row['line'])
+        if return_raw_data:
+            serializer_class = WeatherSerializerFactory.get_serializer(model_class)
+            to_record = lambda row: serializer_class.rebuild_raw_data(to_archived_row(row))
+        else:
+            normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+            to_record = lambda row: normalizer(to_archived_row(row))
+
+        return rows, self._provider_cursor(provider, 'timestamp', id_field='object_id'), to_record
+
+    def _get_latest_normalized_readings(self, stations, extra_fields=()):
+        """
+        Returns the latest normalized reading of every station of the `stations` queryset with a single query,
+        joining `NormalizedReading` on the readings the `Station` rows point at.
+        """
+        from stations.models import NormalizedReading  # stations.models imports this module
+
+        return list(NormalizedReading.objects.filter(Exists(stations.filter(
+            content_type=OuterRef('content_type'),
+            object_id=OuterRef('object_id'),
+        ))).order_by('provider', 'station_id').values(*extra_fields, *DEFAULT_WEATHER_FIELDS))
+
+    def _get_normalized_history_querysets(self, city_name, since=None, until=None, cursor=None):
+        """
+        `_get_history_querysets` for normalized readings: one range scan on the `(city_key, timestamp)` index
+        of `NormalizedReading`, ordered by timestamp, provider and provider id.
+        """
+        from stations.models import NormalizedReading  # stations.models imports this module
+
+        city_key = make_city_key(city_name)
+        if not self.filter(city_key=city_key).exists():
+            return None
+
+        readings = NormalizedReading.objects.filter(city_key=city_key)
+        if since is not None:
+            readings = readings.filter(timestamp__gte=since)
+        if until is not None:
+            readings = readings.filter(timestamp__lt=until)
+        if cursor is not None:
+            readings = readings.filter(
+                Q(timestamp__gt=cursor.timestamp) |
+                Q(timestamp=cursor.timestamp, provider__gt=cursor.provider) |
+                Q(timestamp=cursor.timestamp, provider=cursor.provider, object_id__gt=cursor.id)
+            )
+
+        rows = readings.order_by('timestamp', 'provider', 'object_id').values(
+            'provider', 'object_id', *DEFAULT_WEATHER_FIELDS
+        )
+
+        return [(
+            rows,
+            lambda row: ReadingCursor(row['timestamp'], row['provider'], row['object_id']),
+            lambda row: {field: row[field] for field in DEFAULT_WEATHER_FIELDS},
+        )]
+
+    @staticmethod
+    def _provider_cursor(provider, timestamp_field, id_field='id'):
+        return lambda row: ReadingCursor(row[timestamp_field], provider, row[id_field])
+
+    @staticmethod
+    def _with_cursors(rows, get_cursor, to_record):
+        for row in rows:
+            yield get_cursor(row), row, to_record
+
+    @staticmethod
+    def _after_cursor(provider, timestamp_field, cursor, id_field='id'):
+        if provider < cursor.provider:
+            return Q(**{f'{timestamp_field}__gt': cursor.timestamp})
+        if provider > cursor.provider:
+            return Q(**{f'{timestamp_field}__gte': cursor.timestamp})
+        return (
+            Q(**{f'{timestamp_field}__gt': cursor.timestamp}) |
+            Q(**{timestamp_field: cursor.timestamp, f'{id_field}__gt': cursor.id})
+        )
+
+
+class WeatherRollupManager(models.Manager):
+    def record_readings(self, readings):
+        """
+        Adds readings to the hourly and daily rollups of their stations. `readings` is an iterable of
+        `(instance, station_data)` pairs as taken by `Station.objects.record_readings`.
+        """
+        timestamp_field = models.DateTimeField()
+        rollups = {}
+
+        for instance, station_data in readings:
+            try:
+                metrics = WeatherSerializerFactory.get_normalizer(type(instance)).metrics
+            except ValueError:
+                continue
+
+            content_type = ContentType.objects.get_for_model(instance)
+            timestamp = timestamp_field.to_python(station_data.get('timestamp'))
+
+            for granularity in ROLLUP_GRANULARITIES:
+                key = (
+                    granularity,
+                    content_type.id,
+                    station_data.get('station_id'),
+                    make_city_key(station_data.get('city')),
+                    truncate_to_bucket(timestamp, granularity),
+                )
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = self.model(
+                        granularity=key[0],
+                        content_type_id=key[1],
+                        station_identifier=key[2],
+                        city=station_data.get('city'),
+                        city_key=key[3],
+                        bucket_start=key[4],
+                    )
+
+                rollup.count += 1
+                for metric in metrics:
+                    value = station_data.get(metric)
+                    if value is None:
+                        continue
+
+                    value = float(value)
+                    setattr(rollup, f'{metric}_count', getattr(rollup, f'{metric}_count') + 1)
+                    setattr(rollup, f'{metric}_sum', getattr(rollup, f'{metric}_sum') + value)
+                    setattr(rollup, f'{metric}_min', merge_extreme(min, getattr(rollup, f'{metric}_min'), value))
+                    setattr(rollup, f'{metric}_max', merge_extreme(max, getattr(rollup, f'{metric}_max'), value))
+
+        if not rollups:
+            return
+
+        if connection.vendor == 'postgresql':
+            self._upsert_rollups(rollups)
+            return
+
+        try:
+            with transaction.atomic():
+                self._add_to_rollups(rollups)
+        except IntegrityError:
+            # A concurrent request created one of the rollups first, so the retry adds to it instead
+            with transaction.atomic():
+                self._add_to_rollups(rollups)
+
+    def _upsert_rollups(self, rollups, batch_size=1000):
+        """
+        Adds the rollups to the stored ones with `INSERT ... ON CONFLICT DO UPDATE`, without locking them first:
+        counts and sums are added, extremes merged with `LEAST` and `GREATEST`, which skip NULLs.
+        The rows are written in key order, so concurrent batches lock shared rollups in the same order. PostgreSQL only.
+        """
+        opts = self.model._meta
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        key_columns = ', '.join(quote(opts.get_field(name).column) for name in ROLLUP_KEY_FIELDS)
+        fields = [opts.get_field(name) for name in (*ROLLUP_KEY_FIELDS, 'city', *ROLLUP_FIELDS)]
+        columns = ', '.join(quote(field.column) for field in fields)
+
+        updates = []
+        for name in ROLLUP_FIELDS:
+            column = quote(opts.get_field(name).column)
+            if name.endswith('_min'):
+                updates.append(f"{column} = LEAST({table}.{column}, EXCLUDED.{column})")
+            elif name.endswith('_max'):
+                updates.append(f"{column} = GREATEST({table}.{column}, EXCLUDED.{column})")
+            else:
+                updates.append(f"{column} = {table}.{column} + EXCLUDED.{column}")
+
+        keys = sorted(rollups)
+        row_placeholder = f"({', '.join(['%s'] * len(fields))})"
+        with connection.cursor() as cursor:
+            for start in range(0, len(keys), batch_size):
+                batch = [rollups[key] for key in keys[start:start + batch_size]]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_placeholder] * len(batch))} "
+                    f"ON CONFLICT ({key_columns}) DO UPDATE SET {', '.join(updates)}",
+                    [field.get_db_prep_save(getattr(rollup, field.attname), connection) for rollup in batch for field in fields]
+                )
+
+    def _add_to_rollups(self, rollups):
+        """
+        `_upsert_rollups` for the other databases: the stored rollups are locked, added to in Python and written back.
+        Returns the number of rollups created.
+        """
+        keys = sorted(rollups)
+        existing_rollups = {
+            (rollup.granularity, rollup.content_type_id, rollup.station_identifier, rollup.city_key, rollup.bucket_start): rollup
+            for rollup in self.select_for_update().filter(
+                granularity__in={key[0] for key in keys},
+                content_type_id__in={key[1] for key in keys},
+                station_identifier__in={key[2] for key in keys},
+                city_key__in={key[3] for key in keys},
+                bucket_start__in={key[4] for key in keys},
+            ).order_by('pk')
+        }
+
+        rollups_to_create = []
+        rollups_to_update = []
+
+        for key in keys:
+            rollup = existing_rollups.get(key)
+            if rollup is None:
+                rollups_to_create.append(rollups[key])
+                continue
+
+            added = rollups[key]
+            rollup.count += added.count
+            for metric in STATISTIC_METRICS:
+                setattr(rollup, f'{metric}_count', getattr(rollup, f'{metric}_count') + getattr(added, f'{metric}_count'))
+                setattr(rollup, f'{metric}_sum', getattr(rollup, f'{metric}_sum') + getattr(added, f'{metric}_sum'))
+                for statistic, pick in (('min', min), ('max', max)):
+                    field = f'{metric}_{statistic}'
+                    setattr(rollup, field, merge_extreme(pick, getattr(rollup, field), getattr(added, field)))
+            rollups_to_update.append(rollup)
+
+        self.bulk_create(rollups_to_create)
+        self.bulk_update(rollups_to_update, ROLLUP_FIELDS)
+        return len(rollups_to_create)
+
+    def rebuild(self, granularities=ROLLUP_GRANULARITIES, batch_size=2000):
+        """
+        Recomputes the rollups of every registered provider from its readings, replacing the stored ones.
+        The archived readings are read back from their segments and added, so the rollups keep covering them.
+        Returns the number of rollups written.
+        """
+        from stations.models import ArchivedReading  # stations.models imports this module
+
+        written = 0
+
+        for serializer_class in SERIALIZER_MAPPING.values():
+            model_class = serializer_class.Meta.model
+            content_type = ContentType.objects.get_for_model(model_class)
+            group_fields = (serializer_class.station_id_field, 'city_key')
+
+            for granularity in granularities:
+                try:
+                    rows = aggregate_readings(
+                        model_class, serializer_class, model_class.objects.all(), granularity, group_fields
+                    ).annotate(display_city=Min(serializer_class.city_field))
+                except ValueError:
+                    continue
+
+                with transaction.atomic():
+                    self.filter(granularity=granularity, content_type=content_type).delete()
+
+                    batch = []
+                    for row in rows.iterator(chunk_size=batch_size):
+                        batch.append(self.model(
+                            granularity=granularity,
+                            content_type=content_type,
+                            station_identifier=row[serializer_class.station_id_field],
+                            city=row['display_city'],
+                            city_key=row['city_key'],
+                            bucket_start=row['bucket_start'],
+                            **{field: row[field] for field in ROLLUP_FIELDS if row.get(field) is not None},
+                        ))
+
+                        if len(batch) >= batch_size:
+                            self.bulk_create(batch)
+                            written += len(batch)
+                            batch = []
+
+                    self.bulk_create(batch)
+                    written += len(batch)
+
+                    # Buckets holding both archived and table readings are added to the rollups written above
+                    archived_rows = aggregate_archived_readings(
+                        model_class, serializer_class, ArchivedReading.objects.filter(content_type=content_type),
+                        granularity, group_fields
+                    )
+                    for start in range(0, len(archived_rows), batch_size):
+                        rollups = {}
+                        for row in archived_rows[start:start + batch_size]:
+                            rollup = self.model(
+                                granularity=granularity,
+                                content_type=content_type,
+                                station_identifier=row[serializer_class.station_id_field],
+                                city=row['display_city'],
+                                city_key=row['city_key'],
+                                bucket_start=row['bucket_start'],
+                                **{field: row[field] for field in ROLLUP_FIELDS if row.get(field) is not None},
+                            )
+                            rollups[(granularity, content_type.id, rollup.station_identifier, rollup.city_key, rollup.bucket_start)] = rollup
+
+                        written += self._add_to_rollups(rollups)
+
+        return written
+
+    def get_city_rows(self, city_name, bucket, group_by, since=None, until=None):
+        """
+        Yields `(bucket_start, group, row)` for the rollups of a city, summed per bucket and group in the database.
+        """
+        rollups = self.filter(city_key=make_city_key(city_name), granularity=bucket)
+        if since is not None:
+            rollups = rollups.filter(bucket_start__gte=since)
+        if until is not None:
+            rollups = rollups.filter(bucket_start__lt=until)
+
+        group_fields = {'provider': ['content_type'], 'station': ['station_identifier']}.get(group_by, [])
+
+        aggregates = {'count': Sum('count')}
+        for metric in STATISTIC_METRICS:
+            aggregates[f'{metric}_count'] = Sum(f'{metric}_count')
+            aggregates[f'{metric}_sum'] = Sum(f'{metric}_sum')
+            aggregates[f'{metric}_min'] = Min(f'{metric}_min')
+            aggregates[f'{metric}_max'] = Max(f'{metric}_max')
+
+        for row in rollups.values('bucket_start', *group_fields).annotate(**aggregates).order_by():
+            if group_by == 'provider':
+                group = ContentType.objects.get_for_id(row['content_type']).model
+            elif group_by == 'station':
+                group = row['station_identifier']
+            else:
+                group = None
+
+            yield row['bucket_start'], group, row
+
+
+class NormalizedReadingManager(models.Manager):
+    def record_readings(self, readings):
+        """
+        Stores the normalized fields of the readings. `readings` is an iterable of `(instance, station_data)`
+        pairs as taken by `Station.objects.record_readings`. Readings that are already stored are skipped.
+        """
+        self.bulk_create([
+            self._from_station_data(ContentType.objects.get_for_model(instance), instance.id, station_data)
+            for instance, station_data in readings
+        ], ignore_conflicts=True)
+
+    def rebuild(self, batch_size=2000):
+        """
+        Recomputes the normalized readings of every registered provider from its readings, replacing the stored ones.
+        The archived readings are read back from their segments, so they keep their normalized rows.
+        Returns the number of readings written.
+        """
+        from stations.models import ArchivedReading  # stations.models imports this module
+
+        written = 0
+
+        for serializer_class in SERIALIZER_MAPPING.values():
+            model_class = serializer_class.Meta.model
+            content_type = ContentType.objects.get_for_model(model_class)
+
+            try:
+                normalizer = WeatherSerializerFactory.get_normalizer(model_class)
+            except ValueError:
+                continue
+
+            with transaction.atomic():
+                self.filter(content_type=content_type).delete()
+
+                reader = ArchiveReader(model_class)
+                archived_rows = (
+                    reader.get_row(index_row['segment__path'], index_row['segment__compression'], index_row['line'])
+                    for index_row in ArchivedReading.objects.filter(content_type=content_type)
+                    .order_by('timestamp', 'object_id').values('line', 'segment__path', 'segment__compression')
+                    .iterator(chunk_size=batch_size)
+                )
+                rows = model_class.objects.values('id', *normalizer.fields).order_by()
+
+                batch = []
+                for row in chain(archived_rows, rows.iterator(chunk_size=batch_size)):
+                    batch.append(self._from_station_data(content_type, row['id'], normalizer.get_station_data(row)))
+
+                    if len(batch) >= batch_size:
+                        self.bulk_create(batch)
+                        written += len(batch)
+                        batch = []
+
+                self.bulk_create(batch)
+                written += len(batch)
+
+        return written
+
+    def _from_station_data(self, content_type, object_id, station_data):
+        return self.model(
+            content_type=content_type,
+            object_id=object_id,
+            provider=content_type.model,
+            city_key=make_city_key(station_data.get('city')),
+            **{field: station_data.get(field) for field in DEFAULT_WEATHER_FIELDS},
+        )
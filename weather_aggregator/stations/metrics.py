@@ -0,0 +1,266 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Labels of the requests that did not resolve to a view, so unknown paths do not create new series
+UNMATCHED_VIEW = 'unmatched'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-wide request and query metrics, labelled by URL name and provider. Every update takes one lock and
+    touches a few preallocated counters. With several worker processes each process exposes its own numbers.
+    """
+    HISTOGRAMS = {
+        'weather_http_request_duration_seconds': ('Request latency.', LATENCY_BUCKETS),
+        'weather_http_response_size_bytes': ('Size of the response body, streamed responses excluded.', SIZE_BUCKETS),
+        'weather_serialization_duration_seconds': ('Time spent rendering the response body.', LATENCY_BUCKETS),
+        'weather_db_query_duration_seconds': ('Duration of the SQL queries of a request.', QUERY_LATENCY_BUCKETS),
+    }
+    COUNTERS = {
+        'weather_http_requests_total': 'Requests by response status.',
+        'weather_db_queries_total': 'SQL queries executed while serving requests.',
+        'weather_db_rows_total': 'Rows returned or changed by the SQL queries, where the database reports them.',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._counters = {name: {} for name in self.COUNTERS}
+
+    def observe_request(self, labels, status_code, duration, response_size, query_metrics):
+        with self._lock:
+            self._observe('weather_http_request_duration_seconds', labels, duration)
+            if response_size is not None:
+                self._observe('weather_http_response_size_bytes', labels, response_size)
+            self._increment('weather_http_requests_total', (*labels, str(status_code)), 1)
+            self._increment('weather_db_queries_total', labels, query_metrics.queries)
+            self._increment('weather_db_rows_total', labels, query_metrics.rows)
+
+            query_durations = self._histograms['weather_db_query_duration_seconds'].get(labels)
+            if query_durations is None:
+                query_durations = self._histograms['weather_db_query_duration_seconds'][labels] = Histogram(QUERY_LATENCY_BUCKETS)
+            for bucket, bucket_count in enumerate(query_metrics.bucket_counts):
+                query_durations.counts[bucket] += bucket_count
+            query_durations.sum += query_metrics.duration
+            query_durations.count += query_metrics.queries
+
+    def observe_serialization(self, labels, duration):
+        with self._lock:
+            self._observe('weather_serialization_duration_seconds', labels, duration)
+
+    def clear(self):
+        with self._lock:
+            for series in (*self._histograms.values(), *self._counters.values()):
+                series.clear()
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    label_text = format_labels(('view', 'provider'), labels)
+                    cumulative = 0
+                    for bound, bucket_count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{label_text}}} {histogram.count}')
+
+            for name, help_text in self.COUNTERS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for labels, value in sorted(self._counters[name].items()):
+                    label_names = ('view', 'provider', 'status')[:len(labels)]
+                    lines.append(f'{name}{{{format_labels(label_names, labels)}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _observe(self, name, labels, value):
+        histogram = self._histograms[name].get(labels)
+        if histogram is None:
+            histogram = self._histograms[name][labels] = Histogram(self.HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+    def _increment(self, name, labels, value):
+        self._counters[name][labels] = self._counters[name].get(labels, 0) + value
+
+
+def render_counter(name, help_text, value):
+    """
+    Returns an unlabelled counter in the Prometheus text exposition format, for counters kept outside the registry.
+    """
+    return f'# HELP {name} {help_text}\n# TYPE {name} counter\n{name} {value}\n'
+
+
+def format_labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+
+
+class QueryMetrics:
+    """
+    `execute_wrapper` that counts the queries of one request, their duration per latency bucket and their rows.
+    """
+    __slots__ = ('queries', 'rows', 'duration', 'bucket_counts')
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.duration = 0.0
+        self.bucket_counts = [0] * (len(QUERY_LATENCY_BUCKETS) + 1)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.duration += duration
+            self.bucket_counts[bisect_left(QUERY_LATENCY_BUCKETS, duration)] += 1
+
+            rowcount = getattr(context['cursor'], 'rowcount', -1)
+            if rowcount > 0:
+                self.rows += rowcount
+
+
+# Query metrics of the request being served. Context variables reach the worker threads the async ORM runs queries in.
+current_query_metrics = ContextVar('current_query_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    `execute_wrapper` installed on every database connection, which passes the query to the `QueryMetrics`
+    of the current request, if any.
+    """
+    query_metrics = current_query_metrics.get()
+    if query_metrics is None:
+        return execute(sql, params, many, context)
+    return query_metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def get_view_labels(request):
+    """
+    Returns the `(view, provider)` labels of a request: the URL name, and the provider model of the view,
+    or `all` for the views that read every provider.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return UNMATCHED_VIEW, ''
+
+    view_class = getattr(resolver_match.func, 'view_class', None)
+    queryset = getattr(view_class, 'queryset', None)
+    serializer_class = getattr(view_class, 'serializer_class', None)
+
+    if queryset is not None:
+        provider = queryset.model._meta.model_name
+    elif serializer_class is not None:
+        provider = serializer_class.Meta.model._meta.model_name
+    else:
+        provider = 'all'
+
+    return resolver_match.url_name or resolver_match.route, provider
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, response size and SQL queries of every request in `metrics`, and the time DRF and
+    template responses take to render. Disabled with `WEATHER_METRICS_ENABLED`. Runs natively under WSGI and ASGI,
+    so it does not add a thread hop in front of the async views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if not settings.WEATHER_METRICS_ENABLED:
+            return self.get_response(request)
+
+        query_metrics = QueryMetrics()
+        token = current_query_metrics.set(query_metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_metrics.reset(token)
+
+        self.observe(request, response, time.perf_counter() - started, query_metrics)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.WEATHER_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        query_metrics = QueryMetrics()
+        token = current_query_metrics.set(query_metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_metrics.reset(token)
+
+        self.observe(request, response, time.perf_counter() - started, query_metrics)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration, query_metrics):
+        metrics.observe_request(
+            get_view_labels(request),
+            response.status_code,
+            duration,
+            None if response.streaming else len(response.content),
+            query_metrics,
+        )
+
+    def process_template_response(self, request, response):
+        if settings.WEATHER_METRICS_ENABLED:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: metrics.observe_serialization(get_view_labels(request), time.perf_counter() - started)
+            )
+        return response
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,92 @@
+from django.db import migrations, models
+
+# Station identifier and timestamp fields of the provider models at the time of this migration
+PROVIDER_FIELDS = {
+    ('bulgarian_meteo_pro', 'bulgarianmeteoprodata'): ('station_id', 'timestamp'),
+    ('weather_master_x', 'weathermasterx'): ('station_identifier', 'recorded_at'),
+}
+
+CHUNK_SIZE = 2000
+
+
+def collapse_stations(apps, schema_editor):
+    """
+    Keeps one Station row per provider and station identifier, pointing at the latest reading.
+    """
+    Station = apps.get_model('stations', 'Station')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    for content_type_id in Station.objects.values_list('content_type_id', flat=True).distinct():
+        content_type = ContentType.objects.get(pk=content_type_id)
+        provider_fields = PROVIDER_FIELDS.get((content_type.app_label, content_type.model))
+        stations = Station.objects.filter(content_type_id=content_type_id)
+
+        if provider_fields is None:
+            stations.delete()
+            continue
+
+        identifier_field, timestamp_field = provider_fields
+        model_class = apps.get_model(content_type.app_label, content_type.model)
+
+        latest = {}  # station identifier -> (recorded_at, object_id, station)
+        stale_station_ids = []
+
+        station_iterator = stations.order_by('pk').iterator(chunk_size=CHUNK_SIZE)
+        while chunk := [station for _, station in zip(range(CHUNK_SIZE), station_iterator)]:
+            readings = {
+                reading_id: (station_identifier, recorded_at)
+                for reading_id, station_identifier, recorded_at in model_class.objects.filter(
+                    id__in=[station.object_id for station in chunk]
+                ).values_list('id', identifier_field, timestamp_field)
+            }
+
+            for station in chunk:
+                if station.object_id not in readings:
+                    stale_station_ids.append(station.pk)
+                    continue
+
+                station_identifier, recorded_at = readings[station.object_id]
+                current = latest.get(station_identifier)
+
+                if current is None or (current[0], current[1]) < (recorded_at, station.object_id):
+                    if current is not None:
+                        stale_station_ids.append(current[2].pk)
+                    latest[station_identifier] = (recorded_at, station.object_id, station)
+                else:
+                    stale_station_ids.append(station.pk)
+
+        for index in range(0, len(stale_station_ids), CHUNK_SIZE):
+            Station.objects.filter(pk__in=stale_station_ids[index:index + CHUNK_SIZE]).delete()
+
+        kept_stations = []
+        for station_identifier, (recorded_at, _, station) in latest.items():
+            station.station_identifier = station_identifier
+            station.recorded_at = recorded_at
+            kept_stations.append(station)
+
+        Station.objects.bulk_update(kept_stations, ['station_identifier', 'recorded_at'], batch_size=CHUNK_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulgarian_meteo_pro', '0004_alter_bulgarianmeteoprodata_station_status'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0003_station_stations_st_city_f1c409_idx'),
+        ('weather_master_x', '0005_alter_weathermasterx_pressure_hpa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='station_identifier',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='recorded_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(collapse_stations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0004_station_identifier_latest_reading'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='station',
+            constraint=models.UniqueConstraint(fields=('content_type', 'station_identifier'), name='unique_station_per_provider'),
+        ),
+    ]
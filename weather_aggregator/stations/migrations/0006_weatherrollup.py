@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0005_station_unique_station_per_provider'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('station_identifier', models.CharField(max_length=50)),
+                ('city', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('temperature_celsius_count', models.PositiveIntegerField(default=0)),
+                ('temperature_celsius_sum', models.FloatField(default=0)),
+                ('temperature_celsius_min', models.FloatField(null=True)),
+                ('temperature_celsius_max', models.FloatField(null=True)),
+                ('humidity_percent_count', models.PositiveIntegerField(default=0)),
+                ('humidity_percent_sum', models.FloatField(default=0)),
+                ('humidity_percent_min', models.FloatField(null=True)),
+                ('humidity_percent_max', models.FloatField(null=True)),
+                ('pressure_hpa_count', models.PositiveIntegerField(default=0)),
+                ('pressure_hpa_sum', models.FloatField(default=0)),
+                ('pressure_hpa_min', models.FloatField(null=True)),
+                ('pressure_hpa_max', models.FloatField(null=True)),
+                ('wind_speed_kph_count', models.PositiveIntegerField(default=0)),
+                ('wind_speed_kph_sum', models.FloatField(default=0)),
+                ('wind_speed_kph_min', models.FloatField(null=True)),
+                ('wind_speed_kph_max', models.FloatField(null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['city', 'granularity', 'bucket_start'], name='stations_we_city_3b2788_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'content_type', 'station_identifier', 'city', 'bucket_start'), name='unique_rollup_per_station_bucket')],
+            },
+        ),
+    ]
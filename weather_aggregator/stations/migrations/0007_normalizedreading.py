@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0006_weatherrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NormalizedReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('provider', models.CharField(max_length=100)),
+                ('station_id', models.CharField(max_length=50)),
+                ('city', models.CharField(max_length=100)),
+                ('latitude', models.FloatField(null=True)),
+                ('longitude', models.FloatField(null=True)),
+                ('temperature_celsius', models.FloatField(null=True)),
+                ('humidity_percent', models.FloatField(null=True)),
+                ('wind_speed_kph', models.FloatField(null=True)),
+                ('pressure_hpa', models.FloatField(null=True)),
+                ('uv_index', models.IntegerField(null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('is_active', models.BooleanField(null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['city', 'timestamp'], name='stations_no_city_984ff5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_normalized_reading')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0007_normalizedreading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('station_type', models.CharField(max_length=50)),
+                ('payload', models.JSONField()),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0008_queuedreading'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='weatherrollup',
+            name='unique_rollup_per_station_bucket',
+        ),
+        migrations.RemoveIndex(
+            model_name='normalizedreading',
+            name='stations_no_city_984ff5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='station',
+            name='stations_st_city_f1c409_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='weatherrollup',
+            name='stations_we_city_3b2788_idx',
+        ),
+        migrations.AddField(
+            model_name='normalizedreading',
+            name='city_key',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='city_key',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='weatherrollup',
+            name='city_key',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='normalizedreading',
+            index=models.Index(fields=['city_key', 'timestamp'], name='stations_no_city_ke_ee3a3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['city_key'], name='stations_st_city_ke_6a3b8d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherrollup',
+            index=models.Index(fields=['city_key', 'granularity', 'bucket_start'], name='stations_we_city_ke_705ea1_idx'),
+        ),
+    ]
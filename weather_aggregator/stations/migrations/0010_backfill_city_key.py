@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from weather_aggregator.utils import make_city_key
+
+METRICS = ('temperature_celsius', 'humidity_percent', 'pressure_hpa', 'wind_speed_kph')
+
+
+def backfill_city_key(apps, schema_editor):
+    """
+    Sets the canonical city key of the stations, normalized readings and rollups, with one UPDATE per distinct
+    city spelling. Rollups of one station and bucket that only differed in the city spelling are merged.
+    """
+    for model_name in ('Station', 'NormalizedReading', 'WeatherRollup'):
+        model_class = apps.get_model('stations', model_name)
+
+        for city in model_class.objects.order_by().values_list('city', flat=True).distinct():
+            model_class.objects.filter(city=city).update(city_key=make_city_key(city))
+
+    WeatherRollup = apps.get_model('stations', 'WeatherRollup')
+    merged_rollups = {}
+
+    for rollup in WeatherRollup.objects.order_by('pk').iterator():
+        key = (rollup.granularity, rollup.content_type_id, rollup.station_identifier, rollup.city_key, rollup.bucket_start)
+        merged = merged_rollups.setdefault(key, rollup)
+        if merged is rollup:
+            continue
+
+        merged.count += rollup.count
+        for metric in METRICS:
+            for statistic in ('count', 'sum'):
+                field = f'{metric}_{statistic}'
+                setattr(merged, field, getattr(merged, field) + getattr(rollup, field))
+            for statistic, pick in (('min', min), ('max', max)):
+                field = f'{metric}_{statistic}'
+                values = [value for value in (getattr(merged, field), getattr(rollup, field)) if value is not None]
+                setattr(merged, field, pick(values) if values else None)
+
+        merged.save()
+        rollup.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0009_city_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_city_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0010_backfill_city_key'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='weatherrollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'content_type', 'station_identifier', 'city_key', 'bucket_start'), name='unique_rollup_per_station_bucket'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0011_weatherrollup_unique_rollup_per_station_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='cell_lat',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='cell_lon',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='latitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='longitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['cell_lat', 'cell_lon'], name='stations_st_cell_la_58b539_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('stations', '0013_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='station',
+            name='stations_st_city_ke_6a3b8d_idx',
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['city_key', 'updated_at'], name='stations_st_city_ke_9e1e31_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stations', '0014_station_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedreading',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='queuedreading',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='queuedreading',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -1,9 +1,91 @@
-from django.contrib.contenttypes.models import ContentType
-from stations.models import Station
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from stations.idempotency import (
+    IDEMPOTENCY_KEY_HEADER, KEY_IN_USE, get_key_error, get_replay, idempotency_key_store
+)
+from stations.ingest import IngestQueueFull, get_ingest_queue, store_readings
+from stations.parsers import NDJSONParser, ORJSONParser
 
-class CreateStationMixin:
+
+def validate_batch(get_serializer, items):
+    """
+    Validates every item of a batch with `get_serializer(data=item)`.
+    Returns the valid serializers and the errors of the invalid items by their index.
+    """
+    valid_serializers = []
+    errors = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({
+                'index': index,
+                'errors': {api_settings.NON_FIELD_ERRORS_KEY: ["Expected an object."]},
+            })
+            continue
+
+        serializer = get_serializer(data=item)
+        if serializer.is_valid():
+            valid_serializers.append(serializer)
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    return valid_serializers, errors
+
+
+class IdempotentMixin:
+    """
+    Mixin answering a retried request that carries the `Idempotency-Key` header of an earlier one with the stored
+    response of that one, without processing it again. Requests without the header are processed as usual.
+    """
+
+    def idempotent(self, request, handler):
+        idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not idempotency_key:
+            return handler()
+
+        key_error = get_key_error(idempotency_key)
+        if key_error is not None:
+            return Response(key_error[1], status=key_error[0])
+
+        fingerprint = idempotency_key_store.fingerprint(request.body)
+        stored = idempotency_key_store.get(request.path, idempotency_key)
+        if stored is not None:
+            return self.replay_response(stored, fingerprint)
+
+        if not idempotency_key_store.lock(request.path, idempotency_key):
+            return Response(KEY_IN_USE[1], status=KEY_IN_USE[0], headers={'Retry-After': '1'})
+
+        try:
+            # The first request may have finished between the lookup and the lock
+            stored = idempotency_key_store.get(request.path, idempotency_key)
+            if stored is not None:
+                return self.replay_response(stored, fingerprint)
+
+            try:
+                response = handler()
+            except Exception as exc:
+                response = self.handle_exception(exc)
+
+            # Server errors are not stored, so the retry is processed
+            if response.status_code < 500:
+                idempotency_key_store.set(request.path, idempotency_key, fingerprint, response.status_code, response.data)
+        finally:
+            idempotency_key_store.unlock(request.path, idempotency_key)
+
+        return response
+
+    @staticmethod
+    def replay_response(stored, fingerprint):
+        replay_status, data = get_replay(stored, fingerprint)
+        return Response(data, status=replay_status, headers={'Idempotent-Replayed': 'true'})
+
+
+class CreateStationMixin(IdempotentMixin):
     """
     Mixin to automatically create a Station entry when a new weather station data record is created.
+    A reading that is already stored is answered with the stored one. With the ingest queue enabled,
+    valid readings are queued and answered with 202 instead.
     """
     station_type = None  # Must be specified in the view using this mixin
 
@@ -15,21 +97,87 @@ class CreateStationMixin:
         raise NotImplementedError("View must define `station_type` or provide a queryset.")
 
 
+    def create(self, request, *args, **kwargs):
+        return self.idempotent(request, lambda: self.create_or_enqueue(request, *args, **kwargs))
+
+    def create_or_enqueue(self, request, *args, **kwargs):
+        ingest_queue = get_ingest_queue()
+        if ingest_queue is None:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            self.perform_enqueue(ingest_queue, [serializer])
+        except IngestQueueFull:
+            return self.queue_full_response()
+
+        return Response({"message": "Reading queued for storage."}, status=status.HTTP_202_ACCEPTED)
+
+    def perform_enqueue(self, ingest_queue, serializers):
+        ingest_queue.enqueue(
+            self.get_queryset().model._meta.label_lower,
+            self.get_station_type(),
+            [serializer.initial_data for serializer in serializers]
+        )
+
+    @staticmethod
+    def queue_full_response():
+        return Response(
+            {"message": "The ingest queue is full, retry later."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': '1'}
+        )
+
     def perform_create(self, serializer):
-        station_data_instance = serializer.save()
-        station_type = self.get_station_type()
+        serializer.instance, = store_readings(self.get_station_type(), [serializer])
 
-        station_data = serializer.get_station_data(station_data_instance)
 
-        city = station_data.get('city')
-        is_active = station_data.get('is_active')
+class BulkCreateStationMixin(CreateStationMixin):
+    """
+    Mixin to create a batch of weather station data records, and their Station entries, from a single request.
+    The body is a JSON array or NDJSON. Invalid items are reported by their index and do not reject the batch.
+    """
+    parser_classes = (ORJSONParser, NDJSONParser)
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        return self.idempotent(request, lambda: self.create_or_enqueue(request, *args, **kwargs))
+
+    def create_or_enqueue(self, request, *args, **kwargs):
+        items = request.data
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Expected a non-empty list of items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        content_type = ContentType.objects.get_for_model(station_data_instance)
+        if len(items) > self.max_batch_size:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [f"Ensure the batch has no more than {self.max_batch_size} items."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        Station.objects.create(
-            station_type=station_type,
-            city=city,
-            content_type=content_type,
-            object_id=station_data_instance.id,
-            is_active=is_active
+        valid_serializers, errors = validate_batch(self.get_serializer, items)
+
+        ingest_queue = get_ingest_queue()
+        if valid_serializers and ingest_queue is not None:
+            try:
+                self.perform_enqueue(ingest_queue, valid_serializers)
+            except IngestQueueFull:
+                return self.queue_full_response()
+
+            return Response({'queued': len(valid_serializers), 'errors': errors}, status=status.HTTP_202_ACCEPTED)
+
+        if valid_serializers:
+            self.perform_bulk_create(valid_serializers)
+
+        return Response(
+            {'created': len(valid_serializers), 'errors': errors},
+            status=status.HTTP_201_CREATED if valid_serializers else status.HTTP_400_BAD_REQUEST
         )
+
+    def perform_bulk_create(self, serializers):
+        store_readings(self.get_station_type(), serializers)
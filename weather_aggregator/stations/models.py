@@ -2,7 +2,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.db import models
 
-from stations.managers import StationManager
+from stations.managers import NormalizedReadingManager, StationManager, WeatherRollupManager
 
 
 class Station(models.Model):
@@ -10,33 +10,316 @@ class Station(models.Model):
         max_length=50
     )
 
+    station_identifier = models.CharField(
+        max_length=50
+    )
+
     city = models.CharField(
         max_length=100
     )
 
+    city_key = models.CharField(
+        max_length=100,
+        default=''
+    )  # canonical city name for lookups, see `make_city_key`
+
     content_type = models.ForeignKey(
         ContentType,
         on_delete=models.CASCADE
     )
 
-    object_id = models.PositiveIntegerField()
+    object_id = models.PositiveIntegerField()  # the latest reading of the station
 
-    station_data = GenericForeignKey(
+    latest_reading = GenericForeignKey(
         'content_type',
         'object_id'
     )
 
+    recorded_at = models.DateTimeField(
+        null=True
+    )
+
     is_active = models.BooleanField(
         default=True
     )
 
+    latitude = models.FloatField(
+        null=True
+    )
+
+    longitude = models.FloatField(
+        null=True
+    )
+
+    # Grid cell of the coordinates for spatial lookups, see `stations.geo.grid_cell`
+    cell_lat = models.IntegerField(
+        null=True
+    )
+
+    cell_lon = models.IntegerField(
+        null=True
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True
+    )  # when the station last moved to a new reading, the conditional GET validator of its city
+
     objects = StationManager()
 
     class Meta:
         indexes = [
             models.Index(fields=['content_type', 'object_id']),
-            models.Index(fields=['city'])
+            models.Index(fields=['city_key', 'updated_at']),  # covers the city validator query
+            models.Index(fields=['cell_lat', 'cell_lon']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'station_identifier'],
+                name='unique_station_per_provider'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Station {self.station_identifier} ({self.station_type}) in {self.city}"
+
+
+class WeatherRollup(models.Model):
+    """
+    Count, sum, min and max of the normalized metrics of one station in one hour or day,
+    kept up to date on ingest so that statistics do not scan the raw readings.
+    """
+    GRANULARITY_CHOICES = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    )
+
+    granularity = models.CharField(
+        max_length=10,
+        choices=GRANULARITY_CHOICES
+    )
+
+    bucket_start = models.DateTimeField()
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+
+    station_identifier = models.CharField(
+        max_length=50
+    )
+
+    city = models.CharField(
+        max_length=100
+    )
+
+    city_key = models.CharField(
+        max_length=100,
+        default=''
+    )  # canonical city name for lookups, see `make_city_key`
+
+    count = models.PositiveIntegerField(
+        default=0
+    )
+
+    temperature_celsius_count = models.PositiveIntegerField(default=0)
+    temperature_celsius_sum = models.FloatField(default=0)
+    temperature_celsius_min = models.FloatField(null=True)
+    temperature_celsius_max = models.FloatField(null=True)
+
+    humidity_percent_count = models.PositiveIntegerField(default=0)
+    humidity_percent_sum = models.FloatField(default=0)
+    humidity_percent_min = models.FloatField(null=True)
+    humidity_percent_max = models.FloatField(null=True)
+
+    pressure_hpa_count = models.PositiveIntegerField(default=0)
+    pressure_hpa_sum = models.FloatField(default=0)
+    pressure_hpa_min = models.FloatField(null=True)
+    pressure_hpa_max = models.FloatField(null=True)
+
+    wind_speed_kph_count = models.PositiveIntegerField(default=0)
+    wind_speed_kph_sum = models.FloatField(default=0)
+    wind_speed_kph_min = models.FloatField(null=True)
+    wind_speed_kph_max = models.FloatField(null=True)
+
+    objects = WeatherRollupManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_key', 'granularity', 'bucket_start']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'content_type', 'station_identifier', 'city_key', 'bucket_start'],
+                name='unique_rollup_per_station_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Rollup of {self.station_identifier} in {self.city} for the {self.granularity} of {self.bucket_start}"
+
+
+class NormalizedReading(models.Model):
+    """
+    The normalized weather fields of one reading of any provider, written on ingest when
+    `WEATHER_NORMALIZED_READINGS_ENABLED` is set. The raw payload stays in the provider table.
+    """
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+
+    object_id = models.PositiveIntegerField()  # the reading in the provider table
+
+    provider = models.CharField(
+        max_length=100
+    )
+
+    station_id = models.CharField(
+        max_length=50
+    )
+
+    city = models.CharField(
+        max_length=100
+    )
+
+    city_key = models.CharField(
+        max_length=100,
+        default=''
+    )  # canonical city name for lookups, see `make_city_key`
+
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    temperature_celsius = models.FloatField(null=True)
+    humidity_percent = models.FloatField(null=True)
+    wind_speed_kph = models.FloatField(null=True)
+    pressure_hpa = models.FloatField(null=True)
+    uv_index = models.IntegerField(null=True)
+
+    timestamp = models.DateTimeField()
+
+    is_active = models.BooleanField(
+        null=True
+    )
+
+    objects = NormalizedReadingManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_key', 'timestamp']),  # optimized for filtering city and ordering by timestamp
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'],
+                name='unique_normalized_reading'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Reading of {self.station_id} ({self.provider}) in {self.city} at {self.timestamp}"
+
+
+class QueuedReading(models.Model):
+    """
+    A validated reading waiting in the durable ingest queue, stored by `manage.py process_ingest_queue`.
+    Readings that fail to store are retried, and kept with `failed_at` set after `WEATHER_INGEST_QUEUE_MAX_ATTEMPTS`.
+    """
+    model_label = models.CharField(
+        max_length=100
+    )
+
+    station_type = models.CharField(
+        max_length=50
+    )
+
+    payload = models.JSONField()
+
+    enqueued_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0
+    )
+
+    last_error = models.TextField(
+        blank=True
+    )
+
+    failed_at = models.DateTimeField(
+        null=True,
+        blank=True
+    )
+
+    def __str__(self):
+        return f"Queued {self.model_label} reading from {self.enqueued_at}"
+
+
+class ArchiveSegment(models.Model):
+    """
+    A compressed JSONL file of readings moved out of a provider table by `manage.py archive_readings`.
+    """
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+
+    month = models.DateField()
+
+    path = models.CharField(
+        max_length=255,
+        unique=True
+    )  # relative to WEATHER_ARCHIVE_DIR
+
+    compression = models.CharField(
+        max_length=10
+    )
+
+    reading_count = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    def __str__(self):
+        return f"Archive segment {self.path}"
+
+
+class ArchivedReading(models.Model):
+    """
+    Index entry of an archived reading: where it is stored, and the columns history reads filter and order on.
+    """
+    segment = models.ForeignKey(
+        ArchiveSegment,
+        on_delete=models.CASCADE,
+        related_name='readings'
+    )
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+
+    object_id = models.PositiveIntegerField()  # the id the reading had in the provider table
+
+    city_key = models.CharField(
+        max_length=100
+    )
+
+    timestamp = models.DateTimeField()
+
+    line = models.PositiveIntegerField()  # of the reading in the segment, from 0
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_key', 'timestamp']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'],
+                name='unique_archived_reading'
+            ),
         ]
 
     def __str__(self):
-        return f"Station {self.station_type} in {self.city}"
+        return f"Archived reading {self.object_id} in {self.segment.path}"
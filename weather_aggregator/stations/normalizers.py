@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+
+from stations.serializers import DEFAULT_WEATHER_FIELDS, DefaultWeatherFields
+
+
+class BaseRowNormalizer(ABC):
+    """
+    Turns a `values()` row of a weather station model into the normalized weather fields,
+    without instantiating a serializer per row.
+    """
+    fields: tuple = ()  # model fields read by `get_station_data`, fetched with `values(*fields)`
+    metrics: dict = {}  # SQL expressions of the normalized numeric fields the model provides, used for aggregates
+    columns: dict = {}  # SQL expressions of the other normalized fields the model provides, used with `metrics` for exports
+
+    @abstractmethod
+    def get_station_data(self, row) -> DefaultWeatherFields:
+        pass
+
+    def get_instance_station_data(self, instance) -> DefaultWeatherFields:
+        return self.get_station_data({field: getattr(instance, field) for field in self.fields})
+
+    def __call__(self, row):
+        return {**DEFAULT_WEATHER_FIELDS, **self.get_station_data(row)}
@@ -0,0 +1,25 @@
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+
+class ReadingCursor(NamedTuple):
+    """
+    Position of a reading in the city history, which is ordered by timestamp, provider and id.
+    """
+    timestamp: datetime
+    provider: str
+    id: int
+
+    def encode(self) -> str:
+        payload = json.dumps([self.timestamp.isoformat(), self.provider, self.id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, value: str) -> 'ReadingCursor':
+        try:
+            timestamp, provider, reading_id = json.loads(base64.urlsafe_b64decode(value.encode()))
+            return cls(datetime.fromisoformat(timestamp), str(provider), int(reading_id))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor.")
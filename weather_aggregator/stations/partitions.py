@@ -0,0 +1,200 @@
+from datetime import datetime, timezone
+
+from django.db import connection as default_connection, transaction
+
+# Suffix of the partition that takes the rows no monthly partition covers
+DEFAULT_PARTITION_SUFFIX = 'pdefault'
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(moment, months):
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month.year:04d}{month.month:02d}'
+
+
+def parse_partition_month(table, name):
+    """
+    Returns the first day of the month of a monthly partition of `table`, or `None` for other tables.
+    """
+    suffix = name[len(table) + 2:]
+    if not name.startswith(f'{table}_p') or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=timezone.utc)
+
+
+def get_reading_tables():
+    """
+    Returns `(model_class, timestamp_field)` of every provider model, the tables that are partitioned by month.
+    """
+    from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING  # the migrations import this module
+
+    return [
+        (serializer_class.Meta.model, serializer_class.timestamp_field)
+        for serializer_class in SERIALIZER_MAPPING.values()
+    ]
+
+
+def is_partitioned(table, connection=default_connection):
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table JOIN pg_class ON pg_class.oid = partrelid WHERE relname = %s",
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_partitions(table, connection=default_connection):
+    """
+    Returns `{first day of month: partition name}` of the monthly partitions attached to `table`.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = inhparent JOIN pg_class child ON child.oid = inhrelid "
+            "WHERE parent.relname = %s",
+            [table]
+        )
+        names = [name for name, in cursor.fetchall()]
+
+    return {
+        month: name for name, month in ((name, parse_partition_month(table, name)) for name in names)
+        if month is not None
+    }
+
+
+def partition_table(schema_editor, table, column, id_column='id'):
+    """
+    Turns `table` into a table partitioned by month on `column`, keeping its rows, indexes and id sequence.
+    Partitions are created for every month holding rows, and a default partition takes any other row.
+    Postgres requires the partition key in the primary key, so it becomes `(id, column)`.
+    """
+    quote = schema_editor.quote_name
+    old_table = f'{table}_unpartitioned'
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u')",
+            [table]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {quote(column)} AT TIME ZONE 'UTC') FROM {quote(table)}"
+        )
+        months = sorted(month.replace(tzinfo=timezone.utc) for month, in cursor.fetchall())
+
+        # Index and constraint names are unique per schema, so the old table gives them up first
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old_table)}")
+        for constraint_name, _ in constraints:
+            cursor.execute(f"ALTER TABLE {quote(old_table)} DROP CONSTRAINT {quote(constraint_name)}")
+        for index_name, _ in indexes:
+            cursor.execute(f"DROP INDEX {quote(index_name)}")
+
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(old_table)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE ({quote(column)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(f'{table}_pkey')} PRIMARY KEY ({quote(id_column)}, {quote(column)})"
+        )
+        for constraint_name, definition in constraints:
+            if definition.startswith('UNIQUE'):
+                cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(constraint_name)} {definition}")
+        for _, definition in indexes:
+            cursor.execute(definition)  # still names the table, which is now the partitioned one
+
+        cursor.execute(
+            f"CREATE TABLE {quote(f'{table}_{DEFAULT_PARTITION_SUFFIX}')} PARTITION OF {quote(table)} DEFAULT"
+        )
+        for month in months:
+            create_month_partition(table, column, month, schema_editor.connection)
+
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old_table)}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({quote(id_column)}), 0) + 1, false) "
+            f"FROM {quote(table)}",
+            [table, id_column]
+        )
+        cursor.execute(f"DROP TABLE {quote(old_table)}")
+
+
+def create_month_partition(table, column, month, connection=default_connection):
+    """
+    Creates the partition of `table` for the month starting at `month`, unless it exists. Rows of that month
+    in the default partition are moved into it, since Postgres refuses to attach over them.
+    Returns whether the partition was created.
+    """
+    name = partition_name(table, month)
+    default_name = f'{table}_{DEFAULT_PARTITION_SUFFIX}'
+    quote = connection.ops.quote_name
+    bounds = [month, add_months(month, 1)]
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {quote(default_name)} WHERE {quote(column)} >= %s AND {quote(column)} < %s "
+            f"RETURNING *) INSERT INTO {quote(name)} SELECT * FROM moved",
+            bounds
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+            bounds
+        )
+
+    return True
+
+
+def drop_partitions_before(table, cutoff, detach=False, connection=default_connection):
+    """
+    Drops, or only detaches, the monthly partitions of `table` that end at or before `cutoff`.
+    Each one is a catalog change, whatever the number of rows. Returns the names of the partitions.
+    """
+    quote = connection.ops.quote_name
+    removed = []
+
+    for month, name in sorted(get_partitions(table, connection).items()):
+        if add_months(month, 1) > cutoff:
+            continue
+
+        with connection.cursor() as cursor:
+            if detach:
+                cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            else:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+        removed.append(name)
+
+    return removed
+
+
+def delete_before(queryset, field, cutoff, batch_size=5000):
+    """
+    Deletes the rows of the queryset with `field` before `cutoff` in batches of `batch_size` primary keys,
+    so no single statement locks or logs the whole range. Returns the number of deleted rows.
+    """
+    deleted = 0
+    old_rows = queryset.filter(**{f'{field}__lt': cutoff}).order_by()
+
+    while batch := list(old_rows.values_list('pk', flat=True)[:batch_size]):
+        queryset.model.objects.filter(pk__in=batch).delete()
+        deleted += len(batch)
+
+    return deleted
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Key of a compact payload, holding the paths of the mapped fields the original payload did not have
+COMPACT_MARKER = '$compact'
+
+
+def encode_column(value):
+    """
+    Returns the JSON value a typed column is rebuilt as: decimals as floats, datetimes in ISO 8601 UTC with `Z`.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+    return value
+
+
+def is_compact(raw_data):
+    return isinstance(raw_data, dict) and COMPACT_MARKER in raw_data
+
+
+def _lookup(payload, path):
+    """
+    Returns `(parent, key)` of `path` in the payload, or `None` if the path is not there.
+    """
+    parent = payload
+    for key in path[:-1]:
+        parent = parent.get(key) if isinstance(parent, dict) else None
+    if isinstance(parent, dict) and path[-1] in parent:
+        return parent, path[-1]
+    return None
+
+
+def compact_payload(payload, columns):
+    """
+    Returns the payload without the values that `columns` (`{path: column value}`) rebuild exactly, JSON type included.
+    Values the columns do not rebuild, such as `21` stored as `21.00` and rebuilt as `21.0`, stay in the payload.
+    """
+    if not isinstance(payload, dict) or is_compact(payload):
+        return payload
+
+    compact = _copy_dicts(payload)
+    missing = []
+
+    for path, value in columns.items():
+        found = _lookup(compact, path)
+        if found is None:
+            missing.append(list(path))
+            continue
+
+        parent, key = found
+        stored, rebuilt = parent[key], encode_column(value)
+        if type(stored) is type(rebuilt) and stored == rebuilt:
+            del parent[key]
+
+    _drop_emptied(compact, payload)
+    compact[COMPACT_MARKER] = missing
+    return compact
+
+
+def rebuild_payload(stored, columns):
+    """
+    Returns the original payload of a `compact_payload` result, and any other payload as it is.
+    """
+    if not is_compact(stored):
+        return stored
+
+    payload = _copy_dicts(stored)
+    missing = {tuple(path) for path in payload.pop(COMPACT_MARKER)}
+
+    for path, value in columns.items():
+        if path in missing or _lookup(payload, path) is not None:
+            continue
+
+        parent = payload
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = encode_column(value)
+
+    return payload
+
+
+def _copy_dicts(payload):
+    return {key: _copy_dicts(value) if isinstance(value, dict) else value for key, value in payload.items()}
+
+
+def _drop_emptied(compact, original):
+    """
+    Removes the objects that compaction emptied, which the rebuild creates again. Objects empty in the original stay.
+    """
+    for key in list(compact):
+        value = compact[key]
+        if isinstance(value, dict):
+            _drop_emptied(value, original[key])
+            if not value and original[key]:
+                del compact[key]
@@ -0,0 +1,145 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from bulgarian_meteo_pro.serializers import BulgarianMeteoProDataSerializer
+from stations.ingest import deduplicate_readings, get_stored_readings, insert_new_readings
+from stations.models import Station
+from weather_master_x.models import WeatherMasterX
+from weather_aggregator.utils import make_city_key
+from weather_master_x.serializers import WeatherMasterXSerializer
+
+CITIES = {
+    'Sofia': (42.6977, 23.3219),
+    'Plovdiv': (42.1354, 24.7453),
+    'Varna': (43.2141, 27.9147),
+    'Burgas': (42.5048, 27.4626),
+    'Ruse': (43.8356, 25.9657),
+    'Stara Zagora': (42.4258, 25.6345),
+    'Pleven': (43.4170, 24.6067),
+    'Sliven': (42.6817, 26.3229),
+    'Dobrich': (43.5726, 27.8273),
+    'Shumen': (43.2712, 26.9361),
+}
+
+
+def weather_master_x_payload(rng, station_identifier, city, coordinates, recorded_at, temperature_celsius):
+    return {
+        "station_identifier": station_identifier,
+        "location": {
+            "city_name": city,
+            "coordinates": {"lat": coordinates[0], "lon": coordinates[1]},
+        },
+        "recorded_at": recorded_at.isoformat().replace('+00:00', 'Z'),
+        "readings": {
+            "temp_fahrenheit": round(temperature_celsius * 1.8 + 32, 1),
+            "humidity_percent": round(rng.uniform(30, 95), 1),
+            "pressure_hpa": round(rng.gauss(1013, 8), 1),
+            "uv_index": rng.randint(0, 11),
+            "rain_mm": round(max(rng.gauss(0, 2), 0), 1),
+        },
+        "operational_status": "operational" if rng.random() > 0.02 else "maintenance",
+    }
+
+
+def bulgarian_meteo_pro_payload(rng, station_id, city, coordinates, timestamp, temperature_celsius):
+    return {
+        "station_id": station_id,
+        "city": city,
+        "latitude": coordinates[0],
+        "longitude": coordinates[1],
+        "timestamp": timestamp.isoformat().replace('+00:00', 'Z'),
+        "temperature_celsius": round(temperature_celsius, 1),
+        "humidity_percent": round(rng.uniform(30, 95), 1),
+        "wind_speed_kph": round(abs(rng.gauss(12, 8)), 1),
+        "station_status": "active" if rng.random() > 0.02 else "inactive",
+    }
+
+
+PROVIDERS = (
+    (WeatherMasterX, WeatherMasterXSerializer, weather_master_x_payload, 'WX'),
+    (BulgarianMeteoProData, BulgarianMeteoProDataSerializer, bulgarian_meteo_pro_payload, 'BG'),
+)
+
+
+def generate_payloads(stations, readings_per_station, cities=None, start=None, interval=timedelta(minutes=10),
+                      random_seed=0, providers=PROVIDERS):
+    """
+    Yields `(model_class, serializer_class, payload)` for `stations` stations per provider with `readings_per_station`
+    readings each, spread over the cities. Temperatures follow a daily cycle with noise, so aggregates look realistic.
+    """
+    rng = random.Random(random_seed)
+    cities = list(cities or CITIES)
+    start = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    for model_class, serializer_class, make_payload, prefix in providers:
+        for station_number in range(stations):
+            city = cities[station_number % len(cities)]
+            latitude, longitude = CITIES.get(city, (42.7, 25.5))
+            coordinates = (
+                round(latitude + rng.uniform(-0.1, 0.1), 4),
+                round(longitude + rng.uniform(-0.1, 0.1), 4),
+            )
+            station_identifier = f"{prefix}-{station_number:06d}"
+
+            for reading_number in range(readings_per_station):
+                recorded_at = start + interval * reading_number
+                hour = recorded_at.hour + recorded_at.minute / 60
+                temperature_celsius = 12 + 8 * math.sin((hour - 9) / 24 * 2 * math.pi) + rng.gauss(0, 1.5)
+
+                yield model_class, serializer_class, make_payload(
+                    rng, station_identifier, city, coordinates, recorded_at, temperature_celsius
+                )
+
+
+def seed_weather_data(stations, readings_per_station, cities=None, batch_size=2000, **kwargs):
+    """
+    Stores generated readings the way ingest does: validated by the provider serializer, written with
+    one `INSERT` per batch and recorded on their stations, skipping the readings that are already stored.
+    Returns the number of stored readings.
+    """
+    serializers = {}
+    batch = []
+    stored = 0
+
+    for model_class, serializer_class, payload in generate_payloads(stations, readings_per_station, cities, **kwargs):
+        serializer = serializers.setdefault(serializer_class, serializer_class())
+        batch.append((model_class, serializer, payload))
+
+        if len(batch) >= batch_size:
+            stored += _store(batch)
+            batch = []
+
+    if batch:
+        stored += _store(batch)
+
+    return stored
+
+
+def _store(batch):
+    by_model = {}
+    for model_class, serializer, payload in batch:
+        validated_data = serializer.to_internal_value(payload)
+        by_model.setdefault((model_class, serializer), []).append(model_class(
+            **validated_data,
+            raw_data=serializer.get_raw_data(payload, validated_data),
+            city_key=make_city_key(validated_data[serializer.city_field])
+        ))
+
+    stored = 0
+    for (model_class, serializer), instances in by_model.items():
+        serializer_class = type(serializer)
+        _, new_readings = deduplicate_readings(
+            serializer_class,
+            [(instance, serializer) for instance in instances],
+            get_stored_readings(serializer_class, instances)
+        )
+        inserted = insert_new_readings(serializer_class, [instance for instance, _ in new_readings])
+        Station.objects.record_readings(
+            model_class._meta.model_name,
+            [(instance, serializer.get_station_data(instance)) for instance in inserted]
+        )
+        stored += len(inserted)
+
+    return stored
@@ -2,7 +2,11 @@ from abc import ABCMeta, abstractmethod
 from datetime import datetime
 from decimal import Decimal
 from typing import TypedDict, Optional
+from django.conf import settings
 from rest_framework import serializers
+from stations.pagination import ReadingCursor
+from stations.raw_data import compact_payload, is_compact, rebuild_payload
+from weather_aggregator.utils import make_city_key
 
 
 class DefaultWeatherFields(TypedDict, total=False):
@@ -41,19 +45,170 @@ class ABCSerializerMeta(ABCMeta, serializers.SerializerMetaclass):
 
 
 class BaseWeatherDataSerializer(serializers.Serializer, metaclass=ABCSerializerMeta):
+    # Model fields holding the station identifier, the city and the time of the reading
+    station_id_field = 'station_id'
+    city_field = 'city'
+    timestamp_field = 'timestamp'
+
+    # `{payload path: model field}` of the payload values stored in typed columns, which compact raw data leaves out.
+    # `None` maps every top-level payload key to the model field of the same name.
+    raw_data_fields = None
+
     @abstractmethod
     def get_station_data(self, instance) -> DefaultWeatherFields:
         pass
 
+    @classmethod
+    def get_raw_data_fields(cls):
+        if cls.raw_data_fields is not None:
+            return cls.raw_data_fields
+        return {
+            (field.name, ): field.attname for field in cls.Meta.model._meta.concrete_fields
+            if field.editable and not field.primary_key and field.name != 'raw_data'
+        }
+
+    @classmethod
+    def get_raw_data(cls, payload, values):
+        """
+        Returns the `raw_data` to store for a payload whose model field values are `values`: the payload itself,
+        or with `WEATHER_COMPACT_RAW_DATA` only what the typed columns cannot rebuild.
+        """
+        if not settings.WEATHER_COMPACT_RAW_DATA:
+            return payload
+        return compact_payload(payload, {path: values[field] for path, field in cls.get_raw_data_fields().items()})
+
+    @classmethod
+    def rebuild_raw_data(cls, row):
+        """
+        Returns the received payload of a reading from a `values()` row holding `raw_data` and, for compact raw data,
+        the mapped fields.
+        """
+        if not is_compact(row['raw_data']):
+            return row['raw_data']
+        return rebuild_payload(row['raw_data'], {path: row[field] for path, field in cls.get_raw_data_fields().items()})
+
+    @classmethod
+    def get_raw_data_columns(cls):
+        """
+        Returns the model fields a `values()` row needs for `rebuild_raw_data`: only `raw_data` unless raw data is compact.
+        """
+        if not settings.WEATHER_COMPACT_RAW_DATA:
+            return ('raw_data', )
+        return ('raw_data', *cls.get_raw_data_fields().values())
+
+    def get_unique_together_validators(self):
+        # A reading whose station and timestamp are stored is a retry, which ingest answers with the stored reading
+        # instead of a validation error, see `stations.ingest.store_readings`. It also keeps validation free of queries.
+        return []
+
     def create(self, validated_data):
-        validated_data['raw_data'] = self.initial_data
+        validated_data['raw_data'] = self.get_raw_data(self.initial_data, validated_data)
+        validated_data['city_key'] = make_city_key(validated_data.get(self.city_field))
         return super().create(validated_data)
 
+    def build_instance(self):
+        """
+        Returns an unsaved model instance for the validated data, so batches can be written with one `INSERT`.
+        """
+        return self.Meta.model(**self.get_model_fields())
+
+    def get_model_fields(self):
+        """
+        Returns the model field values of the validated reading, as stored by `create` and `build_instance`.
+        """
+        return {
+            **self.validated_data,
+            'raw_data': self.get_raw_data(self.initial_data, self.validated_data),
+            'city_key': make_city_key(self.validated_data.get(self.city_field)),
+        }
+
     def to_representation(self, instance):
         return_raw = self.context.get('return_raw_data', False)
 
         if return_raw:
-            return instance.raw_data
+            return self.rebuild_raw_data(
+                {field: getattr(instance, field) for field in ('raw_data', *self.get_raw_data_fields().values())}
+            )
         else:
             station_data = self.get_station_data(instance)
             return {**DEFAULT_WEATHER_FIELDS, **station_data}
+
+
+class TimeWindowQuerySerializer(serializers.Serializer):
+    """
+    Optional `[since, until)` window of the readings a query reads, with `until` later than `since`.
+    """
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        since, until = attrs.get('since'), attrs.get('until')
+        if since is not None and until is not None and since >= until:
+            raise serializers.ValidationError({'until': "Must be later than `since`."})
+        return attrs
+
+
+class WeatherHistoryQuerySerializer(TimeWindowQuerySerializer):
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            return ReadingCursor.decode(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class CitiesWeatherQuerySerializer(TimeWindowQuerySerializer):
+    cities = serializers.ListField(child=serializers.CharField(max_length=100), min_length=1, max_length=200)
+    providers = serializers.ListField(child=serializers.CharField(), required=False)
+    raw = serializers.BooleanField(required=False, default=False)
+
+    def validate_providers(self, value):
+        from weather_aggregator.serializers_mapping import SERIALIZER_MAPPING  # the provider serializers import this module
+
+        unknown = [provider for provider in value if provider.lower() not in SERIALIZER_MAPPING]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown providers: {', '.join(unknown)}. Use one of: {', '.join(SERIALIZER_MAPPING)}."
+            )
+        return [provider.lower() for provider in value]
+
+
+class WeatherExportQuerySerializer(CitiesWeatherQuerySerializer):
+    raw = None  # exports hold the normalized fields
+    file_format = serializers.ChoiceField(choices=('csv', 'parquet', 'arrow'), required=False, default='csv')
+
+    def validate_file_format(self, value):
+        from stations.export import get_export_formats  # stations.export imports this module
+
+        if value not in get_export_formats():
+            raise serializers.ValidationError(f"The {value} format requires the `pyarrow` package.")
+        return value
+
+
+class WeatherStatisticsQuerySerializer(TimeWindowQuerySerializer):
+    bucket = serializers.ChoiceField(choices=('hour', 'day'), required=False, default='hour')
+    group_by = serializers.ChoiceField(choices=('city', 'provider', 'station'), required=False, default='city')
+
+
+class NearbyStationsQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(required=False, min_value=0, max_value=500, default=10)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=100)
+
+
+class BoundingBoxQuerySerializer(serializers.Serializer):
+    min_lat = serializers.FloatField(min_value=-90, max_value=90)
+    min_lon = serializers.FloatField(min_value=-180, max_value=180)
+    max_lat = serializers.FloatField(min_value=-90, max_value=90)
+    max_lon = serializers.FloatField(min_value=-180, max_value=180)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=5000, default=1000)
+
+    def validate(self, attrs):
+        if attrs['min_lat'] > attrs['max_lat']:
+            raise serializers.ValidationError({'max_lat': "Must not be lower than `min_lat`."})
+        if attrs['min_lon'] > attrs['max_lon']:
+            raise serializers.ValidationError({'max_lon': "Must not be lower than `min_lon`."})
+        return attrs
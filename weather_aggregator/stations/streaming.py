@@ -0,0 +1,33 @@
+from itertools import islice
+
+from stations.renderers import get_json_renderer
+
+RECORDS_PER_CHUNK = 100
+
+
+def _chunks(records):
+    records = iter(records)
+    while chunk := list(islice(records, RECORDS_PER_CHUNK)):
+        yield chunk
+
+
+def ndjson_stream(records):
+    """
+    Yields the records as newline-delimited JSON, a chunk of records at a time.
+    """
+    renderer = get_json_renderer()  # the renderer of the regular responses, so streamed records match them
+    for chunk in _chunks(records):
+        yield b''.join(renderer.render(record) + b'\n' for record in chunk)
+
+
+def json_array_stream(records):
+    """
+    Yields the records as a single JSON array, a chunk of records at a time.
+    """
+    renderer = get_json_renderer()
+    separator = b'['
+    for chunk in _chunks(records):
+        yield separator + b','.join(renderer.render(record) for record in chunk)
+        separator = b','
+
+    yield b']' if separator == b',' else b'[]'
@@ -1,6 +1,13 @@
 from django.urls import path
-from stations import views
+from stations import async_views, views
 
 urlpatterns = (
+    path('export/weather-data', views.export_weather_data, name='export_weather_data'),
+    path('ingest-queue/stats', views.get_ingest_queue_stats, name='get_ingest_queue_stats'),
+    path('stations/nearby', views.get_nearby_stations, name='get_nearby_stations'),
+    path('stations/within', views.get_stations_in_bounding_box, name='get_stations_in_bounding_box'),
+    path('weather-data', views.get_cities_weather_data, name='get_cities_weather_data'),
     path('weather-data/<str:city_name>', views.get_aggregated_weather_data, name='get_city_weather_data'),
+    path('async/weather-data/<str:city_name>', async_views.get_aggregated_weather_data, name='aget_city_weather_data'),
+    path('weather-data/<str:city_name>/statistics', views.get_weather_statistics, name='get_city_weather_statistics'),
 )
\ No newline at end of file
@@ -1,9 +1,70 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import condition
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
+from rest_framework.utils.urls import replace_query_param
+from .cache import city_weather_cache
+from .export import EXPORT_FORMATS
+from .ingest import get_ingest_queue
+from .metrics import metrics, render_counter
 from .models import Station
+from .serializers import (
+    BoundingBoxQuerySerializer,
+    CitiesWeatherQuerySerializer,
+    NearbyStationsQuerySerializer,
+    WeatherExportQuerySerializer,
+    WeatherHistoryQuerySerializer,
+    WeatherStatisticsQuerySerializer,
+)
+from .streaming import json_array_stream, ndjson_stream
+
+HISTORY_QUERY_PARAMS = ('since', 'until', 'limit', 'cursor')
+
+STREAM_FORMATS = {
+    'ndjson': (ndjson_stream, 'application/x-ndjson'),
+    'json': (json_array_stream, 'application/json'),
+}
+
+
+def get_city_validator(request, city_name):
+    """
+    Returns `(station count, latest station update)` of the city for a request for its latest readings, from the city
+    cache or computed once per request, or `None` for history pages, streams and cities without stations.
+    """
+    if any(param in request.GET for param in (*HISTORY_QUERY_PARAMS, 'stream')):
+        return None
+
+    if not hasattr(request, '_city_validator'):
+        validator = city_weather_cache.get_validator(city_name)
+        if validator is None:
+            validator = Station.objects.get_city_validator(city_name)
+            if validator is not None:
+                city_weather_cache.set_validator(city_name, validator)
+        request._city_validator = validator
+
+    return request._city_validator
+
+
+def city_weather_etag(request, city_name):
+    validator = get_city_validator(request, city_name)
+    if validator is None:
+        return None
+
+    count, updated_at = validator
+    data_format = 'raw' if request.GET.get('raw', 'false').lower() == 'true' else 'normalized'
+    # Weak, since the JSON and browsable API renderings of the same data differ
+    return f'W/"{data_format}-{count}-{updated_at.timestamp():.6f}"'
+
+
+def city_weather_last_modified(request, city_name):
+    validator = get_city_validator(request, city_name)
+    return validator[1] if validator is not None else None
 
 
 @extend_schema(
@@ -14,13 +75,65 @@ from .models import Station
             location=OpenApiParameter.QUERY,
             description='Set to true to return raw data, otherwise normalized data will be returned.',
             required=False,
-        )
+        ),
+        OpenApiParameter(
+            name='since',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Return readings recorded at or after this time. Switches the response to a page of the city history.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='until',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Return readings recorded before this time. Switches the response to a page of the city history.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Page size of the city history, between 1 and 1000 (100 by default).',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='cursor',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            description='Opaque cursor from the `next` link of the previous history page.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='stream',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=list(STREAM_FORMATS),
+            description='Stream the full city history (optionally within `since`/`until`) as NDJSON or as a JSON array.',
+            required=False,
+        ),
     ]
 )
 @api_view(['GET'])
+@condition(etag_func=city_weather_etag, last_modified_func=city_weather_last_modified)
 def get_aggregated_weather_data(request, city_name):
     return_raw_data = request.query_params.get('raw', 'false').lower() == 'true'
-    aggregated_data = Station.objects.get_aggregated_weather_data(city_name, return_raw_data)
+
+    if 'stream' in request.query_params:
+        return stream_weather_history(request, city_name, return_raw_data)
+
+    if any(param in request.query_params for param in HISTORY_QUERY_PARAMS):
+        return get_weather_history(request, city_name, return_raw_data)
+
+    aggregated_data = city_weather_cache.get(city_name, return_raw_data)
+    cache_status = 'HIT'
+
+    if aggregated_data is None:
+        aggregated_data = Station.objects.get_aggregated_weather_data(city_name, return_raw_data)
+        cache_status = 'MISS'
+
+        if aggregated_data:
+            city_weather_cache.set(city_name, return_raw_data, aggregated_data)
 
     if not aggregated_data:
         return Response(
@@ -28,4 +141,340 @@ def get_aggregated_weather_data(request, city_name):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    return Response(aggregated_data, status=status.HTTP_200_OK)
+    return Response(aggregated_data, status=status.HTTP_200_OK, headers={'X-Cache': cache_status})
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='cities',
+            type={'type': 'array', 'items': {'type': 'string'}},
+            location=OpenApiParameter.QUERY,
+            description='City names, repeated for every city (`?cities=Sofia&cities=Varna`), up to 200.',
+            required=True,
+            explode=True,
+        ),
+        OpenApiParameter(
+            name='providers',
+            type={'type': 'array', 'items': {'type': 'string'}},
+            location=OpenApiParameter.QUERY,
+            description='Provider model names to include, e.g. `weathermasterx` (every provider by default).',
+            required=False,
+            explode=True,
+        ),
+        OpenApiParameter(
+            name='raw',
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description='Set to true to return raw data, otherwise normalized data will be returned.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='since',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Only stations whose latest reading was recorded at or after this time.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='until',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Only stations whose latest reading was recorded before this time.',
+            required=False,
+        ),
+    ],
+    request=CitiesWeatherQuerySerializer,
+    responses={200: OpenApiTypes.OBJECT},
+    description=(
+        'The latest reading of every station in several cities, grouped by city name in the requested order. '
+        'POST takes the same parameters as a JSON body, for lists too long for a URL.'
+    )
+)
+@api_view(['GET', 'POST'])
+def get_cities_weather_data(request):
+    query_serializer = CitiesWeatherQuerySerializer(data=request.data if request.method == 'POST' else request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    params = query_serializer.validated_data
+    cities_data = Station.objects.get_cities_weather_data(
+        params['cities'],
+        params['raw'],
+        providers=params.get('providers'),
+        since=params.get('since'),
+        until=params.get('until'),
+    )
+
+    return Response(cities_data, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='cities',
+            type={'type': 'array', 'items': {'type': 'string'}},
+            location=OpenApiParameter.QUERY,
+            description='City names, repeated for every city (`?cities=Sofia&cities=Varna`), up to 200.',
+            required=True,
+            explode=True,
+        ),
+        OpenApiParameter(
+            name='providers',
+            type={'type': 'array', 'items': {'type': 'string'}},
+            location=OpenApiParameter.QUERY,
+            description='Provider model names to include, e.g. `weathermasterx` (every provider by default).',
+            required=False,
+            explode=True,
+        ),
+        OpenApiParameter(
+            name='since',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Export readings recorded at or after this time.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='until',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Export readings recorded before this time.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='file_format',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=list(EXPORT_FORMATS),
+            description='CSV (by default), Parquet or an Arrow IPC stream. Parquet and Arrow need `pyarrow` on the server.',
+            required=False,
+        ),
+    ],
+    responses={(200, 'application/octet-stream'): OpenApiTypes.BINARY},
+    description=(
+        'Streams the normalized readings of the cities as a file with one column per normalized field, '
+        'for bulk analysis. The readings come provider by provider, ordered by timestamp.'
+    )
+)
+@api_view(['GET'])
+def export_weather_data(request):
+    query_serializer = WeatherExportQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    params = query_serializer.validated_data
+    batches = Station.objects.iter_export_batches(
+        params['cities'],
+        providers=params.get('providers'),
+        since=params.get('since'),
+        until=params.get('until'),
+    )
+
+    export, content_type, extension = EXPORT_FORMATS[params['file_format']]
+    response = StreamingHttpResponse(export(batches), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="weather-data.{extension}"'
+    return response
+
+
+def get_weather_history(request, city_name, return_raw_data):
+    query_serializer = WeatherHistoryQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    history = Station.objects.get_weather_history(city_name, return_raw_data, **query_serializer.validated_data)
+
+    if history is None:
+        return Response(
+            {"message": "No weather stations found for the specified city."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    results, next_cursor = history
+    next_url = None
+    if next_cursor is not None:
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor.encode())
+
+    return Response({"next": next_url, "results": results}, status=status.HTTP_200_OK)
+
+
+def stream_weather_history(request, city_name, return_raw_data):
+    stream_format = STREAM_FORMATS.get(request.query_params['stream'])
+    if stream_format is None:
+        return Response(
+            {"stream": [f"Must be one of: {', '.join(STREAM_FORMATS)}."]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    query_serializer = WeatherHistoryQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    records = Station.objects.iter_weather_history(
+        city_name,
+        return_raw_data,
+        since=query_serializer.validated_data.get('since'),
+        until=query_serializer.validated_data.get('until'),
+    )
+
+    if records is None:
+        return Response(
+            {"message": "No weather stations found for the specified city."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    stream, content_type = stream_format
+    return StreamingHttpResponse(stream(records), content_type=content_type)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='bucket',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=['hour', 'day'],
+            description='Size of the time buckets the readings are aggregated into (hour by default).',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='group_by',
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=['city', 'provider', 'station'],
+            description='Aggregate the whole city, or every provider or station separately (city by default).',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='since',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Aggregate readings recorded at or after this time.',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='until',
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description='Aggregate readings recorded before this time.',
+            required=False,
+        ),
+    ]
+)
+@api_view(['GET'])
+def get_weather_statistics(request, city_name):
+    query_serializer = WeatherStatisticsQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    statistics = Station.objects.get_weather_statistics(city_name, **query_serializer.validated_data)
+
+    if statistics is None:
+        return Response(
+            {"message": "No weather stations found for the specified city."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response(statistics, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='lat', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(name='lon', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(
+            name='radius_km',
+            type=OpenApiTypes.FLOAT,
+            location=OpenApiParameter.QUERY,
+            description='Search radius in kilometres, up to 500 (10 by default).',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Maximum number of stations, between 1 and 1000 (100 by default).',
+            required=False,
+        ),
+    ],
+    responses={200: OpenApiTypes.OBJECT},
+    description='Stations within `radius_km` of the point, nearest first, with their `distance_km`.'
+)
+@api_view(['GET'])
+def get_nearby_stations(request):
+    query_serializer = NearbyStationsQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    params = query_serializer.validated_data
+    stations = Station.objects.get_nearby_stations(params['lat'], params['lon'], params['radius_km'], params['limit'])
+
+    return Response({"results": stations}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='min_lat', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(name='min_lon', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(name='max_lat', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(name='max_lon', type=OpenApiTypes.FLOAT, location=OpenApiParameter.QUERY, required=True),
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Maximum number of stations, between 1 and 5000 (1000 by default).',
+            required=False,
+        ),
+    ],
+    responses={200: OpenApiTypes.OBJECT},
+    description='Stations inside the bounding box.'
+)
+@api_view(['GET'])
+def get_stations_in_bounding_box(request):
+    query_serializer = BoundingBoxQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+
+    stations = Station.objects.get_stations_in_bounding_box(**query_serializer.validated_data)
+
+    return Response({"results": stations}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    responses={200: OpenApiTypes.OBJECT},
+    description='Depth and counters of the ingest queue. `enabled` is false when readings are stored synchronously.'
+)
+@api_view(['GET'])
+def get_ingest_queue_stats(request):
+    ingest_queue = get_ingest_queue()
+
+    if ingest_queue is None:
+        return Response({"enabled": False}, status=status.HTTP_200_OK)
+
+    return Response({"enabled": True, **ingest_queue.stats()}, status=status.HTTP_200_OK)
+
+
+def is_metrics_scraper(request):
+    """
+    Whether the request may read the metrics: a staff user, or a scraper sending `WEATHER_METRICS_TOKEN` as a bearer token.
+    """
+    if request.user.is_staff:
+        return True
+
+    token = settings.WEATHER_METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def get_metrics(request):
+    """
+    Request and query metrics of this process, and the hits and misses of its city weather cache,
+    in the Prometheus text format. Only staff users and scrapers with the metrics token may read them.
+    """
+    if not settings.WEATHER_METRICS_ENABLED:
+        raise Http404()
+
+    if not is_metrics_scraper(request):
+        response = HttpResponse('Authentication required.', status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+
+    cache_stats = city_weather_cache.stats()
+    body = (
+        metrics.render() +
+        render_counter('weather_city_cache_hits_total', 'City weather reads served from the cache.', cache_stats['hits']) +
+        render_counter('weather_city_cache_misses_total', 'City weather reads not found in the cache.', cache_stats['misses'])
+    )
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -74,3 +74,39 @@ class CreateWeatherDataTestCase(TestCase):
         self.assertEqual(BulgarianMeteoProData.objects.count(), 0)
         self.assertEqual(Station.objects.count(), 0)
 
+
+class BulkCreateWeatherDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('bulk_create_weather_data_bulgarian_meteo_pro')
+        self.valid_payloads = [
+            {
+                "station_id": f"BG-STATION-{index:03d}",
+                "city": "Sofia",
+                "latitude": 42.6977,
+                "longitude": 23.3219,
+                "timestamp": f"2024-09-27T10:{index:02d}:30Z",
+                "temperature_celsius": 22.5,
+                "humidity_percent": 65.0,
+                "wind_speed_kph": 14.3,
+                "station_status": "active"
+            }
+            for index in range(5)
+        ]
+
+    def test_bulk_create_weather_data_success(self):
+        """Test creating a batch of weather data entries with their Station entries"""
+        response = self.client.post(self.url, data=self.valid_payloads, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 5, "errors": []})
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 5)
+        self.assertEqual(Station.objects.filter(station_type="bulgarianmeteoprodata", city="Sofia").count(), 5)
+        self.assertEqual(BulgarianMeteoProData.objects.first().raw_data, self.valid_payloads[0])
+
+    def test_bulk_create_weather_data_requires_list(self):
+        """Test that a single object is rejected by the batch endpoint"""
+        response = self.client.post(self.url, data=self.valid_payloads[0], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 0)
@@ -0,0 +1,167 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from datetime import timedelta
+from django.core.management import CommandError, call_command
+from django.shortcuts import resolve_url
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations.cache import city_weather_cache
+from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from stations.models import ArchivedReading, NormalizedReading, Station, WeatherRollup
+from weather_master_x.models import WeatherMasterX
+from tests.stations.utils import bulgarian_meteo_pro_payload, create_history_readings
+
+
+class ReadingRetentionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city_weather_cache.clear()
+        now = timezone.now()
+        readings = [
+            ("BG-OLD", now - timedelta(days=100)),
+            ("BG-OLD", now - timedelta(days=90)),
+            ("BG-NEW", now - timedelta(days=100)),
+            ("BG-NEW", now - timedelta(days=1)),
+        ]
+        response = self.client.post(
+            resolve_url('bulk_create_weather_data_bulgarian_meteo_pro'),
+            data=[
+                bulgarian_meteo_pro_payload(station_id=station_id, timestamp=timestamp.isoformat())
+                for station_id, timestamp in readings
+            ],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True)
+    def test_retention_deletes_old_readings_in_batches(self):
+        """Test that the retention command removes old readings, their normalized rows and stations without newer readings"""
+        NormalizedReading.objects.rebuild()
+        rollups = WeatherRollup.objects.count()
+
+        call_command("apply_reading_retention", "--days", "30", "--batch-size", "1", stdout=StringIO())
+
+        self.assertEqual(list(BulgarianMeteoProData.objects.values_list("station_id", flat=True)), ["BG-NEW"])
+        self.assertEqual(list(Station.objects.values_list("station_identifier", flat=True)), ["BG-NEW"])
+        self.assertEqual(NormalizedReading.objects.count(), 1)
+        self.assertEqual(WeatherRollup.objects.count(), rollups)
+
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'))
+        self.assertEqual([reading["station_id"] for reading in response.data], ["BG-NEW"])
+
+    def test_retention_requires_a_period(self):
+        """Test that the retention command refuses to run without a retention period"""
+        with self.assertRaises(CommandError):
+            call_command("apply_reading_retention", stdout=StringIO())
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 4)
+
+
+
+class ArchiveReadingsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_city_weather_data', city_name='Sofia')
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(WEATHER_ARCHIVE_ENABLED=True, WEATHER_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.archive_dir = Path(archive_dir.name)
+
+        create_history_readings()
+
+    def get_history(self, params):
+        readings, url = [], self.url
+
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            readings.extend(response.data["results"])
+            url, params = response.data["next"], None
+
+        return readings
+
+    def test_archive_moves_old_readings_to_segments(self):
+        """Test that the archive command moves every reading but the latest of each station to monthly segments"""
+        call_command("archive_readings", "--days", "30", "--segment-size", "2", stdout=StringIO())
+
+        self.assertEqual(list(BulgarianMeteoProData.objects.values_list("raw_data", flat=True)), [{"hour": 8}])
+        self.assertEqual(list(WeatherMasterX.objects.values_list("raw_data", flat=True)), [{"hour": 9}])
+        self.assertEqual(ArchivedReading.objects.count(), 7)
+        self.assertEqual(
+            sorted(str(path.parent.relative_to(self.archive_dir)) for path in self.archive_dir.rglob("part-*")),
+            [
+                "bulgarian_meteo_pro.bulgarianmeteoprodata/2024-09",
+                "bulgarian_meteo_pro.bulgarianmeteoprodata/2024-09",
+                "weather_master_x.weathermasterx/2024-09",
+                "weather_master_x.weathermasterx/2024-09",
+            ]
+        )
+
+    def test_history_reads_archived_readings(self):
+        """Test that raw and normalized history pages are the same before and after archiving"""
+        raw_history = self.get_history({"raw": "true", "limit": 2})
+        normalized_history = self.get_history({"limit": 3})
+
+        call_command("archive_readings", "--days", "30", "--segment-size", "2", stdout=StringIO())
+
+        self.assertEqual(self.get_history({"raw": "true", "limit": 2}), raw_history)
+        self.assertEqual(self.get_history({"limit": 3}), normalized_history)
+        self.assertEqual([reading["hour"] for reading in raw_history], [0, 0, 2, 3, 4, 6, 6, 8, 9])
+
+        response = self.client.get(self.url, {"stream": "ndjson", "raw": "true"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["hour"] for line in lines], [0, 0, 2, 3, 4, 6, 6, 8, 9])
+
+    def test_archive_requires_reads_of_the_archive(self):
+        """Test that the archive command refuses to run while history reads ignore the archive"""
+        with override_settings(WEATHER_ARCHIVE_ENABLED=False), self.assertRaises(CommandError):
+            call_command("archive_readings", "--days", "30", stdout=StringIO())
+
+        self.assertEqual(ArchivedReading.objects.count(), 0)
+
+    def get_statistics(self, params):
+        response = self.client.get(resolve_url('get_city_weather_statistics', city_name='Sofia'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            {key: {k: v if v is None else round(v, 6) for k, v in value.items()} if isinstance(value, dict) else value
+             for key, value in bucket.items()}
+            for bucket in response.data
+        ]
+
+    def test_statistics_read_archived_readings(self):
+        """Test that statistics over windows off the bucket boundaries still aggregate the archived readings"""
+        params = {"group_by": "station", "until": "2024-09-27T23:59:59Z"}
+        statistics = self.get_statistics(params)
+
+        call_command("archive_readings", "--days", "30", stdout=StringIO())
+
+        self.assertEqual(self.get_statistics(params), statistics)
+        self.assertEqual(self.get_statistics({"group_by": "station"}), statistics)
+        self.assertEqual(sum(bucket["count"] for bucket in statistics), 9)
+
+    @override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True)
+    def test_rebuilds_keep_archived_readings(self):
+        """Test that rebuilding the rollups and normalized readings after archiving keeps the archived readings"""
+        NormalizedReading.objects.rebuild()
+        normalized_fields = ("provider", "object_id", "city_key", "temperature_celsius", "timestamp")
+        normalized_readings = list(NormalizedReading.objects.order_by("provider", "object_id").values_list(*normalized_fields))
+        statistics = self.get_statistics({"group_by": "station"})
+        rollups = WeatherRollup.objects.count()
+
+        call_command("archive_readings", "--days", "30", stdout=StringIO())
+        call_command("rebuild_weather_rollups", stdout=StringIO())
+        call_command("rebuild_normalized_readings", stdout=StringIO())
+
+        self.assertEqual(WeatherRollup.objects.count(), rollups)
+        self.assertEqual(self.get_statistics({"group_by": "station"}), statistics)
+        self.assertEqual(
+            list(NormalizedReading.objects.order_by("provider", "object_id").values_list(*normalized_fields)),
+            normalized_readings
+        )
+        self.assertEqual(len(normalized_readings), 9)
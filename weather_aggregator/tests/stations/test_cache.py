@@ -0,0 +1,117 @@
+import time
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.shortcuts import resolve_url
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations.cache import PROCESS_LOCAL_NOTICE, city_weather_cache
+from tests.stations.utils import bulgarian_meteo_pro_payload
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_city_weather_data', city_name='Sofia')
+        city_weather_cache.clear()
+        self.payload = bulgarian_meteo_pro_payload()
+        self.post_reading(self.payload)
+
+    def post_reading(self, payload):
+        response = self.client.post(resolve_url('create_weather_data_bulgarian_meteo_pro'), data=payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_if_none_match_answers_not_modified(self):
+        """Test that a matching ETag is answered with 304 after the validator query alone, or no query once cached"""
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(etag, self.client.get(self.url, {"raw": "true"})["ETag"])
+
+        city_weather_cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.post_reading({**self.payload, "timestamp": "2024-09-27T11:00:00Z"})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # A reading older than the latest one leaves the response and its validator unchanged
+        etag = response["ETag"]
+        self.post_reading({**self.payload, "timestamp": "2024-09-27T09:00:00Z"})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_answers_not_modified(self):
+        """Test that a request with the Last-Modified date of the response is answered with 304"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_history_and_unknown_cities_have_no_validators(self):
+        """Test that history pages and cities without stations are neither validated nor answered with 304"""
+        response = self.client.get(self.url, {"limit": 10}, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Varna'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("ETag", response)
+
+
+
+class CityWeatherCacheTestCase(TestCase):
+    def setUp(self):
+        city_weather_cache.clear()
+
+    def test_entries_expire_after_the_timeout(self):
+        """Test that cached cities are dropped once the timeout of the cache alias has passed"""
+        city_weather_cache.set("Sofia", False, [{"station_id": "BG-001"}])
+        self.assertEqual(city_weather_cache.get("Sofia", False), [{"station_id": "BG-001"}])
+
+        expired = time.time() + settings.CACHES["weather"]["TIMEOUT"] + 1
+        with mock.patch("time.time", return_value=expired):
+            self.assertIsNone(city_weather_cache.get("Sofia", False))
+
+    @override_settings(CACHES={
+        **settings.CACHES,
+        "weather": {
+            **settings.CACHES["weather"],
+            "LOCATION": "city-weather-bounded",
+            "OPTIONS": {"MAX_ENTRIES": 2, "CULL_FREQUENCY": 2},
+        },
+    })
+    def test_size_bound_evicts_the_least_recently_used_city(self):
+        """Test that a full cache evicts a single entry, the least recently used one"""
+        city_weather_cache.set("Sofia", False, ["Sofia"])
+        city_weather_cache.set("Plovdiv", False, ["Plovdiv"])
+        city_weather_cache.get("Sofia", False)
+        city_weather_cache.set("Varna", False, ["Varna"])
+
+        self.assertEqual(city_weather_cache.get("Sofia", False), ["Sofia"])
+        self.assertIsNone(city_weather_cache.get("Plovdiv", False))
+        self.assertEqual(city_weather_cache.get("Varna", False), ["Varna"])
+
+    def test_commands_report_a_process_local_cache(self):
+        """Test that commands changing readings say when they cannot reach the cache of the web processes"""
+        self.assertFalse(city_weather_cache.shared)
+        out = StringIO()
+        call_command("apply_reading_retention", "--days", "30", stdout=out)
+        self.assertIn(PROCESS_LOCAL_NOTICE, out.getvalue())
+
+        shared = {**settings.CACHES, "weather": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        with override_settings(CACHES=shared):
+            self.assertTrue(city_weather_cache.shared)
+            out = StringIO()
+            call_command("apply_reading_retention", "--days", "30", stdout=out)
+            self.assertNotIn(PROCESS_LOCAL_NOTICE, out.getvalue())
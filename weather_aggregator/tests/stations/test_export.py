@@ -0,0 +1,112 @@
+import csv
+import json
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from datetime import datetime, timezone as dt_timezone
+from django.core.management import CommandError, call_command
+from django.shortcuts import resolve_url
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations import export
+from stations.models import ArchivedReading
+from tests.stations.utils import create_history_readings
+
+
+class ExportWeatherDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('export_weather_data')
+        create_history_readings()
+
+    def get_export(self, params):
+        response = self.client.get(self.url, {"cities": ["Sofia"], **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content)
+
+    def get_csv_rows(self, params=None):
+        return [
+            (row["provider"], row["station_id"], row["timestamp"], round(float(row["temperature_celsius"]), 6),
+             row["wind_speed_kph"], row["pressure_hpa"], row["uv_index"], row["is_active"])
+            for row in csv.DictReader(self.get_export({"file_format": "csv", **(params or {})}).decode().splitlines())
+        ]
+
+    def test_csv_export_matches_normalized_history(self):
+        """Test that the CSV export holds the normalized readings of the city provider by provider, in Celsius"""
+        rows = self.get_csv_rows()
+
+        self.assertEqual([row[:3] for row in rows], [
+            *(("bulgarianmeteoprodata", "BG-001", f"2024-09-27T{hour:02d}:00:00Z") for hour in range(0, 10, 2)),
+            *(("weathermasterx", "WX-1234", f"2024-09-27T{hour:02d}:00:00Z") for hour in range(0, 10, 3)),
+        ])
+        self.assertEqual(rows[0][3:], (20.0, "10.0", "", "", "True"))
+        self.assertEqual(rows[-1][3:], (24.0, "", "1012.3", "4", "True"))
+
+        history = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"stream": "json"})
+        temperatures = {
+            (record["station_id"], record["timestamp"]): round(record["temperature_celsius"], 6)
+            for record in json.loads(b"".join(history.streaming_content))
+        }
+        self.assertEqual({(row[1], row[2]): row[3] for row in rows}, temperatures)
+
+        self.assertEqual(
+            [row[2] for row in self.get_csv_rows({"since": "2024-09-27T03:00:00Z", "until": "2024-09-27T06:00:00Z"})],
+            ["2024-09-27T04:00:00Z", "2024-09-27T03:00:00Z"]
+        )
+        self.assertEqual(len(self.get_csv_rows({"providers": ["weathermasterx"]})), 4)
+
+    def test_export_reads_normalized_readings_and_archive(self):
+        """Test that the export is the same from the normalized readings table and with archived readings"""
+        rows = self.get_csv_rows()
+
+        with override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True):
+            call_command("rebuild_normalized_readings", stdout=StringIO())
+            self.assertEqual(self.get_csv_rows(), rows)
+
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        with override_settings(WEATHER_ARCHIVE_ENABLED=True, WEATHER_ARCHIVE_DIR=archive_dir.name):
+            call_command("archive_readings", "--days", "30", "--segment-size", "2", stdout=StringIO())
+            self.assertEqual(ArchivedReading.objects.count(), 7)
+            self.assertEqual(self.get_csv_rows(), rows)
+
+    @unittest.skipIf(export.pyarrow is None, "requires pyarrow")
+    def test_columnar_exports_match_csv(self):
+        """Test that the Parquet and Arrow exports hold the rows of the CSV export with typed columns"""
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        parquet_table = pyarrow.parquet.read_table(pyarrow.BufferReader(self.get_export({"file_format": "parquet"})))
+        arrow_table = pyarrow.ipc.open_stream(self.get_export({"file_format": "arrow"})).read_all()
+
+        self.assertEqual(parquet_table.schema, export.get_export_schema())
+        self.assertEqual(arrow_table.to_pylist(), parquet_table.to_pylist())
+        self.assertEqual(
+            [(row["station_id"], round(row["temperature_celsius"], 6), row["uv_index"], row["is_active"])
+             for row in parquet_table.to_pylist()],
+            [(row[1], row[3], int(row[6]) if row[6] else None, row[7] == "True") for row in self.get_csv_rows()]
+        )
+        self.assertEqual(
+            parquet_table.column("timestamp")[0].as_py(), datetime(2024, 9, 27, tzinfo=dt_timezone.utc)
+        )
+
+    def test_export_command_writes_the_endpoint_file(self):
+        """Test that the export command writes the file the endpoint streams, and that formats need pyarrow"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = Path(output_dir) / "sofia.csv"
+            stdout = StringIO()
+            call_command("export_weather_readings", "--city", "sofia", "--batch-size", "2", "--output", str(output), stdout=stdout)
+
+            self.assertEqual(output.read_bytes(), self.get_export({}))
+            self.assertIn("Exported 9 readings", stdout.getvalue())
+
+            with mock.patch.object(export, "pyarrow", None):
+                response = self.client.get(self.url, {"cities": ["Sofia"], "file_format": "parquet"})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+                with self.assertRaises(CommandError):
+                    call_command("export_weather_readings", "--city", "Sofia", "--format", "arrow", "--output", str(output))
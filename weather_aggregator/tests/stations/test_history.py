@@ -0,0 +1,201 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.shortcuts import resolve_url
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations.models import WeatherRollup
+from tests.stations.utils import create_history_readings
+
+
+class GetWeatherHistoryTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_city_weather_data', city_name='Sofia')
+
+        create_history_readings()
+
+    def test_history_pages_follow_next_links(self):
+        """Test that following the cursor links returns every reading exactly once, ordered by time"""
+        hours = []
+        url, params = self.url, {"raw": "true", "limit": 3}
+
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            hours.extend(reading["hour"] for reading in response.data["results"])
+            url, params = response.data["next"], None
+
+        self.assertEqual(hours, [0, 0, 2, 3, 4, 6, 6, 8, 9])
+
+    def test_history_time_window(self):
+        """Test that `since` is inclusive and `until` is exclusive"""
+        response = self.client.get(self.url, {"since": "2024-09-27T03:00:00Z", "until": "2024-09-27T08:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(
+            [(reading["station_id"], reading["timestamp"].hour) for reading in response.data["results"]],
+            [("WX-1234", 3), ("BG-001", 4), ("BG-001", 6), ("WX-1234", 6)]
+        )
+
+    def test_history_invalid_parameters(self):
+        """Test that invalid history parameters are rejected"""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor", "limit": 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("cursor", response.data)
+        self.assertIn("limit", response.data)
+
+    def test_history_city_not_found(self):
+        """Test getting the history of a city that has no stations"""
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Varna'), {"limit": 10})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_history_stream_ndjson(self):
+        """Test streaming the whole history as newline-delimited JSON"""
+        response = self.client.get(self.url, {"stream": "ndjson", "raw": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["hour"] for line in lines], [0, 0, 2, 3, 4, 6, 6, 8, 9])
+
+    def test_history_stream_json_array(self):
+        """Test streaming a time window as a JSON array in the normalized format"""
+        response = self.client.get(self.url, {"stream": "json", "since": "2024-09-27T07:00:00Z"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        readings = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            [(reading["station_id"], reading["timestamp"]) for reading in readings],
+            [("BG-001", "2024-09-27T08:00:00Z"), ("WX-1234", "2024-09-27T09:00:00Z")]
+        )
+
+        response = self.client.get(self.url, {"stream": "json", "since": "2024-09-28T00:00:00Z"})
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), [])
+
+    def test_history_stream_invalid_format(self):
+        """Test that unknown stream formats are rejected"""
+        response = self.client.get(self.url, {"stream": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class GetWeatherStatisticsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_city_weather_statistics', city_name='Sofia')
+        create_history_readings()
+
+    def test_statistics_whole_city_per_day(self):
+        """Test that the readings of every provider are aggregated into one bucket, in normalized units"""
+        response = self.client.get(self.url, {"bucket": "day"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        day = response.data[0]
+        self.assertEqual(day["count"], 9)
+        self.assertAlmostEqual(day["temperature_celsius"]["mean"], 24.0)
+        self.assertAlmostEqual(day["temperature_celsius"]["min"], 20.0)
+        self.assertAlmostEqual(day["temperature_celsius"]["max"], 28.0)
+        self.assertAlmostEqual(day["humidity_percent"]["mean"], (5 * 60.0 + 4 * 58.0) / 9)
+        self.assertAlmostEqual(day["pressure_hpa"]["mean"], 1012.3)
+        self.assertAlmostEqual(day["wind_speed_kph"]["max"], 10.0)
+
+    def test_statistics_grouped_by_station_per_hour(self):
+        """Test hourly buckets per station within a time window"""
+        response = self.client.get(self.url, {
+            "group_by": "station",
+            "since": "2024-09-27T06:00:00Z",
+            "until": "2024-09-27T09:00:00Z",
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(bucket["bucket_start"].hour, bucket["station"], bucket["count"]) for bucket in response.data],
+            [(6, "BG-001", 1), (6, "WX-1234", 1), (8, "BG-001", 1)]
+        )
+        self.assertIsNone(response.data[0]["pressure_hpa"]["mean"])
+        self.assertIsNone(response.data[2]["pressure_hpa"]["max"])
+
+    def test_statistics_grouped_by_provider(self):
+        """Test that every provider gets its own bucket"""
+        response = self.client.get(self.url, {"bucket": "day", "group_by": "provider"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {bucket["provider"]: bucket["count"] for bucket in response.data},
+            {"bulgarianmeteoprodata": 5, "weathermasterx": 4}
+        )
+
+    def test_statistics_rollups_match_readings(self):
+        """Test that bucket-aligned windows read from the rollups and return the aggregates of the readings"""
+        def rounded(statistics):
+            return [
+                {key: {k: v if v is None else round(v, 6) for k, v in value.items()} if isinstance(value, dict) else value
+                 for key, value in bucket.items()}
+                for bucket in statistics
+            ]
+
+        with CaptureQueriesContext(connection) as queries:
+            from_rollups = self.client.get(self.url, {"group_by": "provider"}).data
+        self.assertTrue(any("stations_weatherrollup" in query["sql"] for query in queries.captured_queries))
+
+        # `until` is not on an hour boundary, so the provider tables are aggregated instead
+        from_readings = self.client.get(self.url, {"group_by": "provider", "until": "2024-09-27T23:59:59Z"}).data
+
+        self.assertEqual(len(from_rollups), 9)
+        self.assertEqual(rounded(from_rollups), rounded(from_readings))
+
+    def test_rebuild_weather_rollups(self):
+        """Test that the backfill command recreates the rollups that ingest maintains"""
+        expected = self.client.get(self.url, {"group_by": "station"}).data
+        WeatherRollup.objects.all().delete()
+
+        call_command("rebuild_weather_rollups", stdout=StringIO())
+
+        self.assertEqual(WeatherRollup.objects.filter(granularity="day").count(), 2)
+        actual = self.client.get(self.url, {"group_by": "station"}).data
+        self.assertEqual(
+            [(bucket["bucket_start"], bucket["station"], bucket["count"]) for bucket in actual],
+            [(bucket["bucket_start"], bucket["station"], bucket["count"]) for bucket in expected]
+        )
+        for actual_bucket, expected_bucket in zip(actual, expected):
+            self.assertAlmostEqual(
+                actual_bucket["temperature_celsius"]["mean"], expected_bucket["temperature_celsius"]["mean"]
+            )
+
+    def test_statistics_without_rollups(self):
+        """Test that a city without rollups, such as before the backfill, is aggregated from the provider tables"""
+        expected = self.client.get(self.url, {"group_by": "station"}).data
+        WeatherRollup.objects.all().delete()
+
+        response = self.client.get(self.url, {"group_by": "station"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(bucket["bucket_start"], bucket["station"], bucket["count"]) for bucket in response.data],
+            [(bucket["bucket_start"], bucket["station"], bucket["count"]) for bucket in expected]
+        )
+        self.assertEqual(len(expected), 9)
+
+    def test_statistics_invalid_params(self):
+        """Test that unknown buckets and groupings are rejected"""
+        response = self.client.get(self.url, {"bucket": "minute"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {"group_by": "country"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_statistics_unknown_city(self):
+        """Test that a city without stations returns 404"""
+        response = self.client.get(resolve_url('get_city_weather_statistics', city_name='Varna'))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
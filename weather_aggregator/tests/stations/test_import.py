@@ -0,0 +1,122 @@
+import gzip
+import json
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+from datetime import datetime, timezone as dt_timezone
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.shortcuts import resolve_url
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations.backfill import import_file
+from stations.models import Station, WeatherRollup
+from weather_master_x.models import WeatherMasterX
+from tests.stations.utils import bulgarian_meteo_pro_payload, weather_master_x_payload
+
+
+class ImportReadingsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        import_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(import_dir.cleanup)
+        self.import_dir = Path(import_dir.name)
+
+        self.weather_master_payloads = [
+            weather_master_x_payload(
+                recorded_at=f"2024-09-27T{hour:02d}:00:00Z",
+                readings={
+                    "temp_fahrenheit": 70 + hour, "humidity_percent": 58.5, "pressure_hpa": 1012.3, "uv_index": 4, "rain_mm": 0
+                }
+            )
+            for hour in range(6)
+        ]
+
+    def import_readings(self, *files, provider="weathermasterx"):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "import_readings", *map(str, files), "--provider", provider, "--batch-size", "4", stdout=stdout, stderr=stderr
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def get_raw_history(self):
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"stream": "json", "raw": "true"})
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_import_stores_payloads_like_ingest(self):
+        """Test that NDJSON and CSV files are validated, stored as received and recorded on their stations"""
+        ndjson_file = self.import_dir / "weather_master_x.ndjson"
+        ndjson_file.write_text(
+            "".join(json.dumps(payload) + "\n" for payload in self.weather_master_payloads) +
+            "not json\n" + json.dumps({"station_identifier": "WX-1234"}) + "\n"
+        )
+        csv_file = self.import_dir / "bulgarian_meteo_pro.csv"
+        csv_file.write_text(
+            "station_id,city,latitude,longitude,temperature_celsius,humidity_percent,wind_speed_kph,station_status,timestamp\n"
+            "BG-001,Sofia,42.6977,23.3219,21.5,60,10.0,active,2024-09-27T08:00:00Z\n"
+            "BG-001,Sofia,north,23.3219,21.5,60,10.0,active,2024-09-27T09:00:00Z\n"
+        )
+
+        stdout, stderr = self.import_readings(ndjson_file)
+        self.assertIn("read 8, stored 6, invalid 2", stdout)
+        self.assertIn(f"{ndjson_file}:7: [\"Not a JSON object.\"]", stderr)
+        self.assertIn(f"{ndjson_file}:8: {{\"city_name\"", stderr)
+
+        stdout, stderr = self.import_readings(csv_file, provider="bulgarianmeteoprodata")
+        self.assertIn("read 2, stored 1, invalid 1", stdout)
+        self.assertIn(f"{csv_file}:3: {{\"latitude\": [\"A valid number is required.\"]}}", stderr)
+
+        self.assertEqual(self.get_raw_history(), [
+            *self.weather_master_payloads,
+            bulgarian_meteo_pro_payload(temperature_celsius=21.5, humidity_percent=60, timestamp="2024-09-27T08:00:00Z"),
+        ])
+        self.assertEqual(
+            sorted(Station.objects.values_list("station_identifier", "recorded_at")),
+            [
+                ("BG-001", datetime(2024, 9, 27, 8, tzinfo=dt_timezone.utc)),
+                ("WX-1234", datetime(2024, 9, 27, 5, tzinfo=dt_timezone.utc)),
+            ]
+        )
+        self.assertEqual(sum(WeatherRollup.objects.filter(granularity="day").values_list("count", flat=True)), 7)
+
+    def test_import_skips_stored_readings(self):
+        """Test that importing a gzipped file again, or a reading sent to the API before, stores nothing twice"""
+        response = self.client.post(
+            resolve_url('create_weather_data_weather_master_x'), data=self.weather_master_payloads[2], format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        gzip_file = self.import_dir / "weather_master_x.jsonl.gz"
+        with gzip.open(gzip_file, "wt") as import_file:
+            for payload in self.weather_master_payloads + self.weather_master_payloads[:1]:
+                import_file.write(json.dumps(payload) + "\n")
+
+        self.assertIn("read 7, stored 5, invalid 0", self.import_readings(gzip_file)[0])
+        self.assertIn("read 7, stored 0, invalid 0", self.import_readings(gzip_file)[0])
+
+        self.assertEqual(self.get_raw_history(), self.weather_master_payloads)
+        self.assertEqual(WeatherRollup.objects.get(granularity="day").count, 6)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "COPY requires PostgreSQL")
+    def test_import_with_copy(self):
+        """Test that the COPY path stores the readings once and records their stations with the stored ids"""
+        ndjson_file = self.import_dir / "weather_master_x.ndjson"
+        ndjson_file.write_text("".join(json.dumps(payload) + "\n" for payload in self.weather_master_payloads))
+
+        result = import_file(ndjson_file, "weathermasterx", batch_size=4, use_copy=True)
+        self.assertEqual((result["read"], result["stored"], result["invalid"]), (6, 6, 0))
+        self.assertEqual(import_file(ndjson_file, "weathermasterx", batch_size=4, use_copy=True)["stored"], 0)
+
+        self.assertEqual(self.get_raw_history(), self.weather_master_payloads)
+        latest = WeatherMasterX.objects.order_by("recorded_at").last()
+        self.assertEqual(Station.objects.get().object_id, latest.id)
+        self.assertEqual(WeatherRollup.objects.get(granularity="day").count, 6)
+
+    def test_import_refuses_unknown_files(self):
+        """Test that the import command refuses files that are not NDJSON or CSV, or missing"""
+        with self.assertRaises(CommandError):
+            self.import_readings(self.import_dir / "readings.xml")
+        with self.assertRaises(CommandError):
+            self.import_readings(self.import_dir / "missing.ndjson")
@@ -0,0 +1,286 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.shortcuts import resolve_url
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from stations import ingest
+from stations.ingest import IngestQueueFull, MemoryIngestQueue, SpoolIngestQueue
+from stations.idempotency import idempotency_key_store
+from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from bulgarian_meteo_pro.serializers import BulgarianMeteoProDataSerializer
+from stations.models import NormalizedReading, QueuedReading, Station, WeatherRollup
+from tests.stations.utils import bulgarian_meteo_pro_payload
+
+
+class IdempotentIngestTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('create_weather_data_bulgarian_meteo_pro')
+        idempotency_key_store.cache.clear()
+        self.payload = bulgarian_meteo_pro_payload()
+
+    def test_retried_reading_is_stored_once(self):
+        """Test that a retried reading answers with the stored one and is neither stored nor counted again"""
+        first = self.client.post(self.url, data=self.payload, format='json')
+        retry = self.client.post(self.url, data={**self.payload, "temperature_celsius": 30.0}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 1)
+        self.assertEqual(Station.objects.count(), 1)
+        self.assertEqual(WeatherRollup.objects.get(granularity='hour').count, 1)
+
+    @override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True)
+    def test_reading_stored_concurrently_is_recorded_once(self):
+        """Test that a reading a concurrent request stores between the lookup and the insert is not recorded again"""
+        get_stored_readings = ingest.get_stored_readings
+        concurrent = {}
+
+        def store_concurrently(serializer_class, instances):
+            stored = list(get_stored_readings(serializer_class, instances))
+            if not concurrent:
+                serializer = BulgarianMeteoProDataSerializer(data=self.payload)
+                serializer.is_valid(raise_exception=True)
+                concurrent['instance'] = instance = serializer.build_instance()
+                instance.save()
+                Station.objects.record_readings('bulgarianmeteoprodata', [(instance, serializer.get_station_data(instance))])
+            return stored
+
+        with mock.patch.object(ingest, 'get_stored_readings', side_effect=store_concurrently):
+            response = self.client.post(self.url, data=self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BulgarianMeteoProData.objects.get().id, concurrent['instance'].id)
+        self.assertEqual(Station.objects.get().object_id, concurrent['instance'].id)
+        self.assertEqual(
+            sorted(WeatherRollup.objects.values_list('granularity', 'count', 'temperature_celsius_count')),
+            [('day', 1, 1), ('hour', 1, 1)]
+        )
+        self.assertEqual(NormalizedReading.objects.count(), 1)
+
+    def test_batch_duplicates_are_stored_once(self):
+        """Test that duplicates within a batch and of stored readings are skipped by the batch endpoints"""
+        batch = [self.payload, {**self.payload, "timestamp": "2024-09-27T11:00:00Z"}, self.payload]
+        self.client.post(self.url, data=self.payload, format='json')
+
+        for _ in range(2):
+            response = self.client.post(
+                resolve_url('bulk_create_weather_data_bulgarian_meteo_pro'), data=batch, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 2)
+        self.assertEqual(WeatherRollup.objects.get(granularity='day').count, 2)
+        self.assertEqual(Station.objects.get().recorded_at.hour, 11)
+
+    def test_idempotency_key_replays_the_response(self):
+        """Test that a retry with the Idempotency-Key of a processed request gets its response without processing"""
+        first = self.client.post(self.url, data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+        BulgarianMeteoProData.objects.all().delete()
+
+        with self.assertNumQueries(0):
+            retry = self.client.post(self.url, data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertFalse(BulgarianMeteoProData.objects.exists())
+
+        invalid = self.client.post(self.url, data={}, format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.post(self.url, data={}, format='json', HTTP_IDEMPOTENCY_KEY='key-2').data, invalid.data
+        )
+
+    def test_idempotency_key_rejects_other_requests(self):
+        """Test that a key reused for another body or while its request is processed is refused"""
+        self.client.post(self.url, data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY='key-1')
+
+        response = self.client.post(
+            self.url, data={**self.payload, "station_id": "BG-002"}, format='json', HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+        self.assertEqual(response.status_code, 422)
+
+        idempotency_key_store.lock(self.url, 'key-2')
+        response = self.client.post(self.url, data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.post(self.url, data=self.payload, format='json', HTTP_IDEMPOTENCY_KEY='k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_store_is_atomic(self):
+        """Test that the async store keeps no reading when recording its station fails"""
+        serializer = BulgarianMeteoProDataSerializer(data=self.payload)
+        serializer.is_valid(raise_exception=True)
+
+        with mock.patch.object(Station.objects, 'record_readings', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            await ingest.astore_readings('bulgarianmeteoprodata', [serializer])
+
+        self.assertEqual(await BulgarianMeteoProData.objects.acount(), 0)
+
+    async def test_async_views_are_idempotent(self):
+        """Test that the async views store a retried reading once and replay responses by Idempotency-Key"""
+        url = resolve_url('acreate_weather_data_bulgarian_meteo_pro')
+        first = await self.async_client.post(url, self.payload, content_type='application/json')
+        retry = await self.async_client.post(url, self.payload, content_type='application/json')
+
+        self.assertEqual(first.json(), retry.json())
+        self.assertEqual(await BulgarianMeteoProData.objects.acount(), 1)
+
+        batch_url = resolve_url('abulk_create_weather_data_bulgarian_meteo_pro')
+        first = await self.async_client.post(
+            batch_url, [self.payload, self.payload], content_type='application/json', headers={"Idempotency-Key": "key-1"}
+        )
+        await BulgarianMeteoProData.objects.all().adelete()
+        retry = await self.async_client.post(
+            batch_url, [self.payload, self.payload], content_type='application/json', headers={"Idempotency-Key": "key-1"}
+        )
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(await BulgarianMeteoProData.objects.acount(), 0)
+
+
+@override_settings(WEATHER_INGEST_QUEUE_ENABLED=True, WEATHER_INGEST_QUEUE_DURABLE=True)
+class IngestQueueTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.payloads = [
+            bulgarian_meteo_pro_payload(station_id=f"BG-STATION-{index:03d}", timestamp=f"2024-09-27T10:{index:02d}:30Z")
+            for index in range(3)
+        ]
+
+    def test_create_weather_data_is_queued(self):
+        """Test that a valid reading is queued with 202 and stored by the queue worker"""
+        response = self.client.post(
+            resolve_url('create_weather_data_bulgarian_meteo_pro'),
+            data=self.payloads[0],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(QueuedReading.objects.count(), 1)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 0)
+
+        call_command("process_ingest_queue", "--once", stdout=StringIO())
+
+        self.assertEqual(QueuedReading.objects.count(), 0)
+        self.assertEqual(BulgarianMeteoProData.objects.get().raw_data, self.payloads[0])
+        self.assertEqual(Station.objects.get().station_type, "bulgarianmeteoprodata")
+
+    def test_invalid_reading_is_not_queued(self):
+        """Test that validation still happens before the reading is queued"""
+        response = self.client.post(
+            resolve_url('create_weather_data_bulgarian_meteo_pro'),
+            data={**self.payloads[0], "timestamp": "invalid-date"},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(QueuedReading.objects.count(), 0)
+
+    def test_bulk_create_weather_data_is_queued(self):
+        """Test that the valid items of a batch are queued and reported with the invalid ones"""
+        response = self.client.post(
+            resolve_url('bulk_create_weather_data_bulgarian_meteo_pro'),
+            data=[*self.payloads, {"station_id": "BG-STATION-999"}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["queued"], 3)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [3])
+
+        stats = self.client.get(resolve_url('get_ingest_queue_stats')).data
+        self.assertEqual((stats["enabled"], stats["durable"], stats["depth"]), (True, True, 3))
+
+        call_command("process_ingest_queue", "--once", "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 3)
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(self.client.get(resolve_url('get_ingest_queue_stats')).data["depth"], 0)
+
+    def test_failing_queued_reading_does_not_hold_up_the_queue(self):
+        """Test that a queued reading that fails to store is retried, then kept aside, while the others are stored"""
+        for payload in self.payloads:
+            QueuedReading.objects.create(
+                model_label="bulgarian_meteo_pro.bulgarianmeteoprodata",
+                station_type="bulgarianmeteoprodata",
+                payload=payload
+            )
+        poisoned = QueuedReading.objects.create(
+            model_label="bulgarian_meteo_pro.removedmodel",
+            station_type="removedmodel",
+            payload=self.payloads[0]
+        )
+
+        ingest_queue = SpoolIngestQueue(batch_size=10, flush_interval=1, max_attempts=2)
+        with self.assertLogs('stations.ingest', level='ERROR'):
+            self.assertEqual(ingest_queue.flush(), 4)
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 3)
+        poisoned.refresh_from_db()
+        self.assertEqual(poisoned.attempts, 1)
+        self.assertIn("LookupError", poisoned.last_error)
+        self.assertIsNone(poisoned.failed_at)
+
+        with self.assertLogs('stations.ingest', level='ERROR') as logs:
+            ingest_queue.drain()
+
+        self.assertIn("Gave up on queued reading", logs.output[-1])
+        poisoned.refresh_from_db()
+        self.assertEqual(poisoned.attempts, 2)
+        self.assertIsNotNone(poisoned.failed_at)
+        self.assertEqual(QueuedReading.objects.get(), poisoned)
+        self.assertEqual(ingest_queue.flush(), 0)
+        self.assertEqual((ingest_queue.stats()["depth"], ingest_queue.stats()["failed"]), (0, 1))
+
+        with self.assertLogs('stations.ingest', level='ERROR'):
+            call_command("process_ingest_queue", "--once", "--requeue-failed", stdout=StringIO())
+
+        poisoned.refresh_from_db()
+        self.assertEqual(poisoned.attempts, 5)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 3)
+
+    def test_memory_queue(self):
+        """Test that the in-memory queue stores readings in batches and rejects whole batches that do not fit"""
+        ingest_queue = MemoryIngestQueue(batch_size=2, flush_interval=1, max_size=3, autostart=False)
+        ingest_queue.enqueue("bulgarian_meteo_pro.bulgarianmeteoprodata", "bulgarianmeteoprodata", self.payloads)
+
+        with self.assertRaises(IngestQueueFull):
+            ingest_queue.enqueue("bulgarian_meteo_pro.bulgarianmeteoprodata", "bulgarianmeteoprodata", self.payloads[:1])
+
+        self.assertEqual(ingest_queue.flush(), 2)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 2)
+
+        with self.assertRaises(IngestQueueFull):
+            ingest_queue.enqueue("bulgarian_meteo_pro.bulgarianmeteoprodata", "bulgarianmeteoprodata", self.payloads)
+        self.assertEqual(ingest_queue.stats()["depth"], 1)
+
+        ingest_queue.drain()
+        self.assertEqual(
+            ingest_queue.stats(),
+            {"durable": False, "depth": 0, "enqueued": 3, "stored": 3, "failed": 0}
+        )
+        self.assertEqual(Station.objects.count(), 3)
+
+    def test_memory_queue_loses_only_failing_readings(self):
+        """Test that a failing batch of the in-memory queue is stored one by one and duplicates are not counted"""
+        ingest_queue = MemoryIngestQueue(batch_size=10, flush_interval=1, max_size=10, autostart=False)
+        ingest_queue.enqueue("bulgarian_meteo_pro.bulgarianmeteoprodata", "bulgarianmeteoprodata", self.payloads[:1])
+        ingest_queue.drain()
+
+        ingest_queue.enqueue("bulgarian_meteo_pro.bulgarianmeteoprodata", "bulgarianmeteoprodata", self.payloads)
+        ingest_queue.enqueue("bulgarian_meteo_pro.removedmodel", "removedmodel", self.payloads[:1])
+        with self.assertLogs('stations.ingest', level='ERROR'):
+            self.assertEqual(ingest_queue.flush(), 4)
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 3)
+        self.assertEqual(
+            ingest_queue.stats(),
+            {"durable": False, "depth": 0, "enqueued": 5, "stored": 3, "failed": 1}
+        )
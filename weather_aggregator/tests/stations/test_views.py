@@ -1,21 +1,46 @@
+import json
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
 from django.shortcuts import resolve_url
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
+from stations.benchmarks import compare_to_baseline
+from stations.cache import city_weather_cache
+from stations.metrics import metrics
+from stations.parsers import ORJSONParser
+from stations.renderers import ORJSONRenderer
 from django.contrib.contenttypes.models import ContentType
 from bulgarian_meteo_pro.models import BulgarianMeteoProData
-from stations.models import Station
+from bulgarian_meteo_pro.serializers import BulgarianMeteoProDataSerializer
+from stations.models import NormalizedReading, Station
 from weather_master_x.models import WeatherMasterX
+from weather_master_x.serializers import WeatherMasterXSerializer
+from tests.stations.utils import bulgarian_meteo_pro_payload, create_history_readings, weather_master_x_payload
+
 
 class GetAggregatedWeatherDataTestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
+        city_weather_cache.clear()
 
         # Set up a sample weather station of type "BulgarianMeteoProData"
         self.bulgarian_content_type = ContentType.objects.get_for_model(BulgarianMeteoProData)
         self.bulgarian_station_data = BulgarianMeteoProData.objects.create(
             station_id="BG-001",
             city="Sofia",
+            city_key="sofia",
             latitude=42.6977,
             longitude=23.3219,
             temperature_celsius=21.0,
@@ -28,9 +53,12 @@ class GetAggregatedWeatherDataTestCase(TestCase):
 
         Station.objects.create(
             station_type="BulgarianMeteoProData",
+            station_identifier="BG-001",
             city="Sofia",
+            city_key="sofia",
             content_type=self.bulgarian_content_type,
             object_id=self.bulgarian_station_data.id,
+            recorded_at=self.bulgarian_station_data.timestamp,
             is_active=True
         )
 
@@ -39,6 +67,7 @@ class GetAggregatedWeatherDataTestCase(TestCase):
         self.weather_master_data = WeatherMasterX.objects.create(
             station_identifier="WX-1234",
             city_name="Sofia",
+            city_key="sofia",
             lat=42.1354,
             lon=24.7453,
             temp_fahrenheit=75.2,
@@ -53,9 +82,12 @@ class GetAggregatedWeatherDataTestCase(TestCase):
 
         Station.objects.create(
             station_type="WeatherMasterX",
+            station_identifier="WX-1234",
             city="Sofia",
+            city_key="sofia",
             content_type=self.weather_master_content_type,
             object_id=self.weather_master_data.id,
+            recorded_at=self.weather_master_data.recorded_at,
             is_active=True
         )
 
@@ -69,6 +101,35 @@ class GetAggregatedWeatherDataTestCase(TestCase):
         self.assertIn("temperature_celsius", response.data[0])
         self.assertIn("humidity_percent", response.data[0])
 
+    def test_normalized_data_matches_serializers(self):
+        """Test that the normalizers produce the same records as the serializers, with one query per provider"""
+        self.bulgarian_station_data.refresh_from_db()
+        self.weather_master_data.refresh_from_db()
+        expected = [
+            BulgarianMeteoProDataSerializer(self.bulgarian_station_data).data,
+            WeatherMasterXSerializer(self.weather_master_data).data,
+        ]
+
+        with self.assertNumQueries(3):
+            aggregated_data = Station.objects.get_aggregated_weather_data('sofia')
+
+        self.assertEqual(aggregated_data, expected)
+
+    def test_read_path_fetches_only_needed_columns(self):
+        """Test that normalized reads skip `raw_data` and raw reads fetch only `raw_data`"""
+        with CaptureQueriesContext(connection) as normalized_queries:
+            Station.objects.get_aggregated_weather_data('Sofia')
+        with CaptureQueriesContext(connection) as raw_queries:
+            Station.objects.get_aggregated_weather_data('Sofia', return_raw_data=True)
+
+        provider_tables = ('bulgarian_meteo_pro_', 'weather_master_x_')
+        normalized_sql = [query['sql'] for query in normalized_queries if 'FROM "stations_station"' not in query['sql']]
+        raw_sql = [query['sql'] for query in raw_queries if 'FROM "stations_station"' not in query['sql']]
+
+        self.assertEqual(len(normalized_sql), len(provider_tables))
+        self.assertTrue(all('"raw_data"' not in sql for sql in normalized_sql))
+        self.assertTrue(all('"raw_data"' in sql and '"humidity_percent"' not in sql for sql in raw_sql))
+
     def test_get_aggregated_weather_data_raw(self):
         """Test getting aggregated weather data in raw format"""
         response = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"raw": "true"})
@@ -87,3 +148,617 @@ class GetAggregatedWeatherDataTestCase(TestCase):
         self.assertEqual(response.data, {"message": "No weather stations found for the specified city."})
 
 
+
+class StationLatestReadingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city_weather_cache.clear()
+        self.payload = bulgarian_meteo_pro_payload()
+
+    def post_reading(self, **overrides):
+        response = self.client.post(
+            resolve_url('create_weather_data_bulgarian_meteo_pro'),
+            data={**self.payload, **overrides},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_station_points_at_latest_reading(self):
+        """Test that repeated readings of a station keep a single Station pointing at the newest one"""
+        self.post_reading()
+        self.post_reading(timestamp="2024-09-27T12:00:00Z", temperature_celsius=25.0)
+        self.post_reading(timestamp="2024-09-27T11:00:00Z", temperature_celsius=23.0, station_status="inactive")
+
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 3)
+        self.assertEqual(Station.objects.count(), 1)
+
+        station = Station.objects.get()
+        latest_reading = BulgarianMeteoProData.objects.get(timestamp="2024-09-27T12:00:00Z")
+        self.assertEqual(station.station_identifier, "BG-001")
+        self.assertEqual(station.object_id, latest_reading.id)
+        self.assertEqual(station.recorded_at, latest_reading.timestamp)
+        self.assertTrue(station.is_active)
+
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='sofia'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["temperature_celsius"], latest_reading.temperature_celsius)
+
+    def test_city_lookup_ignores_case_accents_and_spacing(self):
+        """Test that city spellings are matched through their canonical city key"""
+        self.post_reading(city="  Sofía ")
+
+        station = Station.objects.get()
+        self.assertEqual(station.city_key, "sofia")
+        self.assertEqual(BulgarianMeteoProData.objects.get().city_key, "sofia")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(resolve_url('get_city_weather_data', city_name='SOFIA'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertNotIn("UPPER", queries.captured_queries[0]["sql"])
+
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='sofia'), {"limit": 10})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_city_weather_is_cached_until_ingest(self):
+        """Test that city responses are served from the cache until a new reading of the city lands"""
+        self.post_reading()
+        url = resolve_url('get_city_weather_data', city_name='Sofia')
+        stats = city_weather_cache.stats()
+
+        first_response = self.client.get(url)
+        with self.assertNumQueries(0):
+            second_response = self.client.get(url)
+
+        self.assertEqual(first_response["X-Cache"], "MISS")
+        self.assertEqual(second_response["X-Cache"], "HIT")
+        self.assertEqual(first_response.data, second_response.data)
+        self.assertEqual(city_weather_cache.stats()["hits"], stats["hits"] + 1)
+        self.assertEqual(city_weather_cache.stats()["misses"], stats["misses"] + 1)
+
+        self.post_reading(timestamp="2024-09-27T12:00:00Z", temperature_celsius=25.0)
+        response = self.client.get(url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(float(response.data[0]["temperature_celsius"]), 25.0)
+
+    def test_batch_keeps_latest_reading_per_station(self):
+        """Test that a batch with several readings of the same station creates one Station"""
+        response = self.client.post(
+            resolve_url('bulk_create_weather_data_bulgarian_meteo_pro'),
+            data=[
+                {**self.payload, "timestamp": "2024-09-27T12:00:00Z"},
+                {**self.payload, "timestamp": "2024-09-27T11:00:00Z"},
+                {**self.payload, "station_id": "BG-002"},
+            ],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Station.objects.count(), 2)
+        station = Station.objects.get(station_identifier="BG-001")
+        self.assertEqual(station.latest_reading.timestamp.hour, 12)
+
+
+
+@override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True)
+class NormalizedReadingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_city_weather_data', city_name='Sofia')
+        city_weather_cache.clear()
+        create_history_readings()
+
+    @staticmethod
+    def summary(readings):
+        return [(reading["station_id"], reading["timestamp"], round(reading["temperature_celsius"], 6)) for reading in readings]
+
+    def test_readings_are_stored_on_ingest(self):
+        """Test that every ingested reading gets its normalized row, with the temperature in Celsius"""
+        self.assertEqual(NormalizedReading.objects.count(), 9)
+        reading = NormalizedReading.objects.filter(provider="weathermasterx").first()
+        self.assertAlmostEqual(reading.temperature_celsius, 24.0)
+        self.assertEqual(reading.pressure_hpa, 1012.3)
+
+    def test_latest_readings_in_one_query(self):
+        """Test that the latest readings of a city are read with a single query and match the provider tables"""
+        with self.assertNumQueries(1):
+            latest = Station.objects.get_aggregated_weather_data("Sofia")
+
+        with override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=False):
+            expected = Station.objects.get_aggregated_weather_data("Sofia")
+
+        self.assertEqual(sorted(self.summary(latest)), sorted(self.summary(expected)))
+        self.assertEqual(set(latest[0]), set(expected[0]))
+
+    def test_history_matches_provider_tables(self):
+        """Test that paging through the normalized history returns the readings of the provider tables"""
+        def history():
+            readings = []
+            url, params = self.url, {"limit": 4}
+            while url:
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                readings.extend(response.data["results"])
+                url, params = response.data["next"], None
+            return readings
+
+        normalized = history()
+        with override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=False):
+            expected = history()
+
+        self.assertEqual(len(normalized), 9)
+        self.assertEqual(self.summary(normalized), self.summary(expected))
+
+    def test_raw_readings_come_from_provider_tables(self):
+        """Test that raw payloads are still read from the provider tables"""
+        response = self.client.get(self.url, {"raw": "true", "limit": 100})
+
+        self.assertEqual([reading["hour"] for reading in response.data["results"]], [0, 0, 2, 3, 4, 6, 6, 8, 9])
+
+    def test_rebuild_normalized_readings(self):
+        """Test that the backfill command recreates the normalized rows of every reading"""
+        NormalizedReading.objects.all().delete()
+
+        call_command("rebuild_normalized_readings", stdout=StringIO())
+
+        self.assertEqual(NormalizedReading.objects.count(), 9)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(Station.objects.get_aggregated_weather_data("Sofia")), 2)
+
+
+
+class SpatialStationsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city_weather_cache.clear()
+        locations = [
+            ("BG-SOF", "Sofia", 42.6977, 23.3219),
+            ("BG-PER", "Pernik", 42.6052, 23.0378),
+            ("BG-PLO", "Plovdiv", 42.1354, 24.7453),
+            ("BG-VAR", "Varna", 43.2141, 27.9147),
+        ]
+        response = self.client.post(
+            resolve_url('bulk_create_weather_data_bulgarian_meteo_pro'),
+            data=[
+                bulgarian_meteo_pro_payload(station_id=station_id, city=city, latitude=latitude, longitude=longitude)
+                for station_id, city, latitude, longitude in locations
+            ],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_stations_store_location_and_grid_cell(self):
+        """Test that ingest copies the coordinates of the latest reading and its grid cell to the Station"""
+        station = Station.objects.get(station_identifier="BG-SOF")
+
+        self.assertEqual((station.latitude, station.longitude), (42.6977, 23.3219))
+        self.assertEqual((station.cell_lat, station.cell_lon), (426, 233))
+
+    def test_nearby_stations_nearest_first(self):
+        """Test that the nearby lookup returns the stations within the radius ordered by distance"""
+        response = self.client.get(resolve_url('get_nearby_stations'), {"lat": 42.7, "lon": 23.32, "radius_km": 50})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([station["station_identifier"] for station in results], ["BG-SOF", "BG-PER"])
+        self.assertLess(results[0]["distance_km"], 1)
+        self.assertAlmostEqual(results[1]["distance_km"], 25.1, delta=0.5)
+
+        response = self.client.get(
+            resolve_url('get_nearby_stations'), {"lat": 42.7, "lon": 23.32, "radius_km": 500, "limit": 3}
+        )
+        self.assertEqual(
+            [station["station_identifier"] for station in response.data["results"]], ["BG-SOF", "BG-PER", "BG-PLO"]
+        )
+
+    def test_stations_in_bounding_box(self):
+        """Test that the bounding box lookup returns only the stations inside the box"""
+        response = self.client.get(
+            resolve_url('get_stations_in_bounding_box'),
+            {"min_lat": 42.0, "min_lon": 23.1, "max_lat": 43.0, "max_lon": 25.0}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(station["station_identifier"] for station in response.data["results"]), ["BG-PLO", "BG-SOF"]
+        )
+
+    def test_spatial_lookups_invalid_params(self):
+        """Test that out of range coordinates and inverted boxes are rejected"""
+        response = self.client.get(resolve_url('get_nearby_stations'), {"lat": 95, "lon": 23.32})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            resolve_url('get_stations_in_bounding_box'),
+            {"min_lat": 43.0, "min_lon": 23.1, "max_lat": 42.0, "max_lon": 25.0}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("max_lat", response.data)
+
+    def test_backfill_station_locations(self):
+        """Test that the backfill command sets the location of stations stored before the spatial fields"""
+        Station.objects.update(latitude=None, longitude=None, cell_lat=None, cell_lon=None)
+
+        call_command("backfill_station_locations", stdout=StringIO())
+
+        station = Station.objects.get(station_identifier="BG-VAR")
+        self.assertEqual((station.latitude, station.longitude), (43.2141, 27.9147))
+        self.assertEqual((station.cell_lat, station.cell_lon), (432, 279))
+
+
+
+class BenchmarkCommandsTestCase(TestCase):
+    def test_seed_weather_data(self):
+        """Test that the seed command stores the readings of both providers and their stations"""
+        call_command("seed_weather_data", "--stations", "2", "--readings", "3", "--cities", "Sofia", stdout=StringIO())
+
+        self.assertEqual(WeatherMasterX.objects.count(), 6)
+        self.assertEqual(BulgarianMeteoProData.objects.count(), 6)
+        self.assertEqual(Station.objects.filter(city_key="sofia").count(), 4)
+
+    def test_benchmark_api_stores_and_compares_baseline(self):
+        """Test that the benchmark suite stores a baseline per database and reports regressions against it"""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = Path(directory) / "baseline.json"
+            options = ["--stations", "1", "--readings", "5", "--repeat", "2", "--batch-size", "2", "--baseline", str(baseline_path)]
+
+            call_command("benchmark_api", *options, "--save-baseline", stdout=StringIO())
+            baseline = json.loads(baseline_path.read_text())[connection.vendor]
+
+            output = StringIO()
+            call_command("benchmark_api", *options, "--tolerance", "1000", stdout=output)
+
+        self.assertEqual(Station.objects.count(), 0)
+        self.assertEqual(set(baseline["results"]), {
+            "post_single_weathermasterx", "post_batch_weathermasterx",
+            "post_single_bulgarianmeteoprodata", "post_batch_bulgarianmeteoprodata",
+            "city_normalized", "city_raw", "city_history_page", "city_statistics", "cities_normalized", "stations_nearby",
+        })
+        self.assertIn("No regressions", output.getvalue())
+
+        regressed = {**baseline["results"]["city_raw"], "queries": baseline["results"]["city_raw"]["queries"] + 1}
+        self.assertEqual(
+            compare_to_baseline({"city_raw": regressed}, baseline["results"], tolerance=0.25),
+            [f"city_raw: queries {regressed['queries']} > {baseline['results']['city_raw']['queries']}"]
+        )
+
+
+    def test_benchmark_json_renderers(self):
+        """Test that the JSON benchmark compares both renderers on identical output and rolls its city back"""
+        output = StringIO()
+        call_command("benchmark_json_renderers", "--stations", "1", "--readings", "5", "--repeat", "1", stdout=output)
+
+        self.assertEqual(Station.objects.count(), 0)
+        self.assertEqual(output.getvalue().count(" yes\n"), 4)
+
+
+
+@override_settings(WEATHER_METRICS_TOKEN="metrics-token")
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city_weather_cache.clear()
+        metrics.clear()
+        self.payload = bulgarian_meteo_pro_payload()
+
+    def scrape(self):
+        response = self.client.get(resolve_url('metrics'), HTTP_AUTHORIZATION="Bearer metrics-token")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return dict(line.rsplit(" ", 1) for line in response.content.decode().splitlines() if not line.startswith("#"))
+
+    def test_metrics_per_view_and_provider(self):
+        """Test that requests are counted per URL name and provider with their queries and render time"""
+        self.client.post(resolve_url('create_weather_data_bulgarian_meteo_pro'), data=self.payload, format='json')
+        self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'))
+
+        samples = self.scrape()
+
+        create_labels = 'view="create_weather_data_bulgarian_meteo_pro",provider="bulgarianmeteoprodata"'
+        read_labels = 'view="get_city_weather_data",provider="all"'
+        self.assertEqual(samples[f'weather_http_requests_total{{{create_labels},status="201"}}'], "1")
+        self.assertEqual(samples[f'weather_http_requests_total{{{read_labels},status="200"}}'], "1")
+        self.assertEqual(samples[f'weather_http_request_duration_seconds_count{{{read_labels}}}'], "1")
+        self.assertEqual(samples[f'weather_http_request_duration_seconds_bucket{{{read_labels},le="+Inf"}}'], "1")
+        self.assertEqual(samples[f'weather_serialization_duration_seconds_count{{{read_labels}}}'], "1")
+        self.assertGreater(int(samples[f'weather_db_queries_total{{{create_labels}}}']), 0)
+        self.assertGreater(int(samples[f'weather_db_queries_total{{{read_labels}}}']), 0)
+        self.assertGreater(float(samples[f'weather_http_response_size_bytes_sum{{{read_labels}}}']), 0)
+
+    def test_metrics_expose_city_cache_counters(self):
+        """Test that the hits and misses of the city weather cache are exported as counters"""
+        self.client.post(resolve_url('create_weather_data_bulgarian_meteo_pro'), data=self.payload, format='json')
+        before = self.scrape()
+
+        self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'))
+        self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'))
+        after = self.scrape()
+
+        for name in ("weather_city_cache_hits_total", "weather_city_cache_misses_total"):
+            self.assertEqual(int(after[name]) - int(before[name]), 1)
+
+    def test_metrics_require_staff_or_token(self):
+        """Test that anonymous requests and wrong tokens are denied, and staff users may read the metrics"""
+        response = self.client.get(resolve_url('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn(b"weather_", response.content)
+
+        response = self.client.get(resolve_url('metrics'), HTTP_AUTHORIZATION="Bearer wrong-token")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with override_settings(WEATHER_METRICS_TOKEN=""):
+            response = self.client.get(resolve_url('metrics'), HTTP_AUTHORIZATION="Bearer ")
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_login(User.objects.create_user("operator", is_staff=True))
+        self.assertEqual(self.client.get(resolve_url('metrics')).status_code, status.HTTP_200_OK)
+
+    @override_settings(WEATHER_METRICS_ENABLED=False)
+    def test_metrics_disabled(self):
+        """Test that nothing is recorded or exposed when the metrics are disabled"""
+        self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'))
+
+        self.assertEqual(self.client.get(resolve_url('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("get_city_weather_data", metrics.render())
+
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        city_weather_cache.clear()
+        metrics.clear()
+        self.payload = bulgarian_meteo_pro_payload()
+        self.weather_master_x_payload = weather_master_x_payload()
+
+    async def test_async_create_and_read(self):
+        """Test that the async views store readings with their stations and read them back like the sync views"""
+        response = await self.async_client.post(
+            resolve_url('acreate_weather_data_bulgarian_meteo_pro'), self.payload, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["station_id"], "BG-001")
+
+        response = await self.async_client.post(
+            resolve_url('abulk_create_weather_data_weather_master_x'),
+            [self.weather_master_x_payload, {**self.weather_master_x_payload, "recorded_at": "not a date"}],
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(response.json()["errors"][0]["index"], 1)
+
+        self.assertEqual(await Station.objects.acount(), 2)
+
+        async_response = await self.async_client.get(resolve_url('aget_city_weather_data', city_name='sofia'))
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response["X-Cache"], "MISS")
+
+        await city_weather_cache.cache.aclear()
+        sync_response = await self.async_client.get(resolve_url('get_city_weather_data', city_name='sofia'))
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        raw_response = await self.async_client.get(resolve_url('aget_city_weather_data', city_name='sofia'), {"raw": "true"})
+        self.assertEqual(
+            sorted(raw_response.json(), key=lambda reading: reading.get("station_id") or reading["station_identifier"]),
+            [self.payload, self.weather_master_x_payload]
+        )
+
+    async def test_async_views_reject_invalid_requests(self):
+        """Test that the async views answer invalid bodies and unknown cities like the sync views"""
+        response = await self.async_client.post(
+            resolve_url('acreate_weather_data_bulgarian_meteo_pro'), "{", content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.post(
+            resolve_url('abulk_create_weather_data_bulgarian_meteo_pro'), [], content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.get(resolve_url('aget_city_weather_data', city_name='Atlantis'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_views_are_measured(self):
+        """Test that the metrics middleware records the queries of the async views"""
+        await self.async_client.post(
+            resolve_url('acreate_weather_data_bulgarian_meteo_pro'), self.payload, content_type='application/json'
+        )
+
+        rendered = metrics.render()
+        labels = 'view="acreate_weather_data_bulgarian_meteo_pro",provider="bulgarianmeteoprodata"'
+        self.assertIn(f'weather_http_requests_total{{{labels},status="201"}} 1', rendered)
+        queries = next(line for line in rendered.splitlines() if line.startswith(f'weather_db_queries_total{{{labels}}}'))
+        self.assertGreater(int(queries.rsplit(" ", 1)[1]), 0)
+
+
+
+class CompactRawDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        city_weather_cache.clear()
+        self.payload = bulgarian_meteo_pro_payload(
+            temperature_celsius=21,  # stored as 21.00 and rebuilt as 21.0, so it stays in the payload
+            firmware="1.4.2"
+        )
+        self.weather_master_x_payload = weather_master_x_payload(recorded_at="2024-09-27T11:00:00+00:00")
+
+    def post_readings(self):
+        for url_name, payload in (
+            ('create_weather_data_bulgarian_meteo_pro', self.payload),
+            ('create_weather_data_weather_master_x', self.weather_master_x_payload),
+        ):
+            response = self.client.post(resolve_url(url_name), data=payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def assert_raw_reads_return_payloads(self):
+        expected = [self.payload, self.weather_master_x_payload]
+        sort_key = lambda reading: reading.get("station_id") or reading["station_identifier"]
+
+        city_weather_cache.clear()
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"raw": "true"})
+        self.assertEqual(sorted(response.json(), key=sort_key), expected)
+
+        response = self.client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"raw": "true", "limit": 10})
+        self.assertEqual(json.loads(json.dumps(response.data["results"])), expected)
+
+    @override_settings(WEATHER_COMPACT_RAW_DATA=True)
+    def test_compact_raw_data_keeps_what_columns_cannot_rebuild(self):
+        """Test that compact raw data only stores the values the typed columns do not rebuild, and reads rebuild the payload"""
+        self.post_readings()
+
+        self.assertEqual(
+            BulgarianMeteoProData.objects.get().raw_data,
+            {"temperature_celsius": 21, "firmware": "1.4.2", "$compact": []}
+        )
+        self.assertEqual(
+            WeatherMasterX.objects.get().raw_data,
+            {"recorded_at": "2024-09-27T11:00:00+00:00", "$compact": []}
+        )
+        self.assert_raw_reads_return_payloads()
+
+    def test_compact_raw_data_command(self):
+        """Test that the command reports the sizes and rewrites stored payloads without changing raw reads"""
+        self.post_readings()
+        self.assertEqual(BulgarianMeteoProData.objects.get().raw_data, self.payload)
+
+        with self.assertRaises(CommandError):
+            call_command("compact_raw_data", "--apply", stdout=StringIO())
+
+        out = StringIO()
+        with override_settings(WEATHER_COMPACT_RAW_DATA=True):
+            call_command("compact_raw_data", "--apply", "--batch-size", "1", stdout=out)
+            self.assertIn("$compact", WeatherMasterX.objects.get().raw_data)
+            self.assert_raw_reads_return_payloads()
+
+        self.assertIn("bulgarianmeteoprodata", out.getvalue())
+        self.assertIn("rewrote 1 readings in compact form", out.getvalue())
+
+        call_command("compact_raw_data", "--expand", stdout=StringIO())
+        self.assertEqual(WeatherMasterX.objects.get().raw_data, self.weather_master_x_payload)
+        self.assert_raw_reads_return_payloads()
+
+
+
+class GetCitiesWeatherDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('get_cities_weather_data')
+        city_weather_cache.clear()
+
+        for number, city in enumerate(("Sofia", "Plovdiv", "Varna")):
+            response = self.client.post(resolve_url('create_weather_data_bulgarian_meteo_pro'), data=bulgarian_meteo_pro_payload(
+                station_id=f"BG-{number}", city=city, timestamp=f"2024-09-2{number}T10:00:00Z"
+            ), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            response = self.client.post(resolve_url('create_weather_data_weather_master_x'), data=weather_master_x_payload(
+                city, station_identifier=f"WX-{number}", recorded_at=f"2024-09-2{number}T11:00:00Z"
+            ), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_cities_grouped_like_the_city_endpoint(self):
+        """Test that every city gets the records of the single city endpoint, with the same number of queries for any number of cities"""
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"cities": ["Sofia"]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"cities": ["varna", "Sofia", "Plovdiv", "Ruse"]})
+
+        self.assertEqual(list(response.data), ["varna", "Sofia", "Plovdiv", "Ruse"])
+        self.assertEqual(response.data["Ruse"], [])
+        for city in ("varna", "Sofia", "Plovdiv"):
+            city_response = self.client.get(resolve_url('get_city_weather_data', city_name=city))
+            self.assertEqual(response.data[city], city_response.data)
+
+        response = self.client.get(self.url, {"cities": ["Sofia"], "raw": "true"})
+        self.assertEqual(
+            sorted(reading.get("station_id") or reading["station_identifier"] for reading in response.data["Sofia"]),
+            ["BG-0", "WX-0"]
+        )
+
+    def test_cities_filtered_by_provider_and_time(self):
+        """Test restricting the stations to providers and to latest readings within a time window, in a JSON body"""
+        response = self.client.post(self.url, {
+            "cities": ["Sofia", "Plovdiv", "Varna"],
+            "providers": ["WeatherMasterX"],
+            "since": "2024-09-21T00:00:00Z",
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {city: [reading["station_id"] for reading in readings] for city, readings in response.data.items()},
+            {"Sofia": [], "Plovdiv": ["WX-1"], "Varna": ["WX-2"]}
+        )
+
+    @override_settings(WEATHER_NORMALIZED_READINGS_ENABLED=True)
+    def test_cities_from_normalized_readings(self):
+        """Test that normalized readings of all the cities are read with a single query"""
+        NormalizedReading.objects.rebuild()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"cities": ["Sofia", "Varna"], "providers": ["bulgarianmeteoprodata"]})
+
+        self.assertEqual(
+            {city: [reading["station_id"] for reading in readings] for city, readings in response.data.items()},
+            {"Sofia": ["BG-0"], "Varna": ["BG-2"]}
+        )
+
+    def test_cities_invalid_query(self):
+        """Test that missing cities, too many cities and unknown providers are rejected"""
+        for params in ({}, {"cities": [f"City {number}" for number in range(201)]}, {"cities": ["Sofia"], "providers": ["other"]}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class ORJSONTestCase(TestCase):
+    def setUp(self):
+        self.data = {
+            "temperature_celsius": Decimal("21.50"),
+            "timestamp": datetime(2024, 9, 27, 10, 15, 30, 123456, tzinfo=dt_timezone.utc),
+            "local_time": datetime(2024, 9, 27, 13, 15, tzinfo=dt_timezone(timedelta(hours=3))),
+            "day": datetime(2024, 9, 27).date(),
+            "city": "София\u2028",
+            "message": gettext_lazy("Not found."),
+            "readings": [1, 2.5, None, True],
+            1: "integer key",
+        }
+
+    def test_renderer_matches_stock_renderer(self):
+        """Test that the orjson renderer renders the same bytes as DRF's renderer, and defers indenting to it"""
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, "application/json; indent=4"),
+            JSONRenderer().render(self.data, "application/json; indent=4")
+        )
+
+    def test_parser_matches_stock_parser(self):
+        """Test that the orjson parser parses like DRF's parser and rejects invalid JSON and NaN"""
+        body = '{"city": "София", "readings": [1, 2.5, null, true]}'.encode()
+        context = {'encoding': 'utf-8'}
+
+        self.assertEqual(
+            ORJSONParser().parse(BytesIO(body), parser_context=context),
+            JSONParser().parse(BytesIO(body), parser_context=context)
+        )
+        for invalid in (b'{"city": ', b'{"temperature": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(invalid), parser_context=context)
+
+    def test_views_render_decimals_and_datetimes(self):
+        """Test that the views answer with the orjson renderer in the documented format"""
+        client = APIClient()
+        client.post(
+            resolve_url('create_weather_data_bulgarian_meteo_pro'), bulgarian_meteo_pro_payload(temperature_celsius=21.5),
+            format='json'
+        )
+
+        response = client.get(resolve_url('get_city_weather_data', city_name='Sofia'), {"limit": 10})
+
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertIn(b'"temperature_celsius":21.5,', response.content)
+        self.assertIn(b'"timestamp":"2024-09-27T10:00:00Z"', response.content)
@@ -0,0 +1,82 @@
+from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from bulgarian_meteo_pro.serializers import BulgarianMeteoProDataSerializer
+from stations.models import Station
+from weather_master_x.models import WeatherMasterX
+from weather_master_x.serializers import WeatherMasterXSerializer
+
+
+def bulgarian_meteo_pro_payload(**overrides):
+    """Returns the payload of a BulgarianMeteoPro reading of BG-001 in Sofia, with the given fields replaced"""
+    return {
+        "station_id": "BG-001",
+        "city": "Sofia",
+        "latitude": 42.6977,
+        "longitude": 23.3219,
+        "timestamp": "2024-09-27T10:00:00Z",
+        "temperature_celsius": 21.0,
+        "humidity_percent": 60.0,
+        "wind_speed_kph": 10.0,
+        "station_status": "active",
+        **overrides
+    }
+
+
+def weather_master_x_payload(city_name="Sofia", **overrides):
+    """Returns the payload of a WeatherMasterX reading of WX-1234 in Sofia, with the given fields replaced"""
+    return {
+        "station_identifier": "WX-1234",
+        "location": {"city_name": city_name, "coordinates": {"lat": 42.7, "lon": 23.32}},
+        "recorded_at": "2024-09-27T11:00:00Z",
+        "readings": {
+            "temp_fahrenheit": 70.0, "humidity_percent": 55.0, "pressure_hpa": 1012.0, "uv_index": 4, "rain_mm": 0.0
+        },
+        "operational_status": "operational",
+        **overrides
+    }
+
+
+def create_history_readings():
+    """Stores readings of BG-001 every two hours and of WX-1234 every three hours of 2024-09-27 in Sofia"""
+    bulgarian_readings = [
+        BulgarianMeteoProData(
+            station_id="BG-001",
+            city="Sofia",
+            city_key="sofia",
+            latitude=42.6977,
+            longitude=23.3219,
+            temperature_celsius=20 + hour,
+            humidity_percent=60.0,
+            wind_speed_kph=10.0,
+            station_status="active",
+            timestamp=f"2024-09-27T{hour:02d}:00:00Z",
+            raw_data={"hour": hour}
+        )
+        for hour in range(0, 10, 2)
+    ]
+    weather_master_readings = [
+        WeatherMasterX(
+            station_identifier="WX-1234",
+            city_name="Sofia",
+            city_key="sofia",
+            lat=42.1354,
+            lon=24.7453,
+            temp_fahrenheit=75.2,
+            humidity_percent=58.0,
+            pressure_hpa=1012.3,
+            uv_index=4,
+            rain_mm=1.2,
+            operational_status="operational",
+            recorded_at=f"2024-09-27T{hour:02d}:00:00Z",
+            raw_data={"hour": hour}
+        )
+        for hour in range(0, 10, 3)
+    ]
+    BulgarianMeteoProData.objects.bulk_create(bulgarian_readings)
+    WeatherMasterX.objects.bulk_create(weather_master_readings)
+    readings = (
+        [(reading, BulgarianMeteoProDataSerializer().get_station_data(reading))
+         for reading in BulgarianMeteoProData.objects.all()] +
+        [(reading, WeatherMasterXSerializer().get_station_data(reading))
+         for reading in WeatherMasterX.objects.all()]
+    )
+    Station.objects.record_readings("weather", readings)
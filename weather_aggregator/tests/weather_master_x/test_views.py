@@ -1,3 +1,4 @@
+import json
 from django.shortcuts import resolve_url
 from django.test import TestCase
 from rest_framework import status
@@ -65,6 +66,9 @@ class CreateWeatherMasterXDataTestCase(TestCase):
         self.assertEqual(station.station_type, "weathermasterx")
         self.assertEqual(station.is_active, True)
 
+        # The flattened fields validation works with are not stored in the payload
+        self.assertEqual(WeatherMasterX.objects.get().raw_data, self.valid_payload)
+
     def test_create_weather_master_x_data_invalid_payload(self):
         """Test creating WeatherMasterX data with invalid payload"""
         response = self.client.post(
@@ -89,3 +93,65 @@ class CreateWeatherMasterXDataTestCase(TestCase):
         # Ensure no Station or WeatherMasterX objects are created
         self.assertEqual(WeatherMasterX.objects.count(), 0)
         self.assertEqual(Station.objects.count(), 0)
+
+
+class BulkCreateWeatherMasterXDataTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = resolve_url('bulk_create_weather_data_weather_master_x')
+        self.valid_payloads = [
+            {
+                "station_identifier": f"WX-{index}",
+                "location": {
+                    "city_name": "Plovdiv",
+                    "coordinates": {"lat": 42.1354, "lon": 24.7453}
+                },
+                "recorded_at": f"2024-09-27T10:{index:02d}:00Z",
+                "readings": {
+                    "temp_fahrenheit": 73.4,
+                    "humidity_percent": 58.0,
+                    "pressure_hpa": 1012.3,
+                    "uv_index": 5,
+                    "rain_mm": 0.0
+                },
+                "operational_status": "operational"
+            }
+            for index in range(3)
+        ]
+
+    def test_bulk_create_reports_invalid_items_by_index(self):
+        """Test that invalid items are reported without rejecting the valid ones"""
+        payloads = [*self.valid_payloads, {"station_identifier": "WX-BROKEN"}, "not-an-object"]
+
+        response = self.client.post(self.url, data=payloads, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [3, 4])
+        self.assertIn("recorded_at", response.data["errors"][0]["errors"])
+        self.assertEqual(WeatherMasterX.objects.count(), 3)
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(
+            set(Station.objects.values_list('object_id', flat=True)),
+            set(WeatherMasterX.objects.values_list('id', flat=True))
+        )
+
+    def test_bulk_create_accepts_ndjson(self):
+        """Test that a newline-delimited JSON body is accepted"""
+        body = "\n".join(json.dumps(payload) for payload in self.valid_payloads) + "\n"
+
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 3, "errors": []})
+        self.assertEqual(WeatherMasterX.objects.count(), 3)
+        self.assertEqual(Station.objects.filter(station_type="weathermasterx").count(), 3)
+
+    def test_bulk_create_without_valid_items(self):
+        """Test that a batch without a single valid item is rejected"""
+        response = self.client.post(self.url, data=[{"station_identifier": "WX-BROKEN"}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["created"], 0)
+        self.assertEqual(WeatherMasterX.objects.count(), 0)
+        self.assertEqual(Station.objects.count(), 0)
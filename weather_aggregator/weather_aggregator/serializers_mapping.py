@@ -1,6 +1,8 @@
 from bulgarian_meteo_pro.models import BulgarianMeteoProData
+from bulgarian_meteo_pro.normalizers import BulgarianMeteoProDataNormalizer
 from bulgarian_meteo_pro.serializers import BulgarianMeteoProDataSerializer
 from weather_master_x.models import WeatherMasterX
+from weather_master_x.normalizers import WeatherMasterXNormalizer
 from weather_master_x.serializers import WeatherMasterXSerializer
 
 SERIALIZER_MAPPING = {
@@ -8,6 +10,11 @@ SERIALIZER_MAPPING = {
     WeatherMasterX._meta.model_name.lower(): WeatherMasterXSerializer,
 }
 
+NORMALIZER_MAPPING = {
+    BulgarianMeteoProData._meta.model_name.lower(): BulgarianMeteoProDataNormalizer(),
+    WeatherMasterX._meta.model_name.lower(): WeatherMasterXNormalizer(),
+}
+
 class WeatherSerializerFactory:
     @staticmethod
     def get_serializer(station_instance):
@@ -18,3 +25,13 @@ class WeatherSerializerFactory:
             raise ValueError(f"Serializer for station type '{model_name}' not found")
 
         return serializer_class
+
+    @staticmethod
+    def get_normalizer(station_instance):
+        model_name = station_instance._meta.model_name.lower()
+        normalizer = NORMALIZER_MAPPING.get(model_name)
+
+        if not normalizer:
+            raise ValueError(f"Normalizer for station type '{model_name}' not found")
+
+        return normalizer
@@ -48,14 +48,22 @@ INSTALLED_APPS = [
     'weather_master_x',
 ]
 
+# The orjson-backed classes render and parse the same JSON as DRF's JSONRenderer and JSONParser, several times faster
+# on large responses, and fall back to them when orjson is not installed. Streams and async views follow the renderer.
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'stations.renderers.ORJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'stations.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
 MIDDLEWARE = [
+    'stations.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -101,6 +109,104 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# The `weather` alias holds the per-city aggregated weather data. LocMemCache evicts least recently used entries,
+# and CULL_FREQUENCY equal to MAX_ENTRIES makes it drop a single entry at a time. For a shared cache point
+# WEATHER_CACHE_BACKEND to `django.core.cache.backends.redis.RedisCache` and bound it with Redis' own
+# `maxmemory` and `maxmemory-policy allkeys-lru`.
+# LocMemCache is local to each process: ingest only invalidates the cache of the process that stored the readings, so
+# other web workers, and the cities changed by `process_ingest_queue`, `import_readings` or `apply_reading_retention`,
+# serve the cached data and ETag validator until WEATHER_CACHE_TIMEOUT. Use a shared backend with several processes.
+
+WEATHER_CACHE_ENABLED = os.getenv('WEATHER_CACHE_ENABLED', 'True') == 'True'
+WEATHER_CACHE_BACKEND = os.getenv('WEATHER_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', 1000))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'weather': {
+        'BACKEND': WEATHER_CACHE_BACKEND,
+        'LOCATION': os.getenv('WEATHER_CACHE_LOCATION', 'city-weather'),
+        'TIMEOUT': int(os.getenv('WEATHER_CACHE_TIMEOUT', 60)),
+    },
+    # Responses of ingest requests sent with an `Idempotency-Key`, replayed to retries of the same key.
+    # LocMemCache only sees the retries that reach the same process, use a shared backend with several workers.
+    'idempotency': {
+        'BACKEND': os.getenv('WEATHER_IDEMPOTENCY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('WEATHER_IDEMPOTENCY_CACHE_LOCATION', 'idempotency-keys'),
+        'TIMEOUT': int(os.getenv('WEATHER_IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)),
+    },
+}
+
+if WEATHER_CACHE_BACKEND == 'django.core.cache.backends.locmem.LocMemCache':
+    CACHES['weather']['OPTIONS'] = {
+        'MAX_ENTRIES': WEATHER_CACHE_MAX_ENTRIES,
+        'CULL_FREQUENCY': WEATHER_CACHE_MAX_ENTRIES,
+    }
+
+
+# Normalized readings
+# Stores the normalized fields of every reading in `stations.NormalizedReading` on ingest, so normalized reads
+# are a single indexed query instead of one query per provider. Run `manage.py rebuild_normalized_readings`
+# after enabling it on a database that already holds readings.
+
+WEATHER_NORMALIZED_READINGS_ENABLED = os.getenv('WEATHER_NORMALIZED_READINGS_ENABLED', 'False') == 'True'
+
+
+# Ingest queue
+# When enabled, the provider create views validate a reading, queue it and answer 202 right away, and a worker stores
+# the queued readings in batches of WEATHER_INGEST_QUEUE_BATCH_SIZE, at least every WEATHER_INGEST_QUEUE_FLUSH_INTERVAL seconds.
+# The in-memory queue is drained by a thread of the web process and loses queued readings if the process dies.
+# The durable queue is the `stations.QueuedReading` table, drained by `manage.py process_ingest_queue`. A queued reading
+# that fails to store is retried, and kept in the table with `failed_at` set after WEATHER_INGEST_QUEUE_MAX_ATTEMPTS.
+
+WEATHER_INGEST_QUEUE_ENABLED = os.getenv('WEATHER_INGEST_QUEUE_ENABLED', 'False') == 'True'
+WEATHER_INGEST_QUEUE_DURABLE = os.getenv('WEATHER_INGEST_QUEUE_DURABLE', 'True') == 'True'
+WEATHER_INGEST_QUEUE_BATCH_SIZE = int(os.getenv('WEATHER_INGEST_QUEUE_BATCH_SIZE', 1000))
+WEATHER_INGEST_QUEUE_FLUSH_INTERVAL = float(os.getenv('WEATHER_INGEST_QUEUE_FLUSH_INTERVAL', 1.0))
+WEATHER_INGEST_QUEUE_MAX_SIZE = int(os.getenv('WEATHER_INGEST_QUEUE_MAX_SIZE', 100000))
+WEATHER_INGEST_QUEUE_MAX_ATTEMPTS = int(os.getenv('WEATHER_INGEST_QUEUE_MAX_ATTEMPTS', 5))
+
+
+# Partitioning and retention
+# With WEATHER_PARTITIONING_ENABLED, the migrations partition the provider reading tables by month on PostgreSQL.
+# `manage.py create_reading_partitions` creates the partitions of the coming months and should run regularly.
+# `manage.py apply_reading_retention` removes the readings older than WEATHER_READING_RETENTION_DAYS (0 keeps them),
+# dropping whole partitions where the tables are partitioned and deleting in batches elsewhere.
+
+WEATHER_PARTITIONING_ENABLED = os.getenv('WEATHER_PARTITIONING_ENABLED', 'False') == 'True'
+WEATHER_READING_RETENTION_DAYS = int(os.getenv('WEATHER_READING_RETENTION_DAYS', 0))
+
+
+# Compact raw data
+# With WEATHER_COMPACT_RAW_DATA, `raw_data` only stores the payload values the typed columns of the reading cannot
+# rebuild exactly, and raw reads rebuild the received payload. `manage.py compact_raw_data` reports the bytes per row
+# before and after, and rewrites the stored readings with `--apply`.
+
+WEATHER_COMPACT_RAW_DATA = os.getenv('WEATHER_COMPACT_RAW_DATA', 'False') == 'True'
+
+
+# Archive
+# `manage.py archive_readings` moves old readings out of the provider tables into compressed JSONL files under
+# WEATHER_ARCHIVE_DIR, one or more per provider and month, zstd-compressed when the `zstandard` package is installed
+# and gzip-compressed otherwise. With WEATHER_ARCHIVE_ENABLED, history reads fetch the archived readings transparently.
+
+WEATHER_ARCHIVE_ENABLED = os.getenv('WEATHER_ARCHIVE_ENABLED', 'False') == 'True'
+WEATHER_ARCHIVE_DIR = os.getenv('WEATHER_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+
+# Metrics
+# Request latency, response size, render time and SQL query counts, durations and rows per URL name and provider,
+# exposed at /metrics in the Prometheus text format. Every worker process keeps and exposes its own numbers.
+# Only staff users and scrapers sending `Authorization: Bearer <WEATHER_METRICS_TOKEN>` may read them; without a token, only staff.
+
+WEATHER_METRICS_ENABLED = os.getenv('WEATHER_METRICS_ENABLED', 'True') == 'True'
+WEATHER_METRICS_TOKEN = os.getenv('WEATHER_METRICS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from stations.views import get_metrics
 from weather_aggregator.utils import superuser_required
 
 urlpatterns = [
@@ -10,4 +11,5 @@ urlpatterns = [
     path('bulgarian_meteo_pro/', include('bulgarian_meteo_pro.urls')),
     path('weather_master_x/', include('weather_master_x.urls')),
     path('api/', include('stations.urls')),
+    path('metrics', get_metrics, name='metrics'),
 ]
@@ -1,3 +1,4 @@
+import unicodedata
 from decimal import Decimal
 
 from django.contrib.auth.decorators import user_passes_test
@@ -13,10 +14,32 @@ example_bad_request = OpenApiExample(
     description="Example of a validation error response"
 )
 
+example_bulk_created = OpenApiExample(
+    name="Partially Valid Batch Example",
+    value={
+        "created": 2,
+        "errors": [
+            {"index": 1, "errors": {"timestamp": ["This field is required."]}}
+        ]
+    },
+    description="Example of a batch where one of three items failed validation"
+)
+
 
 def superuser_required(function):
     return user_passes_test(lambda u: u.is_superuser)(function)
 
 
 def fahrenheit_to_celsius(fahrenheit: Decimal):
-    return (fahrenheit - 32) / Decimal(1.8)
\ No newline at end of file
+    return (fahrenheit - 32) / Decimal(1.8)
+
+
+def make_city_key(city):
+    """
+    Canonical form of a city name for lookups: accents stripped, casefolded and with single spaces between words.
+    """
+    if not city:
+        return ''
+
+    decomposed = unicodedata.normalize('NFKD', city)
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
\ No newline at end of file
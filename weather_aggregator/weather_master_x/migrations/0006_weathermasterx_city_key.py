@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_master_x', '0005_alter_weathermasterx_pressure_hpa'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='weathermasterx',
+            name='weather_mas_city_na_2f3df3_idx',
+        ),
+        migrations.AddField(
+            model_name='weathermasterx',
+            name='city_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='weathermasterx',
+            index=models.Index(fields=['city_key', 'recorded_at'], name='weather_mas_city_ke_b26bb7_idx'),
+        ),
+    ]
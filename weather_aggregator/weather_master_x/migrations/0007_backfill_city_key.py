@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from weather_aggregator.utils import make_city_key
+
+
+def backfill_city_key(apps, schema_editor):
+    """
+    Sets the canonical city key of the stored readings, with one UPDATE per distinct city spelling.
+    """
+    WeatherMasterX = apps.get_model('weather_master_x', 'WeatherMasterX')
+
+    for city_name in WeatherMasterX.objects.order_by().values_list('city_name', flat=True).distinct():
+        WeatherMasterX.objects.filter(city_name=city_name).update(city_key=make_city_key(city_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_master_x', '0006_weathermasterx_city_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_city_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations
+from stations.partitions import partition_table
+
+# Table and partition key of the model at the time of this migration
+TABLE = 'weather_master_x_weathermasterx'
+PARTITION_COLUMN = 'recorded_at'
+
+
+def partition_readings(apps, schema_editor):
+    """
+    Partitions the readings by month on Postgres when `WEATHER_PARTITIONING_ENABLED` is set.
+    """
+    if schema_editor.connection.vendor == 'postgresql' and settings.WEATHER_PARTITIONING_ENABLED:
+        partition_table(schema_editor, TABLE, PARTITION_COLUMN)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_master_x', '0007_backfill_city_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_readings, migrations.RunPython.noop),
+    ]
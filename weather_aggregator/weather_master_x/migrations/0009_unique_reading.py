@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-17 23:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_readings(apps, schema_editor):
+    """
+    Keeps the first of the readings sharing a station and timestamp, so the unique constraint can be added.
+    Stations pointing at a deleted duplicate are pointed at the kept reading, and the normalized readings of the
+    deleted ones are deleted. Rollups counted every duplicate, run `manage.py rebuild_weather_rollups` if any was deleted.
+    """
+    WeatherMasterX = apps.get_model('weather_master_x', 'WeatherMasterX')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Station = apps.get_model('stations', 'Station')
+    NormalizedReading = apps.get_model('stations', 'NormalizedReading')
+
+    content_type = ContentType.objects.filter(app_label='weather_master_x', model='weathermasterx').first()
+    duplicates = WeatherMasterX.objects.order_by().values('station_identifier', 'recorded_at').annotate(
+        count=Count('id'), kept_id=Min('id')
+    ).filter(count__gt=1)
+
+    for duplicate in duplicates.iterator():
+        deleted_ids = list(WeatherMasterX.objects.filter(
+            station_identifier=duplicate['station_identifier'], recorded_at=duplicate['recorded_at']
+        ).exclude(id=duplicate['kept_id']).values_list('id', flat=True))
+
+        if content_type is not None:
+            Station.objects.filter(content_type=content_type, object_id__in=deleted_ids).update(
+                object_id=duplicate['kept_id']
+            )
+            NormalizedReading.objects.filter(content_type=content_type, object_id__in=deleted_ids).delete()
+        WeatherMasterX.objects.filter(id__in=deleted_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('weather_master_x', '0008_partition_by_month'),
+        ('stations', '0014_station_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_readings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='weathermasterx',
+            constraint=models.UniqueConstraint(fields=('station_identifier', 'recorded_at'), name='unique_weathermasterx_reading'),
+        ),
+    ]
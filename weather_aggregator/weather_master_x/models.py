@@ -12,6 +12,12 @@ class WeatherMasterX(models.Model):
         max_length=100,
     )
 
+    city_key = models.CharField(
+        max_length=100,
+        default='',
+        editable=False
+    )  # canonical city name for lookups, see `make_city_key`
+
     lat = models.FloatField()
 
     lon = models.FloatField()
@@ -49,7 +55,13 @@ class WeatherMasterX(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=['city_name', 'recorded_at']),  # optimized for filtering city and ordering by timestamp
+            models.Index(fields=['city_key', 'recorded_at']),  # optimized for filtering city and ordering by timestamp
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['station_identifier', 'recorded_at'],
+                name='unique_weathermasterx_reading'
+            ),  # includes the partition key, so it holds on the partitioned table
         ]
         ordering = ['recorded_at']
 
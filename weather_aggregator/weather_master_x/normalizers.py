@@ -0,0 +1,51 @@
+from django.db.models import BooleanField, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+from stations.normalizers import BaseRowNormalizer
+from stations.serializers import DefaultWeatherFields
+from weather_aggregator.utils import fahrenheit_to_celsius
+from weather_master_x.choices import StationStatusChoices
+
+
+class WeatherMasterXNormalizer(BaseRowNormalizer):
+    fields = (
+        'station_identifier',
+        'city_name',
+        'lat',
+        'lon',
+        'temp_fahrenheit',
+        'humidity_percent',
+        'pressure_hpa',
+        'uv_index',
+        'recorded_at',
+        'operational_status',
+    )
+    metrics = {
+        'temperature_celsius': (Cast('temp_fahrenheit', FloatField()) - 32) / 1.8,
+        'humidity_percent': Cast('humidity_percent', FloatField()),
+        'pressure_hpa': Cast('pressure_hpa', FloatField()),
+    }
+    columns = {
+        'station_id': F('station_identifier'),
+        'city': F('city_name'),
+        'latitude': F('lat'),
+        'longitude': F('lon'),
+        'uv_index': F('uv_index'),
+        'timestamp': F('recorded_at'),
+        'is_active': ExpressionWrapper(
+            Q(operational_status=StationStatusChoices.OPERATIONAL), output_field=BooleanField()
+        ),
+    }
+
+    def get_station_data(self, row) -> DefaultWeatherFields:
+        return {
+            'station_id': row['station_identifier'],
+            'city': row['city_name'],
+            'latitude': row['lat'],
+            'longitude': row['lon'],
+            'temperature_celsius': fahrenheit_to_celsius(row['temp_fahrenheit']),
+            'humidity_percent': row['humidity_percent'],
+            'pressure_hpa': row['pressure_hpa'],
+            'uv_index': row['uv_index'],
+            'timestamp': row['recorded_at'],
+            'is_active': row['operational_status'] == StationStatusChoices.OPERATIONAL,
+        }
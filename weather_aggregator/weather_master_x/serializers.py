@@ -1,11 +1,27 @@
 from rest_framework import serializers
 from stations.serializers import BaseWeatherDataSerializer, DefaultWeatherFields
-from weather_aggregator.utils import fahrenheit_to_celsius
-from weather_master_x.choices import StationStatusChoices
 from weather_master_x.models import WeatherMasterX
+from weather_master_x.normalizers import WeatherMasterXNormalizer
 
 
 class WeatherMasterXSerializer(BaseWeatherDataSerializer, serializers.ModelSerializer):
+    station_id_field = 'station_identifier'
+    city_field = 'city_name'
+    timestamp_field = 'recorded_at'
+    raw_data_fields = {
+        ('station_identifier', ): 'station_identifier',
+        ('location', 'city_name'): 'city_name',
+        ('location', 'coordinates', 'lat'): 'lat',
+        ('location', 'coordinates', 'lon'): 'lon',
+        ('recorded_at', ): 'recorded_at',
+        ('readings', 'temp_fahrenheit'): 'temp_fahrenheit',
+        ('readings', 'humidity_percent'): 'humidity_percent',
+        ('readings', 'pressure_hpa'): 'pressure_hpa',
+        ('readings', 'uv_index'): 'uv_index',
+        ('readings', 'rain_mm'): 'rain_mm',
+        ('operational_status', ): 'operational_status',
+    }
+
     class Meta:
         model = WeatherMasterX
         exclude = ('raw_data', )
@@ -16,7 +32,8 @@ class WeatherMasterXSerializer(BaseWeatherDataSerializer, serializers.ModelSeria
         coordinates = location_data.get('coordinates', {})
         readings_data = data.get('readings', {})
 
-        # Update data to flatten the structure
+        # Flatten into a copy, so `initial_data` keeps the payload as it was received for `raw_data`
+        data = data.copy()
         data['city_name'] = location_data.get('city_name')
         data['lat'] = coordinates.get('lat')
         data['lon'] = coordinates.get('lon')
@@ -29,15 +46,4 @@ class WeatherMasterXSerializer(BaseWeatherDataSerializer, serializers.ModelSeria
         return super().to_internal_value(data)
 
     def get_station_data(self, instance: WeatherMasterX) -> DefaultWeatherFields:
-        return {
-            'station_id': instance.station_identifier,
-            'city': instance.city_name,
-            'latitude': instance.lat,
-            'longitude': instance.lon,
-            'temperature_celsius': fahrenheit_to_celsius(instance.temp_fahrenheit),
-            'humidity_percent': instance.humidity_percent,
-            'pressure_hpa': instance.pressure_hpa,
-            'uv_index': instance.uv_index,
-            'timestamp': instance.recorded_at,
-            'is_active': instance.operational_status == StationStatusChoices.OPERATIONAL,
-        }
+        return WeatherMasterXNormalizer().get_instance_station_data(instance)
@@ -1,52 +1,60 @@
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiResponse
-from rest_framework.generics import CreateAPIView
-from stations.mixins import CreateStationMixin
-from weather_aggregator.utils import example_bad_request
+from rest_framework.generics import CreateAPIView, GenericAPIView
+from stations.async_views import AsyncBulkCreateStationView, AsyncCreateStationView
+from stations.mixins import BulkCreateStationMixin, CreateStationMixin
+from weather_aggregator.utils import example_bad_request, example_bulk_created
 from weather_master_x.models import WeatherMasterX
 from weather_master_x.serializers import WeatherMasterXSerializer
 
 
-@extend_schema(
-    request={
-        "application/json": {
+WEATHER_MASTER_X_PAYLOAD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "station_identifier": {"type": "string"},
+        "location": {
             "type": "object",
             "properties": {
-                "station_identifier": {"type": "string"},
-                "location": {
-                    "type": "object",
-                    "properties": {
-                        "city_name": {"type": "string"},
-                        "coordinates": {
-                            "type": "object",
-                            "properties": {
-                                "lat": {"type": "number"},
-                                "lon": {"type": "number"}
-                            },
-                            "required": ["lat", "lon"]
-                        }
-                    },
-                    "required": ["city_name", "coordinates"]
-                },
-                "recorded_at": {"type": "string", "format": "date-time"},
-                "readings": {
+                "city_name": {"type": "string"},
+                "coordinates": {
                     "type": "object",
                     "properties": {
-                        "temp_fahrenheit": {"type": "number"},
-                        "humidity_percent": {"type": "number"},
-                        "pressure_hpa": {"type": "number"},
-                        "uv_index": {"type": "integer"},
-                        "rain_mm": {"type": "number"}
+                        "lat": {"type": "number"},
+                        "lon": {"type": "number"}
                     },
-                    "required": ["temp_fahrenheit", "humidity_percent"]
-                },
-                "operational_status": {"type": "string"}
+                    "required": ["lat", "lon"]
+                }
             },
-            "required": ["station_identifier", "location", "recorded_at", "readings", "operational_status"]
-        }
+            "required": ["city_name", "coordinates"]
+        },
+        "recorded_at": {"type": "string", "format": "date-time"},
+        "readings": {
+            "type": "object",
+            "properties": {
+                "temp_fahrenheit": {"type": "number"},
+                "humidity_percent": {"type": "number"},
+                "pressure_hpa": {"type": "number"},
+                "uv_index": {"type": "integer"},
+                "rain_mm": {"type": "number"}
+            },
+            "required": ["temp_fahrenheit", "humidity_percent"]
+        },
+        "operational_status": {"type": "string"}
+    },
+    "required": ["station_identifier", "location", "recorded_at", "readings", "operational_status"]
+}
+
+
+@extend_schema(
+    request={
+        "application/json": WEATHER_MASTER_X_PAYLOAD_SCHEMA
     },
     responses={
         201: WeatherMasterXSerializer,
+        202: OpenApiResponse(
+            description="Reading queued for storage, when the ingest queue is enabled",
+            response=OpenApiTypes.OBJECT,
+        ),
         400: OpenApiResponse(
             description="Validation Error",
             response=OpenApiTypes.OBJECT,
@@ -59,3 +67,46 @@ from weather_master_x.serializers import WeatherMasterXSerializer
 class CreateWeatherDataView(CreateStationMixin, CreateAPIView):
     queryset = WeatherMasterX.objects.all()
     serializer_class = WeatherMasterXSerializer
+
+
+@extend_schema(
+    request={
+        "application/json": {
+            "type": "array",
+            "items": WEATHER_MASTER_X_PAYLOAD_SCHEMA
+        },
+        "application/x-ndjson": WEATHER_MASTER_X_PAYLOAD_SCHEMA
+    },
+    responses={
+        201: OpenApiResponse(
+            description="Batch stored, invalid items are reported by index",
+            response=OpenApiTypes.OBJECT,
+            examples=[
+                example_bulk_created,
+            ]
+        ),
+        202: OpenApiResponse(
+            description="Valid items queued for storage, when the ingest queue is enabled",
+            response=OpenApiTypes.OBJECT,
+        ),
+        400: OpenApiResponse(
+            description="No valid items in the batch",
+            response=OpenApiTypes.OBJECT,
+        ),
+        503: OpenApiResponse(
+            description="The ingest queue is full",
+            response=OpenApiTypes.OBJECT,
+        )
+    }
+)
+class BulkCreateWeatherDataView(BulkCreateStationMixin, GenericAPIView):
+    queryset = WeatherMasterX.objects.all()
+    serializer_class = WeatherMasterXSerializer
+
+
+class AsyncCreateWeatherDataView(AsyncCreateStationView):
+    serializer_class = WeatherMasterXSerializer
+
+
+class AsyncBulkCreateWeatherDataView(AsyncBulkCreateStationView):
+    serializer_class = WeatherMasterXSerializer